@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field: str = "django.db.models.BigAutoField"
     name = "apps.users"
+
+    def ready(self) -> None:
+        # Connect the search index signals
+        from apps.users import signals  # noqa: F401
@@ -0,0 +1,172 @@
+from django.core.exceptions import ValidationError
+from django.db.models import QuerySet
+from django.http import HttpRequest, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status, serializers
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from apps.users.caching import CACHE_HEADER, film_cache, search_key
+from apps.users.models import Film, Review
+from apps.users.filters import filter_films
+from apps.users.pagination import (
+    REVIEW_ORDERING,
+    apaginate_request,
+    film_ordering,
+    listing_params,
+)
+from apps.users.serializers import (
+    FilmSerializer,
+    FilmFilterSerializer,
+    ReviewSerializer,
+)
+
+# Note.
+# Async versions of the film read endpoints (detail, reviews and search), for ASGI
+# servers such as uvicorn. They take the same requests and return the same documents
+# as the views in views.py, cache and pagination included, but they are plain Django
+# async views: DRF views are synchronous, and under ASGI Django runs them in a thread,
+# one request at a time. Here only the queries (async ORM) and cache calls leave the
+# event loop, while requests wait on them concurrently.
+# Every row is fetched before serializing, so serializers never reach the database
+# from the event loop: films and reviews come from for_listing(). Listings are not
+# streamed (?stream=true returns the whole listing at once).
+
+
+def json_response(data: dict | list, status: int = status.HTTP_200_OK) -> JsonResponse:
+    """A JSON response rendered as DRF renders it"""
+    return JsonResponse(
+        data,
+        status=status,
+        encoder=JSONEncoder,
+        safe=False,
+        json_dumps_params={"ensure_ascii": False, "separators": (",", ":")},
+    )
+
+
+def error_response(error: APIException) -> JsonResponse:
+    """The response DRF builds for the exception"""
+    data: dict | list = error.detail
+    if not isinstance(data, (dict, list)):
+        data = {"detail": data}
+    return json_response(data, status=error.status_code)
+
+
+def api_request(request: HttpRequest) -> Request:
+    """The request as DRF sees it, to read its query params and parsed body"""
+    return Request(
+        request, parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES]
+    )
+
+
+# Like DRF views, exempt from Django's CSRF checks
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncFilterFilmsView(View):
+
+    async def get(self, request: HttpRequest) -> JsonResponse:
+        return json_response(
+            {"detail": "GET method not supported. Use POST instead."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    async def post(self, request: HttpRequest) -> JsonResponse:
+        api: Request = api_request(request)
+
+        response: JsonResponse
+        try:
+            # parse request data
+            filter_data: dict = api.data
+
+            serializer: serializers.Serializer = FilmFilterSerializer(data=filter_data)
+            serializer.is_valid(raise_exception=True)
+            validated_data: dict = serializer.validated_data
+
+            cache_key: str | None
+            cached: dict | None
+            cache_key, cached = await film_cache.alookup(
+                "search", search_key(validated_data, listing_params(api))
+            )
+            if cached is not None:
+                response = json_response(cached)
+                response[CACHE_HEADER] = "HIT"
+                return response
+
+            # Compile every criterion into a single query
+            films: QuerySet = filter_films(Film.objects.for_listing(), validated_data)
+
+            page: dict
+            films, page = await apaginate_request(api, films, film_ordering(api, films))
+            data: dict = {"films": FilmSerializer(films, many=True).data, **page}
+            response = await film_cache.astore(cache_key, json_response(data), data)
+
+        except APIException as error:
+            response = error_response(error)
+        except ValidationError as error:
+            response = json_response(
+                {"detail": error.message}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return response
+
+
+# Like DRF views, exempt from Django's CSRF checks
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncFilmDetailView(View):
+
+    async def get(self, request: HttpRequest, id: int) -> JsonResponse:
+        response: JsonResponse
+
+        cache_key: str | None
+        cached: dict | None
+        cache_key, cached = await film_cache.alookup("detail", str(id))
+        if cached is not None:
+            response = json_response(cached)
+            response[CACHE_HEADER] = "HIT"
+            return response
+
+        try:
+            film: Film = await Film.objects.for_listing().aget(pk=id)
+            data: dict = FilmSerializer(film).data
+            response = await film_cache.astore(cache_key, json_response(data), data)
+
+        except Film.DoesNotExist:
+            response = json_response(
+                {"detail": "Film not found."}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        return response
+
+
+# Like DRF views, exempt from Django's CSRF checks
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncFilmReviewsView(View):
+
+    async def get(self, request: HttpRequest, id: int) -> JsonResponse:
+        api: Request = api_request(request)
+
+        response: JsonResponse
+        try:
+            if not await Film.objects.filter(pk=id).aexists():
+                raise Film.DoesNotExist("Film not found.")
+            reviews: QuerySet = Review.objects.for_listing().filter(film_id=id)
+
+            page: dict
+            reviews, page = await apaginate_request(api, reviews, REVIEW_ORDERING)
+            response = json_response(
+                {"reviews": ReviewSerializer(reviews, many=True).data, **page}
+            )
+
+        except ValidationError as error:
+            response = json_response(
+                {"detail": error.message}, status=status.HTTP_400_BAD_REQUEST
+            )
+        except Film.DoesNotExist as error:
+            response = json_response(
+                {"detail": str(error)}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        return response
@@ -0,0 +1,280 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.base_user import AbstractBaseUser
+from django.http import HttpRequest
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+
+from apps.users.models import User
+
+# Note.
+# Every authenticated view identifies the user through the "session" cookie, which holds
+# the key of the user's Token. Resolving it costs a query for the token and another one
+# for the user, so resolved users are cached by token key:
+# - an in-process LRU cache, always used. Invalidations only reach the worker that
+#   makes them, so its entries expire after LOCAL_TTL, well before TTL: other workers
+#   accept a revoked token (logout, deleted account) for LOCAL_TTL at most.
+# - optionally, a Django cache (CACHE_ALIAS) shared by every worker, with a TTL.
+# Cached entries are plain snapshots of the user fields, so no instance is shared
+# between requests. The password hash is left out of them, so that it is never
+# written to a shared cache: views that check or change the password read the user
+# again. Views that delete a token or change a user must invalidate it.
+
+SESSION_COOKIE = "session"
+
+DEFAULT_CACHE_SETTINGS: dict = {
+    "MAX_SIZE": 10_000,  # entries of the in-process cache
+    "TTL": 300,  # seconds, of the shared cache
+    "LOCAL_TTL": 30,  # seconds, of the in-process cache
+    "CACHE_ALIAS": None,  # Django cache shared between workers
+}
+
+# User fields left out of the cached snapshots
+SNAPSHOT_EXCLUDED_FIELDS: set[str] = {"password"}
+
+
+class TokenUserCache:
+    KEY_PREFIX = "auth-token:"
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        cache_alias: str | None = None,
+        local_ttl: float | None = None,
+    ) -> None:
+        self.max_size: int = max_size
+        self.ttl: float = ttl
+        self.local_ttl: float = ttl if local_ttl is None else min(local_ttl, ttl)
+        self.cache_alias: str | None = cache_alias
+        self.entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self.lock: threading.Lock = threading.Lock()
+
+    @property
+    def shared(self) -> BaseCache | None:
+        return caches[self.cache_alias] if self.cache_alias else None
+
+    def get(self, key: str) -> dict | None:
+        with self.lock:
+            entry: tuple[float, dict] | None = self.entries.get(key, None)
+            if entry is not None:
+                expires_at, snapshot = entry
+                if expires_at > time.monotonic():
+                    self.entries.move_to_end(key)
+                    return snapshot
+                del self.entries[key]
+
+        if self.shared is not None:
+            snapshot: dict | None = self.shared.get(self.KEY_PREFIX + key)
+            if snapshot is not None:
+                self.store_local(key, snapshot)
+                return snapshot
+        return None
+
+    def set(self, key: str, snapshot: dict) -> None:
+        self.store_local(key, snapshot)
+        if self.shared is not None:
+            self.shared.set(self.KEY_PREFIX + key, snapshot, timeout=self.ttl)
+
+    def store_local(self, key: str, snapshot: dict) -> None:
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.local_ttl, snapshot)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, key: str) -> None:
+        with self.lock:
+            self.entries.pop(key, None)
+        if self.shared is not None:
+            self.shared.delete(self.KEY_PREFIX + key)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+def build_cache() -> TokenUserCache:
+    options: dict = {
+        **DEFAULT_CACHE_SETTINGS,
+        **getattr(settings, "AUTH_TOKEN_CACHE", {}),
+    }
+    return TokenUserCache(
+        max_size=options["MAX_SIZE"],
+        ttl=options["TTL"],
+        cache_alias=options["CACHE_ALIAS"],
+        local_ttl=options["LOCAL_TTL"],
+    )
+
+
+token_cache: TokenUserCache = build_cache()
+
+
+def user_snapshot(user: AbstractBaseUser) -> dict:
+    return {
+        field.attname: getattr(user, field.attname)
+        for field in user._meta.fields
+        if field.attname not in SNAPSHOT_EXCLUDED_FIELDS
+    }
+
+
+def user_from_snapshot(snapshot: dict) -> User:
+    user: User = User(**snapshot)
+    user._state.adding = False
+    user._state.db = "default"
+    return user
+
+
+class CookieTokenAuthentication(BaseAuthentication):
+    """
+    Authenticates the user with the token key stored in the session cookie. Requests
+    without a valid cookie are left anonymous, each view decides if that is allowed.
+    """
+
+    def authenticate(self, request: Request) -> tuple[AbstractBaseUser, str] | None:
+        key: str | None = request.COOKIES.get(SESSION_COOKIE, None)
+        if not key:
+            return None
+
+        snapshot: dict | None = token_cache.get(key)
+        if snapshot is None:
+            try:
+                token: Token = Token.objects.select_related("user").get(key=key)
+            except Token.DoesNotExist:
+                return None
+            if not token.user.is_active:
+                return None
+            snapshot = user_snapshot(token.user)
+            token_cache.set(key, snapshot)
+
+        return user_from_snapshot(snapshot), key
+
+
+# Note.
+# Logging in. LoginBackend reads the user's token along with the user, so the login
+# view reuses it without another query (login_token). Failed logins are counted per
+# client IP and per username (FailedLoginThrottle, on Django's cache framework): over
+# the limit, logins are refused before the password is hashed, so brute force traffic
+# does not cost a hash per attempt. Counts expire WINDOW seconds after the first
+# failure, and a successful login resets the count of its username.
+
+
+class LoginBackend(ModelBackend):
+    def authenticate(
+        self,
+        request: HttpRequest | None,
+        username: str | None = None,
+        password: str | None = None,
+        **kwargs,
+    ) -> AbstractBaseUser | None:
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD, None)
+        if username is None or password is None:
+            return None
+        try:
+            user: User = User.objects.select_related("auth_token").get(
+                **{User.USERNAME_FIELD: username}
+            )
+        except User.DoesNotExist:
+            # Hash anyway, as ModelBackend does, so unknown usernames take as long
+            User().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+
+def login_token(user: AbstractBaseUser) -> Token:
+    """The user's token, read by LoginBackend along with the user, or a new one"""
+    token: Token | None = getattr(user, "auth_token", None)
+    if token is None:
+        token, _ = Token.objects.get_or_create(user=user)
+    return token
+
+
+DEFAULT_THROTTLE_SETTINGS: dict = {
+    "CACHE_ALIAS": "default",  # None disables the throttle
+    "MAX_FAILURES_PER_IP": 100,
+    "MAX_FAILURES_PER_USERNAME": 10,
+    "WINDOW": 300,  # seconds
+}
+
+
+class FailedLoginThrottle:
+    KEY_PREFIX = "failed-login:"
+
+    def __init__(
+        self,
+        cache_alias: str | None,
+        max_failures_per_ip: int,
+        max_failures_per_username: int,
+        window: int,
+    ) -> None:
+        self.cache_alias: str | None = cache_alias
+        self.max_failures_per_ip: int = max_failures_per_ip
+        self.max_failures_per_username: int = max_failures_per_username
+        self.window: int = window
+
+    @property
+    def cache(self) -> BaseCache | None:
+        return caches[self.cache_alias] if self.cache_alias else None
+
+    def username_key(self, username: str) -> str:
+        # Usernames are user input, not valid keys for every cache backend
+        digest: str = hashlib.sha256(username.lower().encode()).hexdigest()
+        return f"{self.KEY_PREFIX}username:{digest}"
+
+    def ident_key(self, ident: str) -> str:
+        # So is X-Forwarded-For, that the ident comes from behind proxies
+        digest: str = hashlib.sha256(ident.encode()).hexdigest()
+        return f"{self.KEY_PREFIX}ip:{digest}"
+
+    def limits(self, ident: str, username: str) -> dict[str, int]:
+        return {
+            self.ident_key(ident): self.max_failures_per_ip,
+            self.username_key(username): self.max_failures_per_username,
+        }
+
+    def allowed(self, ident: str, username: str) -> bool:
+        if self.cache is None:
+            return True
+        limits: dict[str, int] = self.limits(ident, username)
+        failures: dict[str, int] = self.cache.get_many(list(limits))
+        return all(failures.get(key, 0) < limit for key, limit in limits.items())
+
+    def failed(self, ident: str, username: str) -> None:
+        if self.cache is None:
+            return
+        for key in self.limits(ident, username):
+            self.cache.add(key, 0, timeout=self.window)
+            try:
+                self.cache.incr(key)
+            except ValueError:  # Expired in between
+                self.cache.add(key, 1, timeout=self.window)
+
+    def succeeded(self, username: str) -> None:
+        if self.cache is not None:
+            self.cache.delete(self.username_key(username))
+
+
+def build_throttle() -> FailedLoginThrottle:
+    options: dict = {
+        **DEFAULT_THROTTLE_SETTINGS,
+        **getattr(settings, "LOGIN_THROTTLE", {}),
+    }
+    return FailedLoginThrottle(
+        cache_alias=options["CACHE_ALIAS"],
+        max_failures_per_ip=options["MAX_FAILURES_PER_IP"],
+        max_failures_per_username=options["MAX_FAILURES_PER_USERNAME"],
+        window=options["WINDOW"],
+    )
+
+
+login_throttle: FailedLoginThrottle = build_throttle()
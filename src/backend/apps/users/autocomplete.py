@@ -0,0 +1,381 @@
+import re
+import heapq
+import time
+import threading
+import unicodedata
+from bisect import bisect_left, bisect_right
+from typing import Iterable
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Model, QuerySet, Sum
+from django.db.models.functions import Coalesce
+
+from apps.users.models import Director, Actor, Film
+
+# Note.
+# Typeahead over film, director and actor names, served from an in-memory prefix index
+# in every worker, so a lookup never reads the database.
+# Names are normalized (accents and punctuation dropped, case folded) and indexed from
+# every word on, "The Godfather" under "the godfather" and "godfather". The keys are a
+# sorted list, and the names starting with a prefix are the range of the list found
+# by bisection. Matches are ranked by popularity: reviews of the film, or of the
+# films of the director or actor.
+# A short prefix matches a large part of the index, so the best RESULTS of every
+# prefix with more than SCAN_LIMIT keys are kept, and kept up to date as names are
+# added, renamed, removed or reviewed. Other prefixes rank their few keys at lookup.
+# The index is loaded in a background thread of the worker, started as the server
+# starts (core/wsgi.py, core/asgi.py), and lookups get a 503 until it is loaded (about
+# 20s for 1M names). It follows the films, directors, actors and reviews written by
+# the worker itself (see signals.py), once committed. Writes of other workers, bulk
+# imports, and the popularity of people (as reviews of their films come and go) are
+# picked up by the next load, MAX_AGE seconds later, in the background as well.
+# A single thread loads the index at a time, started under the lock.
+
+DEFAULT_AUTOCOMPLETE_SETTINGS: dict = {
+    "RESULTS": 10,  # by default
+    "MAX_RESULTS": 20,  # kept per prefix, the most a request may ask for
+    "MAX_AGE": 300,  # seconds, None never loads the index again
+}
+
+RETRY_AFTER = 5  # seconds, suggested to lookups while the index is loading
+SCAN_LIMIT = 512  # keys ranked at lookup, over it the best of the prefix are kept
+
+KINDS: dict[type[Model], str] = {Film: "film", Director: "director", Actor: "actor"}
+
+WORD_PATTERN: re.Pattern = re.compile(r"\w+")
+
+
+def autocomplete_settings() -> dict:
+    return {
+        **DEFAULT_AUTOCOMPLETE_SETTINGS,
+        **getattr(settings, "AUTOCOMPLETE", {}),
+    }
+
+
+def normalize(text: str) -> str:
+    """Lowercase words of the text without accents, separated by single spaces"""
+    if not text.isascii():
+        text = "".join(
+            char
+            for char in unicodedata.normalize("NFKD", text)
+            if not unicodedata.combining(char)
+        )
+    return " ".join(WORD_PATTERN.findall(text.casefold()))
+
+
+def prefix_end(prefix: str) -> str:
+    """Smallest string after every string starting with the prefix"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class Entry:
+    """A film, director or actor name of the index"""
+
+    __slots__ = ("kind", "id", "name", "popularity")
+
+    def __init__(self, kind: str, id: int, name: str, popularity: int) -> None:
+        self.kind: str = kind
+        self.id: int = id
+        self.name: str = name
+        self.popularity: int = popularity
+
+    def keys(self) -> list[str]:
+        """The normalized name from every word on"""
+        words: list[str] = normalize(self.name).split(" ")
+        return list(
+            dict.fromkeys(" ".join(words[i:]) for i in range(len(words)) if words[i])
+        )
+
+    def rank(self) -> tuple:
+        """Sort key, most popular first"""
+        return (-self.popularity, self.name, self.kind, self.id)
+
+    def data(self) -> dict:
+        return {"type": self.kind, "id": self.id, "name": self.name}
+
+
+class PrefixIndex:
+    """
+    Sorted keys of the names, and the best entries of the prefixes with more than
+    scan_limit keys. Not thread safe, see AutocompleteIndex.
+    """
+
+    def __init__(self, results: int, scan_limit: int = SCAN_LIMIT) -> None:
+        self.results: int = results
+        self.scan_limit: int = scan_limit
+        self.keys: list[str] = []
+        self.entries: list[Entry] = []  # Of every key
+        self.by_kind: dict[str, dict[int, Entry]] = {}
+        self.top: dict[str, list[Entry]] = {}
+        self.depth: int = 0  # Of the longest prefix in top
+
+    def __len__(self) -> int:
+        return sum(map(len, self.by_kind.values()))
+
+    def get(self, kind: str, id: int) -> Entry | None:
+        return self.by_kind.get(kind, {}).get(id)
+
+    def load(self, rows: Iterable[tuple[str, int, str, int]]) -> None:
+        """Replaces the index with the (kind, id, name, popularity) rows"""
+        self.by_kind = {}
+        pairs: list[tuple[str, Entry]] = []
+        for kind, pk, name, popularity in rows:
+            entry: Entry = Entry(kind, pk, name, popularity)
+            self.by_kind.setdefault(kind, {})[pk] = entry
+            pairs.extend((key, entry) for key in entry.keys())
+        pairs.sort(key=lambda pair: pair[0])
+        self.keys = [key for key, _ in pairs]
+        self.entries = [entry for _, entry in pairs]
+
+        # Positions of the entries in the ranking, so that the best of a range are the
+        # smallest positions, found by numpy
+        ranked: list[Entry] = sorted(
+            (entry for entries in self.by_kind.values() for entry in entries.values()),
+            key=Entry.rank,
+        )
+        positions: dict[int, int] = {id(entry): i for i, entry in enumerate(ranked)}
+        ranks: np.ndarray = np.fromiter(
+            (positions[id(entry)] for entry in self.entries),
+            dtype=np.int64,
+            count=len(self.entries),
+        )
+
+        # Prefixes one character longer than a kept prefix, from the empty one down
+        self.top = {}
+        stack: list[tuple[str, int, int]] = [("", 0, len(self.keys))]
+        while stack:
+            parent, lo, hi = stack.pop()
+            length: int = len(parent) + 1
+            start: int = lo
+            while start < hi:
+                if len(self.keys[start]) < length:  # The parent itself
+                    start += 1
+                    continue
+                prefix: str = self.keys[start][:length]
+                end: int = bisect_left(self.keys, prefix_end(prefix), start, hi)
+                if end - start > self.scan_limit:
+                    best: np.ndarray = ranks[start:end]
+                    if end - start > 2 * self.results:
+                        best = np.partition(best, 2 * self.results)[: 2 * self.results]
+                    # Entries under several keys of the range count once
+                    best = np.unique(best)
+                    if len(best) < self.results:
+                        best = np.unique(ranks[start:end])
+                    self.top[prefix] = [ranked[i] for i in best[: self.results]]
+                    stack.append((prefix, start, end))
+                start = end
+        self.depth = max(map(len, self.top), default=0)
+
+    def range(self, prefix: str) -> tuple[int, int]:
+        lo: int = bisect_left(self.keys, prefix)
+        return lo, bisect_left(self.keys, prefix_end(prefix), lo)
+
+    def best(self, entries: Iterable[Entry]) -> list[Entry]:
+        return heapq.nsmallest(self.results, set(entries), key=Entry.rank)
+
+    def search(self, prefix: str) -> list[Entry]:
+        """The best entries with a key starting with the normalized prefix"""
+        top: list[Entry] | None = self.top.get(prefix)
+        if top is None:
+            lo, hi = self.range(prefix)
+            top = self.best(self.entries[lo:hi])
+            if hi - lo > self.scan_limit:
+                self.top[prefix] = top
+                self.depth = max(self.depth, len(prefix))
+        return top
+
+    def prefixes(self, entry: Entry) -> set[str]:
+        """The prefixes of the keys of the entry that may be kept"""
+        return {
+            key[:length]
+            for key in entry.keys()
+            for length in range(1, min(len(key), self.depth) + 1)
+        }
+
+    def offer(self, entry: Entry, prefixes: Iterable[str]) -> None:
+        """Adds the entry to the kept best of the prefixes it now belongs to"""
+        for prefix in prefixes:
+            top: list[Entry] | None = self.top.get(prefix)
+            if top is None or entry in top:
+                continue
+            if len(top) < self.results or entry.rank() < top[-1].rank():
+                top.append(entry)
+                top.sort(key=Entry.rank)
+                del top[self.results :]
+
+    def add(self, kind: str, id: int, name: str, popularity: int) -> None:
+        entry: Entry = Entry(kind, id, name, popularity)
+        self.by_kind.setdefault(kind, {})[id] = entry
+        for key in entry.keys():
+            position: int = bisect_right(self.keys, key)
+            self.keys.insert(position, key)
+            self.entries.insert(position, entry)
+        self.offer(entry, self.prefixes(entry))
+
+    def remove(self, kind: str, id: int) -> Entry | None:
+        entry: Entry | None = self.by_kind.get(kind, {}).pop(id, None)
+        if entry is None:
+            return None
+        for key in entry.keys():
+            position: int = bisect_left(self.keys, key)
+            while self.entries[position] is not entry:
+                position += 1
+            del self.keys[position]
+            del self.entries[position]
+        for prefix in self.prefixes(entry):
+            top: list[Entry] | None = self.top.get(prefix)
+            if top is not None and entry in top:
+                if len(top) < self.results:
+                    top.remove(entry)
+                else:
+                    # Ranked again by the next lookup, the next best is not known
+                    del self.top[prefix]
+        return entry
+
+    def rename(self, kind: str, id: int, name: str) -> None:
+        """Adds the name, or renames the entry keeping its popularity"""
+        entry: Entry | None = self.get(kind, id)
+        if entry is None:
+            self.add(kind, id, name, 0)
+        elif not entry.name == name:
+            self.remove(kind, id)
+            self.add(kind, id, name, entry.popularity)
+
+    def add_popularity(self, kind: str, id: int, delta: int) -> None:
+        entry: Entry | None = self.get(kind, id)
+        if entry is None:
+            return
+        entry.popularity += delta
+        prefixes: set[str] = self.prefixes(entry)
+        for prefix in prefixes:
+            top: list[Entry] | None = self.top.get(prefix)
+            if top is not None and entry in top:
+                top.sort(key=Entry.rank)
+                # Unkept entries may now be better than the last one
+                if delta < 0 and len(top) == self.results and top[-1] is entry:
+                    del self.top[prefix]
+        self.offer(entry, prefixes)
+
+
+class IndexLoading(Exception):
+    """The index of the worker is not loaded yet"""
+
+
+class AutocompleteIndex:
+    """
+    Prefix index of the worker, loaded from the database in the background as the
+    server starts, and again once older than MAX_AGE
+    """
+
+    def __init__(self, results: int, max_results: int, max_age: float | None) -> None:
+        self.results: int = results
+        self.max_results: int = max_results
+        self.max_age: float | None = max_age
+        self.lock: threading.Lock = threading.Lock()
+        self.index: PrefixIndex | None = None
+        self.loaded_at: float = 0
+        self.loader: threading.Thread | None = None
+
+    def rows(self) -> Iterable[tuple[str, int, str, int]]:
+        """(kind, id, name, popularity) of every film, director and actor"""
+        for id, name, reviews in Film.objects.values_list("id", "name", "review_count"):
+            yield "film", id, name, reviews
+        for model in (Director, Actor):
+            people: QuerySet = model.objects.annotate(
+                reviews=Coalesce(Sum("films__review_count"), 0)
+            ).values_list("id", "name", "reviews")
+            for id, name, reviews in people:
+                yield KINDS[model], id, name, reviews
+
+    def build(self) -> PrefixIndex:
+        index: PrefixIndex = PrefixIndex(self.max_results)
+        index.load(self.rows())
+        return index
+
+    def load(self) -> None:
+        """Loads the index in this thread"""
+        index: PrefixIndex = self.build()
+        with self.lock:
+            self.index, self.loaded_at = index, time.monotonic()
+
+    def reload(self) -> None:
+        try:
+            self.load()
+        finally:
+            connection.close()
+
+    def start_loading(self) -> None:
+        """
+        Loads the index in the background, unless a thread is loading it (with the
+        lock held)
+        """
+        # A loader thread does not survive a fork, its worker loads the index again
+        if self.loader is None or not self.loader.is_alive():
+            self.loader = threading.Thread(target=self.reload, daemon=True)
+            self.loader.start()
+
+    def start(self) -> None:
+        """Starts loading the index as the server starts"""
+        with self.lock:
+            self.start_loading()
+
+    def get_index(self) -> PrefixIndex:
+        with self.lock:
+            index: PrefixIndex | None = self.index
+            if index is None or (
+                self.max_age is not None
+                and time.monotonic() - self.loaded_at > self.max_age
+            ):
+                # Served from the current index until the new one is loaded
+                self.start_loading()
+        if index is None:
+            raise IndexLoading("Names are being loaded, try again shortly.")
+        return index
+
+    def search(self, text: str, limit: int | None = None) -> list[dict]:
+        """Names starting with the text, or one of its words, most popular first"""
+        prefix: str = normalize(text)
+        if not prefix:
+            return []
+        index: PrefixIndex = self.get_index()
+        with self.lock:
+            entries: list[Entry] = index.search(prefix)[: limit or self.results]
+        return [entry.data() for entry in entries]
+
+    def clear(self) -> None:
+        """Drops the index, loaded again in the background by the next lookup"""
+        with self.lock:
+            self.index = None
+
+    def update(self, method: str, *args) -> None:
+        """Calls the method of the loaded index once the write is committed"""
+
+        def apply() -> None:
+            with self.lock:
+                if self.index is not None:
+                    getattr(self.index, method)(*args)
+
+        if self.index is not None:
+            transaction.on_commit(apply)
+
+    def save(self, instance: Film | Director | Actor) -> None:
+        self.update("rename", KINDS[type(instance)], instance.id, instance.name)
+
+    def delete(self, instance: Film | Director | Actor) -> None:
+        self.update("remove", KINDS[type(instance)], instance.id)
+
+    def add_reviews(self, film_id: int, delta: int) -> None:
+        self.update("add_popularity", KINDS[Film], film_id, delta)
+
+
+def build_index() -> AutocompleteIndex:
+    options: dict = autocomplete_settings()
+    return AutocompleteIndex(
+        results=options["RESULTS"],
+        max_results=options["MAX_RESULTS"],
+        max_age=options["MAX_AGE"],
+    )
+
+
+autocomplete_index: AutocompleteIndex = build_index()
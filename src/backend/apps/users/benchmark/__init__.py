@@ -0,0 +1,4 @@
+# Note.
+# Benchmark suite of the REST API: a synthetic catalog generator (catalog.py), a mixed
+# workload over every URL (workload.py) and JSON reports that can be compared between
+# runs (report.py). Run it with the benchmark_api management command.
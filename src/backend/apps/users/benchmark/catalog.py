@@ -0,0 +1,172 @@
+import random
+import datetime
+from itertools import accumulate
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from apps.users import leaderboards, ratings, trending
+from apps.users.models import User, Director, Actor, Film, Review
+from apps.users.search import get_search_backend
+
+# Note.
+# Synthetic catalog generator. Popularity follows a power law, as in real catalogs:
+# a few directors and actors take part in many films, a few films get most of the
+# reviews and a few users write most of them. Each film has a quality around which
+# its scores are drawn, and releases lean towards recent years. Names follow the
+# "Film 12" / "Director 3" / "Actor 42" scheme of the film filter benchmark, so its
+# filters (BENCH_FILTERS) match the generated catalog. Reviews are written over the
+# last REVIEW_DAYS, so the trending windows hold part of them.
+
+DEFAULT_SCALE: dict[str, int] = {
+    "films": 100_000,
+    "reviews": 1_000_000,
+    "users": 50_000,
+}
+
+BATCH_SIZE = 5000
+
+FILMS_PER_DIRECTOR = 8
+FILMS_PER_ACTOR = 2
+CAST_SIZE: tuple[int, int] = (3, 10)
+RELEASE_YEARS: tuple[int, int] = (1950, 2024)
+REVIEW_DAYS = 30
+
+NATIONALITIES: list[str] = [
+    "American",
+    "British",
+    "French",
+    "Spanish",
+    "Italian",
+    "German",
+    "Japanese",
+    "Korean",
+    "Indian",
+    "Mexican",
+]
+
+
+def power_law(count: int, rng: random.Random, exponent: float = 1.1) -> list[float]:
+    """Cumulative popularity weights of count items, in random order"""
+    weights: list[float] = [1 / (rank + 1) ** exponent for rank in range(count)]
+    rng.shuffle(weights)
+    return list(accumulate(weights))
+
+
+def release_date(rng: random.Random) -> datetime.date:
+    first, last = RELEASE_YEARS
+    # Triangular towards the last years: more films are released every year
+    year: int = int(rng.triangular(first, last + 1, last + 1))
+    return datetime.date(min(year, last), rng.randint(1, 12), rng.randint(1, 28))
+
+
+def score(quality: float, rng: random.Random) -> int:
+    return min(max(round(rng.gauss(quality, 1.8)), Review.MIN_SCORE), Review.MAX_SCORE)
+
+
+def generate_catalog(
+    films: int, reviews: int, users: int, rng: random.Random
+) -> dict[str, int]:
+    """Creates the catalog and returns the number of rows of each model"""
+    directors: list[Director] = Director.objects.bulk_create(
+        [
+            Director(name=f"Director {i}", nationality=rng.choice(NATIONALITIES))
+            for i in range(max(films // FILMS_PER_DIRECTOR, 1))
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    actors: list[Actor] = Actor.objects.bulk_create(
+        [
+            Actor(name=f"Actor {i}", nationality=rng.choice(NATIONALITIES))
+            for i in range(max(films // FILMS_PER_ACTOR, 1))
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    director_weights: list[float] = power_law(len(directors), rng)
+    genre_weights: list[float] = power_law(len(Film.GENRE_CHOICES), rng, 0.8)
+    film_rows: list[Film] = Film.objects.bulk_create(
+        [
+            Film(
+                name=f"Film {i}",
+                release=release_date(rng),
+                genre=rng.choices(Film.GENRE_CHOICES, cum_weights=genre_weights)[0],
+                description=f"plot of film {i}",
+                duration=rng.randint(80, 180),
+                director_id=rng.choices(directors, cum_weights=director_weights)[0],
+            )
+            for i in range(films)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    actor_weights: list[float] = power_law(len(actors), rng)
+    through: type = Film.cast.through
+    cast: list = []
+    for film in film_rows:
+        size: int = min(rng.randint(*CAST_SIZE), len(actors))
+        members: set[Actor] = set()
+        while len(members) < size:
+            members.update(rng.choices(actors, cum_weights=actor_weights, k=size))
+        cast.extend(
+            through(film_id=film.id, actor_id=actor.id)
+            for actor in list(members)[:size]
+        )
+    through.objects.bulk_create(cast, batch_size=BATCH_SIZE)
+
+    # Generated users can not log in: hashing 50k passwords would take minutes
+    password: str = make_password(None)
+    user_rows: list[User] = User.objects.bulk_create(
+        [
+            User(username=f"bench{i}", email=f"bench{i}@bench.com", password=password)
+            for i in range(users)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    # Unique (user, film) pairs, drawn by user activity and film popularity
+    user_weights: list[float] = power_law(len(user_rows), rng, 0.8)
+    film_weights: list[float] = power_law(len(film_rows), rng, 0.8)
+    reviews = min(reviews, len(user_rows) * len(film_rows))
+    pairs: set[tuple[int, int]] = set()
+    stalled: int = 0  # Draws in a row without new pairs, when the catalog is too small
+    while len(pairs) < reviews and stalled < 10:
+        drawn: int = len(pairs)
+        missing: int = reviews - drawn
+        pairs.update(
+            zip(
+                rng.choices(range(len(user_rows)), cum_weights=user_weights, k=missing),
+                rng.choices(range(len(film_rows)), cum_weights=film_weights, k=missing),
+            )
+        )
+        stalled = stalled + 1 if len(pairs) == drawn else 0
+
+    qualities: list[float] = [rng.gauss(6.5, 1.5) for _ in film_rows]
+    now: datetime.datetime = timezone.now()
+    batch: list[Review] = []
+    for user, film in pairs:
+        batch.append(
+            Review(
+                rating=score(qualities[film], rng),
+                user_id_id=user_rows[user].id,
+                film_id_id=film_rows[film].id,
+                created_at=now - datetime.timedelta(days=rng.uniform(0, REVIEW_DAYS)),
+            )
+        )
+        if len(batch) == BATCH_SIZE:
+            Review.objects.bulk_create(batch)
+            batch = []
+    Review.objects.bulk_create(batch)
+
+    ratings.rebuild_ratings()
+    trending.rebuild_buckets()
+    leaderboards.rebuild_leaderboards()
+    get_search_backend().rebuild()
+
+    return {
+        "directors": len(directors),
+        "actors": len(actors),
+        "films": len(film_rows),
+        "cast": len(cast),
+        "users": len(user_rows),
+        "reviews": len(pairs),
+    }
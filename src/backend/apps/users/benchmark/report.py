@@ -0,0 +1,114 @@
+import json
+from pathlib import Path
+
+# Note.
+# Benchmark results, saved as JSON so runs can be compared. Every endpoint (URL name)
+# gets its throughput, latency percentiles (milliseconds) and queries per request.
+# A run regresses against a baseline when an endpoint gets slower than the threshold
+# allows (p50 or p99) or issues more queries per request.
+# Requests are sent one at a time, so throughput is requests per second spent serving
+# them: use the load_test_films command for concurrent clients on a real server.
+
+PERCENTILES: dict[str, float] = {"p50": 0.50, "p90": 0.90, "p99": 0.99}
+
+# Latency increases under this many milliseconds are never regressions (noise)
+MIN_INCREASE_MS = 2.0
+# Endpoints with fewer requests are not compared on p99 (it is their slowest request)
+MIN_P99_REQUESTS = 100
+
+
+def percentile(timings: list[float], fraction: float) -> float:
+    ordered: list[float] = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(samples: list[dict]) -> dict:
+    """Statistics of the samples of one endpoint"""
+    seconds: list[float] = [sample["seconds"] for sample in samples]
+    queries: list[int] = [sample["queries"] for sample in samples]
+    statuses: dict[str, int] = {}
+    for sample in samples:
+        statuses[str(sample["status"])] = statuses.get(str(sample["status"]), 0) + 1
+    return {
+        "requests": len(samples),
+        "errors": sum(sample["status"] >= 400 for sample in samples),
+        "statuses": statuses,
+        "cache_hits": sum(sample["cache"] == "HIT" for sample in samples),
+        "throughput": len(samples) / sum(seconds) if sum(seconds) else 0.0,
+        "latency_ms": {
+            "mean": sum(seconds) / len(seconds) * 1000,
+            **{
+                name: percentile(seconds, fraction) * 1000
+                for name, fraction in PERCENTILES.items()
+            },
+            "max": max(seconds) * 1000,
+        },
+        "queries": {"mean": sum(queries) / len(queries), "max": max(queries)},
+    }
+
+
+def build_report(samples: list[dict], elapsed: float, meta: dict) -> dict:
+    """The report of a run, elapsed being its wall time (request setup included)"""
+    names: list[str] = sorted({sample["name"] for sample in samples})
+    measured: float = sum(sample["seconds"] for sample in samples)
+    return {
+        **meta,
+        "requests": len(samples),
+        "elapsed": elapsed,
+        "throughput": len(samples) / measured if measured else 0.0,
+        "endpoints": {
+            name: summarize([sample for sample in samples if sample["name"] == name])
+            for name in names
+        },
+    }
+
+
+def save_report(report: dict, path: Path) -> None:
+    path.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+
+
+def load_report(path: Path) -> dict:
+    return json.loads(path.read_text())
+
+
+def regressions(baseline: dict, report: dict, threshold: float) -> list[str]:
+    """Endpoints slower than baseline by more than threshold, or with more queries"""
+    found: list[str] = []
+    for name, current in report["endpoints"].items():
+        previous: dict | None = baseline["endpoints"].get(name, None)
+        if previous is None:
+            continue
+        stats: list[str] = ["p50"]
+        if min(previous["requests"], current["requests"]) >= MIN_P99_REQUESTS:
+            stats.append("p99")
+        for stat in stats:
+            before: float = previous["latency_ms"][stat]
+            after: float = current["latency_ms"][stat]
+            if after > before * (1 + threshold) and after - before > MIN_INCREASE_MS:
+                found.append(f"{name}: {stat} {before:.1f}ms -> {after:.1f}ms")
+        before_queries: float = previous["queries"]["mean"]
+        after_queries: float = current["queries"]["mean"]
+        if after_queries > before_queries + 0.5:
+            found.append(
+                f"{name}: {before_queries:.1f} -> {after_queries:.1f} queries/request"
+            )
+    return found
+
+
+def format_report(report: dict) -> list[str]:
+    lines: list[str] = [
+        f"{'endpoint':<20} {'reqs':>5} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} "
+        f"{'p99 ms':>8} {'queries':>8} {'errors':>6}"
+    ]
+    for name, stats in report["endpoints"].items():
+        latency: dict = stats["latency_ms"]
+        lines.append(
+            f"{name:<20} {stats['requests']:>5} {stats['throughput']:>8.1f} "
+            f"{latency['p50']:>8.1f} {latency['p90']:>8.1f} {latency['p99']:>8.1f} "
+            f"{stats['queries']['mean']:>8.1f} {stats['errors']:>6}"
+        )
+    lines.append(
+        f"{report['requests']} requests in {report['elapsed']:.1f}s, "
+        f"{report['throughput']:.1f} req/s excluding request setup"
+    )
+    return lines
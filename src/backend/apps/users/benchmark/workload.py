@@ -0,0 +1,365 @@
+import json
+import random
+from itertools import count
+from time import perf_counter
+from django.apps import apps
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse, URLPattern, URLResolver
+from django.utils.http import urlencode
+
+from apps.users.autocomplete import autocomplete_index
+from apps.users.caching import CACHE_HEADER
+from apps.users.management.commands.bench_film_filter import BENCH_FILTERS
+from apps.users.models import User, Director, Actor, Film, Review
+
+# Note.
+# Mixed workload over every URL of core/urls.py, sent in process with Django's test
+# client against the generated catalog (see catalog.py). Reads dominate, as on the
+# site, and every request is built to succeed: requests that need an account, a
+# review or a film to delete get it first, outside of the measurement. Each request
+# is timed and its queries counted.
+
+# Share of the requests sent to each URL name (namespace for included URLs)
+WEIGHTS: dict[str, int] = {
+    "film_filter": 20,
+    "film_info": 20,
+    "film_reviews": 15,
+    "film_similar": 6,
+    "film_trending": 4,
+    "film_leaderboard": 6,
+    "autocomplete": 8,
+    "async_film_filter": 4,
+    "async_film_info": 4,
+    "async_film_reviews": 4,
+    "user_history": 6,
+    "user_recommendations": 4,
+    "user_info": 4,
+    "user_add_review": 4,
+    "user_del_review": 2,
+    "user_login": 2,
+    "user_register": 1,
+    "user_update": 1,
+    "user_logout": 1,
+    "user_delete": 1,
+    "add_dir": 1,
+    "add_actor": 1,
+    "add_film": 1,
+    "bulk_films": 1,
+    "del_dir": 1,
+    "del_actor": 1,
+    "del_film": 1,
+    "admin": 1,
+}
+
+# Namespaces of the development tools, not part of the API
+TOOL_NAMESPACES: set[str] = {"djdt"}
+
+PASSWORD = "Password1"
+PAGE_PARAMS: list[str] = ["", "?limit=20", "?limit=20&order=rating"]
+
+# (client, method, path, body) of a request
+Call = tuple[Client, str, str, str | None]
+
+
+def url_names() -> list[str]:
+    """Names of the URLs of core/urls.py, namespaces for included URLs"""
+    names: list[str] = []
+    for pattern in get_resolver().url_patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.namespace not in TOOL_NAMESPACES:
+                names.append(pattern.namespace)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.append(pattern.name)
+    return names
+
+
+class Workload:
+    def __init__(self, rng: random.Random, accounts: int = 4) -> None:
+        self.rng: random.Random = rng
+        self.sequence = count()
+        self.film_ids: list[int] = list(Film.objects.values_list("id", flat=True))
+        self.filters: list[str] = [
+            json.dumps(data, default=lambda value: value.date().isoformat())
+            for data in BENCH_FILTERS
+        ]
+
+        # Logged in accounts, the films they reviewed and their reviews
+        self.accounts: list[Client] = [
+            self.login(self.register()) for _ in range(accounts)
+        ]
+        self.reviewed: dict[Client, set[int]] = {
+            client: set() for client in self.accounts
+        }
+        self.reviews: dict[Client, list[int]] = {client: [] for client in self.accounts}
+
+        self.admin: Client = Client()
+        admin: User = User.objects.create_superuser(
+            username="benchadmin", email="benchadmin@bench.com", password=PASSWORD
+        )
+        if apps.is_installed("django.contrib.sessions"):  # For the admin site
+            self.admin.force_login(admin)
+
+        # Names of the catalog, loaded here as the server loads them as it starts:
+        # the thread of the server would not see the catalog, not committed
+        autocomplete_index.load()
+
+        # Rows created by the workload, deleted by the delete requests
+        self.directors: list[str] = []
+        self.actors: list[str] = []
+        self.films: list[str] = []
+
+    def unique(self) -> int:
+        return next(self.sequence)
+
+    def post(self, client: Client, name: str, data: dict) -> HttpResponse:
+        return client.post(
+            reverse(name), json.dumps(data), content_type="application/json"
+        )
+
+    def account_data(self) -> dict[str, str]:
+        number: int = self.unique()
+        return {
+            "username": f"account{number}",  # Usernames have 15 characters at most
+            "email": f"account{number}@bench.com",
+            "password": PASSWORD,
+        }
+
+    def register(self) -> dict[str, str]:
+        data: dict[str, str] = self.account_data()
+        self.post(Client(), "user_register", data)
+        return data
+
+    def login(self, data: dict[str, str]) -> Client:
+        client: Client = Client()
+        self.post(
+            client,
+            "user_login",
+            {"username": data["username"], "password": data["password"]},
+        )
+        return client
+
+    def account(self) -> Client:
+        return self.rng.choice(self.accounts)
+
+    def film_id(self) -> int:
+        return self.rng.choice(self.film_ids)
+
+    def name(self, kind: str) -> str:
+        # Names of at least two words, as directors and actors require
+        return f"Bench {kind} {self.unique()}"
+
+    def film_data(self) -> dict:
+        return {
+            "name": self.name("film"),
+            "release": "2020-01-01",
+            "genre": self.rng.choice(Film.GENRE_CHOICES),
+            "description": "benchmark film",
+            "duration": 120,
+            "director": self.name("director"),
+            "cast": [self.name("actor") for _ in range(3)],
+        }
+
+    # Rows needed by the requests, created outside of the measurement
+
+    def create(self, url_name: str, name: str) -> str:
+        self.post(self.admin, url_name, {"name": name})
+        return name
+
+    def create_film(self) -> int:
+        data: dict = self.film_data()
+        self.post(self.admin, "add_film", data)
+        return Film.objects.get(name=data["name"]).id
+
+    # Requests of each URL name
+
+    def film_filter(self, prefix: str = "") -> Call:
+        path: str = reverse(f"{prefix}film_filter") + self.rng.choice(PAGE_PARAMS)
+        return self.account(), "post", path, self.rng.choice(self.filters)
+
+    def film_info(self, prefix: str = "") -> Call:
+        path: str = reverse(f"{prefix}film_info", kwargs={"id": self.film_id()})
+        return self.account(), "get", path, None
+
+    def film_reviews(self, prefix: str = "") -> Call:
+        path: str = reverse(f"{prefix}film_reviews", kwargs={"id": self.film_id()})
+        return self.account(), "get", path + "?limit=20", None
+
+    def film_similar(self) -> Call:
+        path: str = reverse("film_similar", kwargs={"id": self.film_id()})
+        return self.account(), "get", path, None
+
+    def film_trending(self) -> Call:
+        window: str = self.rng.choice(["", "?window=7d"])
+        return self.account(), "get", reverse("film_trending") + window, None
+
+    def film_leaderboard(self) -> Call:
+        genre: str = self.rng.choice(Film.GENRE_CHOICES)
+        path: str = reverse("film_leaderboard", kwargs={"genre": genre})
+        return self.account(), "get", path + self.rng.choice(["", "?limit=20"]), None
+
+    def autocomplete(self) -> Call:
+        # The first characters of a film name, as typed
+        name: str = Film.objects.values_list("name", flat=True).get(pk=self.film_id())
+        text: str = name[: self.rng.randint(1, 6)]
+        path: str = reverse("autocomplete") + "?" + urlencode({"q": text})
+        return self.account(), "get", path, None
+
+    def async_film_filter(self) -> Call:
+        return self.film_filter("async_")
+
+    def async_film_info(self) -> Call:
+        return self.film_info("async_")
+
+    def async_film_reviews(self) -> Call:
+        return self.film_reviews("async_")
+
+    def user_history(self) -> Call:
+        return self.account(), "get", reverse("user_history"), None
+
+    def user_recommendations(self) -> Call:
+        return self.account(), "get", reverse("user_recommendations"), None
+
+    def user_info(self) -> Call:
+        return self.account(), "get", reverse("user_info"), None
+
+    def review_data(self, client: Client) -> dict:
+        """A review of a film the account did not review yet"""
+        film_id: int = self.film_id()
+        while film_id in self.reviewed[client]:
+            film_id = self.film_id()
+        self.reviewed[client].add(film_id)
+        return {
+            "rating": self.rng.randint(Review.MIN_SCORE, Review.MAX_SCORE),
+            "content": "benchmark review",
+            "film_id": film_id,
+        }
+
+    def user_add_review(self) -> Call:
+        client: Client = self.account()
+        data: dict = self.review_data(client)
+        return client, "post", reverse("user_add_review"), json.dumps(data)
+
+    def user_del_review(self) -> Call:
+        client: Client = self.account()
+        if not self.reviews[client]:
+            self.post(client, "user_add_review", self.review_data(client))
+            self.reviews[client].append(Review.objects.latest("id").id)
+        data: dict = {"review_id": self.reviews[client].pop()}
+        return client, "post", reverse("user_del_review"), json.dumps(data)
+
+    def user_login(self) -> Call:
+        data: dict[str, str] = self.register()
+        data.pop("email")
+        return Client(), "post", reverse("user_login"), json.dumps(data)
+
+    def user_register(self) -> Call:
+        data: dict[str, str] = self.account_data()
+        return Client(), "post", reverse("user_register"), json.dumps(data)
+
+    def user_update(self) -> Call:
+        number: int = self.unique()
+        data: dict[str, str] = {
+            "current_password": PASSWORD,
+            "username": "",
+            "email": f"benchupdate{number}@bench.com",
+            "new_password": "",
+        }
+        return self.account(), "put", reverse("user_update"), json.dumps(data)
+
+    def user_logout(self) -> Call:
+        return self.login(self.register()), "delete", reverse("user_logout"), None
+
+    def user_delete(self) -> Call:
+        client: Client = self.login(self.register())
+        data: dict[str, str] = {"password": PASSWORD}
+        return client, "put", reverse("user_delete"), json.dumps(data)
+
+    def add_dir(self) -> Call:
+        name: str = self.name("director")
+        self.directors.append(name)
+        return self.admin, "post", reverse("add_dir"), json.dumps({"name": name})
+
+    def add_actor(self) -> Call:
+        name: str = self.name("actor")
+        self.actors.append(name)
+        return self.admin, "post", reverse("add_actor"), json.dumps({"name": name})
+
+    def add_film(self) -> Call:
+        data: dict = self.film_data()
+        self.films.append(data["name"])
+        return self.admin, "post", reverse("add_film"), json.dumps(data)
+
+    def bulk_films(self) -> Call:
+        films: list[dict] = [self.film_data() for _ in range(20)]
+        self.films.extend(film["name"] for film in films)
+        return self.admin, "post", reverse("bulk_films"), json.dumps(films)
+
+    def del_dir(self) -> Call:
+        if not self.directors:
+            self.directors.append(self.create("add_dir", self.name("director")))
+        director: Director = Director.objects.get(name=self.directors.pop())
+        data: dict = {"id": director.id}
+        return self.admin, "post", reverse("del_dir"), json.dumps(data)
+
+    def del_actor(self) -> Call:
+        if not self.actors:
+            self.actors.append(self.create("add_actor", self.name("actor")))
+        actor: Actor = Actor.objects.get(name=self.actors.pop())
+        data: dict = {"id": actor.id}
+        return self.admin, "post", reverse("del_actor"), json.dumps(data)
+
+    def del_film(self) -> Call:
+        if not self.films:
+            self.films.append(Film.objects.get(id=self.create_film()).name)
+        data: dict = {"name": self.films.pop()}
+        return self.admin, "post", reverse("del_film"), json.dumps(data)
+
+    def admin_index(self) -> Call:
+        return self.admin, "get", reverse("admin:index"), None
+
+    def build(self, name: str) -> Call:
+        if name == "admin":
+            return self.admin_index()
+        return getattr(self, name)()
+
+    def run(self, requests: int) -> list[dict]:
+        """Sends the mixed workload, returns a sample of every request"""
+        # Every URL at least once, the rest drawn by weight. The admin site is not
+        # mounted in every settings profile.
+        weights: dict[str, int] = {
+            name: weight for name, weight in WEIGHTS.items() if name in url_names()
+        }
+        names: list[str] = [
+            *weights,
+            *self.rng.choices(
+                list(weights),
+                weights=list(weights.values()),
+                k=max(requests - len(weights), 0),
+            ),
+        ]
+        self.rng.shuffle(names)
+        samples: list[dict] = []
+        for name in names:
+            client, method, path, body = self.build(name)
+            with CaptureQueriesContext(connection) as queries:
+                start: float = perf_counter()
+                response: HttpResponse = getattr(client, method)(
+                    path, body, content_type="application/json"
+                )
+                elapsed: float = perf_counter() - start
+
+            if name == "user_add_review" and response.status_code == 201:
+                self.reviews[client].append(Review.objects.latest("id").id)
+            samples.append(
+                {
+                    "name": name,
+                    "status": response.status_code,
+                    "seconds": elapsed,
+                    "queries": len(queries),
+                    "cache": response.get(CACHE_HEADER, None),
+                }
+            )
+        return samples
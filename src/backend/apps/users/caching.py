@@ -0,0 +1,132 @@
+import json
+import time
+import hashlib
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+
+from apps.users.filters import is_set
+
+# Note.
+# Cache of the film detail and film search responses, on top of Django's cache
+# framework (CACHE_ALIAS, the local memory "default" cache unless CACHES says
+# otherwise). Every key holds a version number, and views that change films, their
+# director or cast, or their ratings bump the version instead of looking for the
+# affected entries, which then expire with their TTL. The version is read before the
+# database, and bumped again once the write is committed, so a response built from
+# data being replaced is never stored under the current version.
+# With a per-process cache (locmem) the version is per worker too, so deployments with
+# several workers should point CACHE_ALIAS to a shared cache.
+
+CACHE_HEADER = "X-Cache"
+
+DEFAULT_CACHE_SETTINGS: dict = {
+    "CACHE_ALIAS": "default",  # None disables the cache
+    "TTL": 300,  # seconds
+}
+
+
+class FilmResponseCache:
+    KEY_PREFIX = "film-response:"
+    VERSION_KEY = KEY_PREFIX + "version"
+
+    def __init__(self, cache_alias: str | None, ttl: float) -> None:
+        self.cache_alias: str | None = cache_alias
+        self.ttl: float = ttl
+
+    @property
+    def cache(self) -> BaseCache | None:
+        return caches[self.cache_alias] if self.cache_alias else None
+
+    def version(self) -> int:
+        # Versions start from the clock, so a lost (evicted) version never goes back
+        # to a number used before
+        version: int | None = self.cache.get(self.VERSION_KEY)
+        if version is None:
+            self.cache.add(self.VERSION_KEY, time.time_ns(), timeout=None)
+            version = self.cache.get(self.VERSION_KEY, 0)
+        return version
+
+    async def aversion(self) -> int:
+        version: int | None = await self.cache.aget(self.VERSION_KEY)
+        if version is None:
+            await self.cache.aadd(self.VERSION_KEY, time.time_ns(), timeout=None)
+            version = await self.cache.aget(self.VERSION_KEY, 0)
+        return version
+
+    def key(self, version: int, kind: str, value: str) -> str:
+        return f"{self.KEY_PREFIX}{version}:{kind}:{value}"
+
+    def lookup(self, kind: str, value: str) -> tuple[str | None, dict | None]:
+        """Returns the key of the response under the current version, and its data"""
+        if self.cache is None:
+            return None, None
+        key: str = self.key(self.version(), kind, value)
+        return key, self.cache.get(key)
+
+    async def alookup(self, kind: str, value: str) -> tuple[str | None, dict | None]:
+        """Async version of lookup"""
+        if self.cache is None:
+            return None, None
+        key: str = self.key(await self.aversion(), kind, value)
+        return key, await self.cache.aget(key)
+
+    def hit(self, data: dict) -> Response:
+        response: Response = Response(data, status=status.HTTP_200_OK)
+        response[CACHE_HEADER] = "HIT"
+        return response
+
+    def store(self, key: str | None, response: Response) -> Response:
+        """Stores successful responses under the key returned by lookup"""
+        if key is not None:
+            if response.status_code == status.HTTP_200_OK:
+                self.cache.set(key, response.data, timeout=self.ttl)
+            response[CACHE_HEADER] = "MISS"
+        return response
+
+    async def astore(
+        self, key: str | None, response: HttpResponse, data: dict
+    ) -> HttpResponse:
+        """Async version of store, for plain Django responses of the given data"""
+        if key is not None:
+            if response.status_code == status.HTTP_200_OK:
+                await self.cache.aset(key, data, timeout=self.ttl)
+            response[CACHE_HEADER] = "MISS"
+        return response
+
+    def bump(self) -> None:
+        if self.cache is None:
+            return
+        try:
+            self.cache.incr(self.VERSION_KEY)
+        except ValueError:  # The version is not set (or was evicted)
+            self.cache.add(self.VERSION_KEY, time.time_ns(), timeout=None)
+
+    def invalidate(self) -> None:
+        """Invalidates every response now, and again once the write is committed"""
+        self.bump()
+        transaction.on_commit(self.bump)
+
+
+def build_cache() -> FilmResponseCache:
+    options: dict = {
+        **DEFAULT_CACHE_SETTINGS,
+        **getattr(settings, "FILM_RESPONSE_CACHE", {}),
+    }
+    return FilmResponseCache(cache_alias=options["CACHE_ALIAS"], ttl=options["TTL"])
+
+
+film_cache: FilmResponseCache = build_cache()
+
+
+def search_key(data: dict, params: dict) -> str:
+    """Hash of the validated filter criteria that are set, and the listing params"""
+    criteria: dict = {key: value for key, value in data.items() if is_set(value)}
+    canonical: str = json.dumps(
+        [criteria, params], sort_keys=True, default=str, separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
@@ -0,0 +1,47 @@
+import re
+import datetime
+from functools import lru_cache
+
+# Note.
+# Release date parsing shared by the film and film filter serializers and the bulk
+# importer. Dates are accepted as %Y, %Y-%m, %Y-%m-%d, %m-%Y and %d-%m-%Y: ISO dates,
+# most of them, go straight to date.fromisoformat, the others are matched against
+# patterns compiled once. Imports and filters repeat the same few strings (years,
+# common dates), so parsed strings are cached, only those short enough to be a date.
+
+DATE_FORMATS: list[tuple[str, re.Pattern]] = [
+    ("%Y", re.compile(r"\d{4}")),
+    ("%Y-%m", re.compile(r"\d{4}-\d{2}")),
+    ("%Y-%m-%d", re.compile(r"\d{4}-\d{2}-\d{2}")),
+    ("%m-%Y", re.compile(r"\d{2}-\d{4}")),
+    ("%d-%m-%Y", re.compile(r"\d{2}-\d{2}-\d{4}")),
+]
+ACCEPTED_FORMATS: str = ", ".join(date_format for date_format, _ in DATE_FORMATS)
+
+# fromisoformat also takes other ISO forms (20210101, 2021-W01-1), so only these
+ISO_DATE: re.Pattern = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}")
+
+CACHE_SIZE = 4096
+MAX_LENGTH = 10  # Of the accepted formats
+
+
+def parse_date(value: str) -> datetime.datetime | None:
+    """
+    The date of the string, None if it has none of the accepted formats. Raises
+    ValueError if it has one but is not a valid date (2021-02-30).
+    """
+    if len(value) > MAX_LENGTH:
+        return None
+    return parse_date_string(value)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_date_string(value: str) -> datetime.datetime | None:
+    """parse_date, cached"""
+    if ISO_DATE.fullmatch(value):
+        date: datetime.date = datetime.date.fromisoformat(value)
+        return datetime.datetime(date.year, date.month, date.day)
+    for date_format, pattern in DATE_FORMATS:
+        if pattern.fullmatch(value):
+            return datetime.datetime.strptime(value, date_format)
+    return None
@@ -0,0 +1,76 @@
+import numpy as np
+
+# Note.
+# The work of the processes of the recommendations pool (see recommendations.py): the
+# ridge regressions of the factors and the scoring of the best films. Pools started
+# with spawn or forkserver (the default on macOS and Windows, and on Linux from
+# Python 3.14) import the module of the functions they run in a new interpreter,
+# without Django set up, so this module only imports NumPy.
+
+GROUP_SIZE = 128  # films per group when searching the best films (see top_films)
+
+
+def solve_factors(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    residuals: np.ndarray,
+    fixed: np.ndarray,
+    regularization: float,
+) -> np.ndarray:
+    """
+    Factors of the rows of a CSR matrix of residuals, given the fixed factors of its
+    columns: one ridge regression per row, regularized by its number of ratings.
+    """
+    identity: np.ndarray = np.eye(fixed.shape[1])
+    factors: np.ndarray = np.zeros((len(indptr) - 1, fixed.shape[1]))
+    for row in range(len(indptr) - 1):
+        start, end = indptr[row], indptr[row + 1]
+        if start == end:
+            continue
+        rated: np.ndarray = fixed[indices[start:end]]
+        factors[row] = np.linalg.solve(
+            rated.T @ rated + regularization * (end - start) * identity,
+            rated.T @ residuals[start:end],
+        )
+    return factors
+
+
+def top_films(
+    user_factors: np.ndarray,
+    film_factors: np.ndarray,
+    film_biases: np.ndarray,
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    count: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (film columns, scores) of the count best films of each user, best first, leaving
+    out the films each user rated (CSR indptr and indices of the users' ratings).
+    Films come in groups of GROUP_SIZE, padded with films scoring -inf.
+    """
+    scores: np.ndarray = user_factors @ film_factors.T
+    scores += film_biases
+    rated: np.ndarray = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    scores[rated, indices] = -np.inf
+
+    # The best films are in the groups with the best maximums, so only those groups
+    # are partitioned, rather than every film
+    groups: np.ndarray = scores.reshape(len(scores), -1, GROUP_SIZE)
+    best_groups: np.ndarray = np.argpartition(
+        groups.max(axis=2), -min(count, groups.shape[1]), axis=1
+    )[:, -count:]
+    columns: np.ndarray = (
+        best_groups[:, :, None] * GROUP_SIZE + np.arange(GROUP_SIZE)
+    ).reshape(len(scores), -1)
+    scores = np.take_along_axis(groups, best_groups[:, :, None], axis=1).reshape(
+        len(scores), -1
+    )
+
+    count = min(count, scores.shape[1])
+    best: np.ndarray = np.argpartition(-scores, count - 1, axis=1)[:, :count]
+    best_scores: np.ndarray = np.take_along_axis(scores, best, axis=1)
+    order: np.ndarray = np.argsort(-best_scores, axis=1)
+    return (
+        np.take_along_axis(np.take_along_axis(columns, best, axis=1), order, axis=1),
+        np.take_along_axis(best_scores, order, axis=1),
+    )
@@ -0,0 +1,69 @@
+import datetime
+from django.db.models import Q, QuerySet
+
+from apps.users.search import get_search_backend
+
+# Note.
+# The film filter used to build one queryset per criterion and combine them with
+# union/intersection, which SQLite runs as several compound SELECTs over the whole
+# table. Here every criterion is compiled into a single Q expression instead, so the
+# filter is always one SQL query.
+
+
+def is_set(value) -> bool:
+    """Filter criteria are optional, and an empty string means not provided."""
+    return value is not None and not value == ""
+
+
+def to_date(value: datetime.datetime | datetime.date) -> datetime.date:
+    if type(value) is datetime.datetime:
+        return value.date()
+    return value
+
+
+def build_text_filter(data: dict) -> Q | None:
+    """OR of every text criterion present in data, or None if there is none."""
+    # Film name, director, cast and description are matched by the search backend
+    text_filter: Q | None = get_search_backend().filter(data)
+
+    genre: str | None = data.get("genre", None)
+    if is_set(genre):
+        condition: Q = Q(genre__icontains=genre)
+        text_filter = condition if text_filter is None else text_filter | condition
+
+    return text_filter
+
+
+def build_film_filter(data: dict) -> Q:
+    """
+    Compiles validated FilmFilterSerializer data into a single Q expression.
+
+    Text criteria are OR'ed, release and rating ranges are AND'ed with them.
+    """
+    film_filter: Q = Q()
+
+    text_filter: Q | None = build_text_filter(data)
+    if text_filter is not None:
+        film_filter &= text_filter
+
+    min_release = data.get("min_release", None)
+    if is_set(min_release):
+        film_filter &= Q(release__gte=to_date(min_release))
+    max_release = data.get("max_release", None)
+    if is_set(max_release):
+        film_filter &= Q(release__lte=to_date(max_release))
+
+    min_rating: int | None = data.get("min_rating", None)
+    if is_set(min_rating):
+        film_filter &= Q(avg_rating__gte=min_rating)
+    max_rating: int | None = data.get("max_rating", None)
+    if is_set(max_rating):
+        film_filter &= Q(avg_rating__lte=max_rating)
+
+    return film_filter
+
+
+def filter_films(queryset: QuerySet, data: dict) -> QuerySet:
+    """Applies the compiled filter, ordering by relevance when searching text."""
+    films: QuerySet = queryset.filter(build_film_filter(data))
+    return get_search_backend().rank(films, data)
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+# Note.
+# Password hashers with their cost read from settings (PASSWORD_HASHING), so it can
+# be tuned per deployment and lowered for tests. Their algorithm names are Django's,
+# so passwords hashed before keep verifying. Django rehashes a password when its user
+# logs in if it was hashed by another hasher than the first of PASSWORD_HASHERS, or
+# with another cost (must_update): changing either upgrades the stored passwords as
+# users log in. Argon2 needs the argon2-cffi package.
+
+DEFAULT_HASHING_SETTINGS: dict = {
+    "SCRYPT_WORK_FACTOR": 2**14,  # memory and time, 128 * work factor * block size
+    "SCRYPT_BLOCK_SIZE": 8,
+    "SCRYPT_PARALLELISM": 1,
+    "ARGON2_TIME_COST": 2,
+    "ARGON2_MEMORY_COST": 102400,  # KiB
+    "ARGON2_PARALLELISM": 8,
+    "PBKDF2_ITERATIONS": 600_000,
+}
+
+
+def hashing_settings() -> dict:
+    return {**DEFAULT_HASHING_SETTINGS, **getattr(settings, "PASSWORD_HASHING", {})}
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    @property
+    def work_factor(self) -> int:
+        return hashing_settings()["SCRYPT_WORK_FACTOR"]
+
+    @property
+    def block_size(self) -> int:
+        return hashing_settings()["SCRYPT_BLOCK_SIZE"]
+
+    @property
+    def parallelism(self) -> int:
+        return hashing_settings()["SCRYPT_PARALLELISM"]
+
+    @property
+    def maxmem(self) -> int:
+        # OpenSSL's default (32 MiB) only fits the default cost
+        return max(256 * self.work_factor * self.block_size, 32 * 1024 * 1024)
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    @property
+    def time_cost(self) -> int:
+        return hashing_settings()["ARGON2_TIME_COST"]
+
+    @property
+    def memory_cost(self) -> int:
+        return hashing_settings()["ARGON2_MEMORY_COST"]
+
+    @property
+    def parallelism(self) -> int:
+        return hashing_settings()["ARGON2_PARALLELISM"]
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self) -> int:
+        return hashing_settings()["PBKDF2_ITERATIONS"]
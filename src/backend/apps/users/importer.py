@@ -0,0 +1,305 @@
+import json
+import codecs
+from typing import IO, Any, Iterable, Iterator
+from django.db import transaction
+from rest_framework import serializers
+
+from apps.users import leaderboards
+from apps.users.caching import film_cache
+from apps.users.models import Director, Actor, Film
+from apps.users.resolvers import resolve_or_create
+from apps.users.search import get_search_backend
+from apps.users.serializers import FilmSerializer, DirectorSerializer, ActorSerializer
+
+# Note.
+# Bulk film import. Films are read as a stream (a JSON array, optionally wrapped as
+# {"films": [...]} like utils/films.json, or JSON Lines) and written in batches. For each
+# batch, director and actor names are resolved with one IN query each, the missing ones
+# are bulk created, and films and cast rows are bulk inserted, all in one transaction.
+# Invalid rows are reported and skipped without aborting the import, JSON Lines that
+# are not valid JSON included. A JSON array that is not valid JSON aborts it, as soon
+# as the invalid item is read.
+# Bulk writes do not send model signals, so the search index, the cached film
+# responses and the leaderboards of the genres films move between are updated
+# explicitly.
+
+DEFAULT_BATCH_SIZE = 500
+READ_CHUNK_SIZE = 64 * 1024
+
+FILM_FIELDS: list[str] = [
+    "release",
+    "genre",
+    "description",
+    "duration",
+    "image_url",
+    "director_id",
+]
+
+
+class JSONStreamReader:
+    """Decodes the values of a JSON document read from a stream, one at a time"""
+
+    def __init__(self, stream: IO) -> None:
+        self.stream: IO = stream
+        self.utf8: codecs.IncrementalDecoder = codecs.getincrementaldecoder("utf-8")()
+        self.decoder: json.JSONDecoder = json.JSONDecoder()
+        self.buffer: str = ""
+        self.position: int = 0
+        self.exhausted: bool = False
+
+    def read(self) -> bool:
+        """Appends the next chunk of the stream to the buffer, False at its end"""
+        if self.exhausted:
+            return False
+        chunk: str | bytes = self.stream.read(READ_CHUNK_SIZE)
+        self.exhausted = not chunk
+        if isinstance(chunk, bytes):
+            # The bytes of a character split between chunks wait for the next one
+            chunk = self.utf8.decode(chunk, final=self.exhausted)
+        self.buffer = self.buffer[self.position :] + chunk
+        self.position = 0
+        return not self.exhausted
+
+    def peek(self) -> str:
+        """The next character that is not whitespace, "" at the end of the stream"""
+        while True:
+            while (
+                self.position < len(self.buffer)
+                and self.buffer[self.position].isspace()
+            ):
+                self.position += 1
+            if self.position < len(self.buffer) or not self.read():
+                return self.buffer[self.position : self.position + 1]
+
+    def expect(self, characters: str) -> str:
+        """Consumes the next character, which must be one of characters"""
+        character: str = self.peek()
+        if character == "" or character not in characters:
+            raise ValueError(f"Expected one of {characters} in the JSON document.")
+        self.position += 1
+        return character
+
+    def truncated(self, error: json.JSONDecodeError) -> bool:
+        """
+        Whether the error may come from a value cut by the end of the buffer. A valid
+        value only fails where it is cut: in a string, or in a literal, a number or an
+        escape sequence, none of them longer than 6 characters.
+        """
+        return (
+            error.msg.startswith("Unterminated string")
+            or error.pos >= len(self.buffer) - 6
+        )
+
+    def value(self) -> Any:
+        """Decodes the next value, reading only as much of the stream as it needs"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError as error:
+                # Invalid values fail without reading the rest of the stream
+                if not self.truncated(error) or not self.read():
+                    raise ValueError("Invalid JSON value.")
+                continue
+            if end == len(self.buffer) and self.read():
+                # A number at the end of the buffer may continue in the next chunk
+                continue
+            self.position = end
+            return value
+
+
+def iter_json_array(stream: IO) -> Iterator[dict]:
+    """
+    Yields the films of the stream, a JSON array or an object with a "films" array,
+    decoding one item at a time so that the whole document is never held in memory.
+    """
+    reader: JSONStreamReader = JSONStreamReader(stream)
+    if reader.peek() == "":
+        return
+    if reader.expect("[{") == "{":
+        # Skip the other members of the object up to the films
+        while True:
+            key: Any = reader.value()
+            reader.expect(":")
+            if key == "films":
+                break
+            reader.value()
+            if reader.expect(",}") == "}":
+                raise ValueError("The JSON object has no films.")
+        reader.expect("[")
+
+    if reader.peek() == "]":
+        return
+    while True:
+        yield reader.value()
+        if reader.expect(",]") == "]":
+            return
+
+
+class InvalidLine:
+    """A JSON Lines line that is not valid JSON, reported as an invalid row"""
+
+    def __init__(self, line_number: int) -> None:
+        self.line_number: int = line_number
+
+
+def iter_json_lines(stream: IO) -> Iterator[dict | InvalidLine]:
+    for line_number, line in enumerate(stream, start=1):
+        try:
+            if isinstance(line, bytes):
+                line = line.decode("utf-8")
+            if line.strip():
+                yield json.loads(line)
+        except ValueError:  # Invalid JSON or UTF-8
+            yield InvalidLine(line_number)
+
+
+def batched(rows: Iterable, batch_size: int) -> Iterator[list]:
+    batch: list = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class FilmImporter:
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        self.batch_size: int = batch_size
+        self.film_serializer: FilmSerializer = FilmSerializer()
+        self.director_serializer: DirectorSerializer = DirectorSerializer()
+        self.actor_serializer: ActorSerializer = ActorSerializer()
+        self.seen_names: set[str] = set()
+        self.created: int = 0
+        self.updated: int = 0
+        self.errors: list[dict] = []
+
+    def report(self) -> dict:
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "errors": self.errors,
+        }
+
+    def import_rows(self, rows: Iterable[dict]) -> dict:
+        row_number: int = 0
+        for batch in batched(rows, self.batch_size):
+            valid_rows: list[dict] = []
+            for row in batch:
+                row_number += 1
+                try:
+                    valid_rows.append(self.validate_row(row))
+                except serializers.ValidationError as error:
+                    self.add_error(row_number, row, error.detail)
+                except (TypeError, ValueError):
+                    self.add_error(row_number, row, {"film": ["Invalid film data."]})
+            if valid_rows:
+                self.import_batch(valid_rows)
+        return self.report()
+
+    def add_error(self, row_number: int, row: dict, detail: dict | list) -> None:
+        name: str | None = row.get("name", None) if type(row) is dict else None
+        self.errors.append({"row": row_number, "name": name, "errors": detail})
+
+    def validate_row(self, row: dict) -> dict:
+        """Validates a film without touching the database"""
+        if isinstance(row, InvalidLine):
+            raise serializers.ValidationError(
+                {"film": [f"Invalid JSON on line {row.line_number}."]}
+            )
+        if type(row) is not dict:
+            raise serializers.ValidationError({"film": ["Film must be an object."]})
+
+        validate: FilmSerializer = self.film_serializer
+        data: dict = {
+            "name": validate.validate_name(row.get("name", None)),
+            "release": validate.validate_release(row.get("release", None)),
+            "genre": validate.validate_genre(row.get("genre", None)),
+            "description": validate.validate_description(row.get("description", None)),
+            "duration": validate.validate_duration(row.get("duration", None)),
+            "image_url": None,
+        }
+        image_url: str | None = row.get("image_url", None)
+        if image_url is not None and not image_url == "":
+            data["image_url"] = validate.validate_image_url(image_url)
+
+        data["director"] = self.director_serializer.validate_name(
+            row.get("director", None)
+        )
+        cast: list[str] | None = row.get("cast", None)
+        if type(cast) is not list or any(type(name) is not str for name in cast):
+            raise serializers.ValidationError(
+                {"cast": ["Cast must be a list of names (list[str])."]}
+            )
+        data["cast"] = [self.actor_serializer.validate_name(name) for name in cast]
+
+        if data["name"] in self.seen_names:
+            raise serializers.ValidationError(
+                {"name": ["Film is repeated in the import."]}
+            )
+        self.seen_names.add(data["name"])
+        return data
+
+    def resolve(self, model: type, names: set[str]) -> dict[str, int]:
+        """Maps names to ids with one IN query, bulk creating the missing ones"""
+        instances: dict = resolve_or_create(model, list(names))
+        return {name: instance.id for name, instance in instances.items()}
+
+    def import_batch(self, rows: list[dict]) -> None:
+        with transaction.atomic():
+            director_ids: dict[str, int] = self.resolve(
+                Director, {row["director"] for row in rows}
+            )
+            actor_ids: dict[str, int] = self.resolve(
+                Actor, {name for row in rows for name in row["cast"]}
+            )
+
+            existing: dict[str, Film] = Film.objects.in_bulk(
+                [row["name"] for row in rows], field_name="name"
+            )
+            new_films: list[Film] = []
+            updated_films: list[Film] = []
+            moved_genres: set[str] = set()  # Left or entered by an updated film
+            for row in rows:
+                film: Film | None = existing.get(row["name"], None)
+                if film is None:
+                    film = Film(name=row["name"])
+                    new_films.append(film)
+                else:
+                    updated_films.append(film)
+                    if film.genre != row["genre"]:
+                        moved_genres.update([film.genre, row["genre"]])
+                film.release = row["release"]
+                film.genre = row["genre"]
+                film.description = row["description"]
+                film.duration = row["duration"]
+                film.image_url = row["image_url"]
+                film.director_id_id = director_ids[row["director"]]
+                row["film"] = film
+
+            Film.objects.bulk_create(new_films)
+            Film.objects.bulk_update(updated_films, FILM_FIELDS)
+            if moved_genres:
+                leaderboards.rank_genres(moved_genres)
+
+            # Replace the cast of every film of the batch
+            through: type = Film.cast.through
+            if updated_films:
+                through.objects.filter(
+                    film_id__in=[film.id for film in updated_films]
+                ).delete()
+            through.objects.bulk_create(
+                [
+                    through(film_id=row["film"].id, actor_id=actor_ids[name])
+                    for row in rows
+                    for name in dict.fromkeys(row["cast"])
+                ]
+            )
+
+            get_search_backend().index_films([row["film"].id for row in rows])
+            film_cache.invalidate()
+
+        self.created += len(new_films)
+        self.updated += len(updated_films)
@@ -0,0 +1,149 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q, QuerySet
+
+from apps.users.models import User, Film, Review, LeaderboardFilm
+
+# Note.
+# Top rated films of every genre of Film.GENRE_CHOICES, materialized in LeaderboardFilm
+# so that a leaderboard is a range of the (genre, rank) index rather than a scan of the
+# films of the genre. Films are ranked as the film search orders them by rating (best
+# average rating, newest film first among equals), among the films with reviews, and
+# each genre keeps its SIZE best.
+# Leaderboards follow the rating aggregates (ratings.py): once the aggregates of a
+# film change, refresh_film ranks its genre again, but only when the film is on the
+# leaderboard or now enters it. Most reviews are of films that are neither, and cost
+# two reads. Ranking a genre again reads its SIZE best films from the avg_rating
+# index and rewrites its rows.
+# Genres are ranked one transaction at a time: SQLite has a single writer, PostgreSQL
+# takes an advisory lock per genre. Otherwise both deletes would see the old rows, and
+# the second insert would fail on the unique ranks of the first.
+
+DEFAULT_LEADERBOARD_SETTINGS: dict = {
+    "SIZE": 100,  # films per genre
+}
+
+
+def leaderboard_settings() -> dict:
+    return {
+        **DEFAULT_LEADERBOARD_SETTINGS,
+        **getattr(settings, "LEADERBOARDS", {}),
+    }
+
+
+def column(model: type, name: str) -> str:
+    return connection.ops.quote_name(model._meta.get_field(name).column)
+
+
+def lock_genre(genre: str) -> None:
+    """Waits for the other transactions ranking the genre, until this one ends"""
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(hashtext(%s))", [f"leaderboard {genre}"]
+            )
+
+
+def rank_genre(genre: str) -> None:
+    """Ranks the best films of the genre again, replacing its leaderboard"""
+    table: str = connection.ops.quote_name(LeaderboardFilm._meta.db_table)
+    films: str = connection.ops.quote_name(Film._meta.db_table)
+    pk: str = column(Film, "id")
+    genre_column: str = column(Film, "genre")
+    avg_rating: str = column(Film, "avg_rating")
+    columns: str = ", ".join(
+        column(LeaderboardFilm, name) for name in ["film_id", "genre", "rank"]
+    )
+    # The lock lasts until the end of the transaction, of the caller's if any (no
+    # savepoint, which would cost two queries of every review that changes a genre)
+    with transaction.atomic(savepoint=False):
+        lock_genre(genre)
+        LeaderboardFilm.objects.filter(genre=genre).delete()
+        # Numbered once the best films are read from the index, rather than
+        # numbering every film of the genre
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) "
+                f"SELECT {pk}, {genre_column}, "
+                f"ROW_NUMBER() OVER (ORDER BY {avg_rating} DESC, {pk} DESC) - 1 "
+                f"FROM (SELECT {pk}, {genre_column}, {avg_rating} FROM {films} "
+                f"WHERE {genre_column} = %s AND {column(Film, 'review_count')} > 0 "
+                f"ORDER BY {avg_rating} DESC, {pk} DESC LIMIT %s) AS best",
+                [genre, leaderboard_settings()["SIZE"]],
+            )
+
+
+def rank_genres(genres: set[str]) -> None:
+    """
+    Ranks the genres again at once, for films moved between them: the rows of every
+    genre are deleted before any is ranked, a film is listed once
+    """
+    genres = genres & set(Film.GENRE_CHOICES)
+    with transaction.atomic(savepoint=False):
+        # Always locked in the same order
+        for genre in sorted(genres):
+            lock_genre(genre)
+        LeaderboardFilm.objects.filter(genre__in=genres).delete()
+        for genre in sorted(genres):
+            rank_genre(genre)
+
+
+def refresh_film(film_id: int | None) -> None:
+    """
+    Ranks the genres of the film again if its new aggregates change their
+    leaderboards: the genre it is listed in, and its genre if it now enters it.
+    """
+    film: dict | None = (
+        Film.objects.filter(pk=film_id)
+        .values("id", "genre", "avg_rating", "review_count")
+        .first()
+    )
+    if film is None:
+        return
+
+    # Two plain indexed reads, compiling a single read with subqueries takes longer
+    # than running both
+    size: int = leaderboard_settings()["SIZE"]
+    rows: QuerySet = LeaderboardFilm.objects.filter(
+        Q(film_id=film_id) | Q(genre=film["genre"], rank=size - 1)
+    ).values("film_id", "genre", "rank", "film_id__avg_rating")
+    # The genre it is listed in first: when its genre changed, its row must be gone
+    # before it enters the leaderboard of the new one
+    genres: list[str] = []
+    last: tuple | None = None  # Of the leaderboard of its genre, if it is full
+    for row in rows:
+        if row["film_id"] == film_id:
+            genres.append(row["genre"])
+        if row["genre"] == film["genre"] and row["rank"] == size - 1:
+            last = (row["film_id__avg_rating"], row["film_id"])
+
+    if film["review_count"] > 0 and film["genre"] in Film.GENRE_CHOICES:
+        entering: bool = last is None or (film["avg_rating"], film["id"]) > last
+        if entering and film["genre"] not in genres:
+            genres.append(film["genre"])
+    for genre in genres:
+        rank_genre(genre)
+
+
+def remove_user_reviews(user: User) -> None:
+    """
+    Ranks again the genres of the films the user reviewed, once the ratings of the
+    reviews are removed and before the reviews are deleted
+    """
+    genres: set[str] = set(
+        Film.objects.filter(
+            id__in=Review.objects.filter(user_id=user).values("film_id")
+        )
+        .values_list("genre", flat=True)
+        .distinct()
+    )
+    for genre in genres & set(Film.GENRE_CHOICES):
+        rank_genre(genre)
+
+
+def rebuild_leaderboards() -> int:
+    """Ranks every genre again. Returns the films listed."""
+    LeaderboardFilm.objects.all().delete()
+    for genre in Film.GENRE_CHOICES:
+        rank_genre(genre)
+    return LeaderboardFilm.objects.count()
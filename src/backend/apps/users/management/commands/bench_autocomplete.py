@@ -0,0 +1,158 @@
+import random
+import tracemalloc
+from time import perf_counter
+from typing import Callable
+from django.core.management.base import BaseCommand, CommandParser
+
+from apps.users.autocomplete import AutocompleteIndex, PrefixIndex, Entry, normalize
+
+# Note.
+# Lookups of the autocomplete prefix index on synthetic names (made up words, a few per
+# film name, two per person, popularity with a long tail), without any database: the
+# index is loaded from the generated rows. Then the cost of the updates sent by the
+# signals, and the results of a sample of prefixes checked against a full scan.
+
+SYLLABLES: list[str] = [
+    "ka", "lo", "mi", "ran", "te", "su", "bel", "dor", "an", "vi", "nor", "e",
+    "sha", "tu", "gra", "o", "pel", "quin", "ro", "zel", "ma", "ther", "is", "cor",
+]  # fmt: skip
+
+
+def percentile(timings: list[float], fraction: float) -> float:
+    ordered: list[float] = sorted(timings)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks autocomplete lookups and updates of the in-memory prefix index on "
+        "synthetic film, director and actor names."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--names", type=int, default=1_000_000)
+        parser.add_argument("--words", type=int, default=20_000)
+        parser.add_argument("--lookups", type=int, default=20_000)
+        parser.add_argument("--updates", type=int, default=2_000)
+        parser.add_argument("--checks", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--memory", action="store_true", help="trace the memory (slower loading)"
+        )
+
+    def rows(self, options: dict, rng: random.Random) -> list[tuple]:
+        words: list[str] = list(
+            dict.fromkeys(
+                "".join(rng.choices(SYLLABLES, k=rng.randint(1, 4))).capitalize()
+                for _ in range(options["words"])
+            )
+        )
+        rows: list[tuple] = []
+        for id in range(options["names"]):
+            kind: str = rng.choices(["film", "director", "actor"], [6, 1, 3])[0]
+            count: int = rng.randint(1, 4) if kind == "film" else 2
+            name: str = " ".join(rng.choices(words, k=count))
+            if kind == "film" and rng.random() < 0.2:
+                name = "The " + name
+            rows.append((kind, id, name, int(rng.paretovariate(1.2)) - 1))
+        return rows
+
+    def measure(self, call: Callable[[], object], count: int) -> list[float]:
+        timings: list[float] = []
+        for _ in range(count):
+            start: float = perf_counter()
+            call()
+            timings.append(perf_counter() - start)
+        return timings
+
+    def report(self, label: str, timings: list[float]) -> None:
+        self.stdout.write(
+            f"{label:<24} p50 {percentile(timings, 0.5) * 1000:7.3f}ms | "
+            f"p99 {percentile(timings, 0.99) * 1000:7.3f}ms | "
+            f"max {max(timings) * 1000:7.3f}ms"
+        )
+
+    def handle(self, *args, **options) -> None:
+        rng: random.Random = random.Random(options["seed"])
+        rows: list[tuple] = self.rows(options, rng)
+
+        if options["memory"]:
+            tracemalloc.start()
+        start: float = perf_counter()
+        index: PrefixIndex = PrefixIndex(results=20)
+        index.load(rows)
+        self.stdout.write(
+            f"Loaded {len(index)} names ({len(index.keys)} keys, {len(index.top)} "
+            f"kept prefixes) in {perf_counter() - start:.1f}s"
+        )
+        if options["memory"]:
+            memory: int = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            self.stdout.write(f"Index memory {memory / 2**20:.0f}MiB")
+
+        autocomplete: AutocompleteIndex = AutocompleteIndex(10, 20, max_age=None)
+        autocomplete.index = index
+        entries: list[Entry] = [
+            entry for entries in index.by_kind.values() for entry in entries.values()
+        ]
+        prefixes: list[str] = [
+            normalize(key[: rng.randint(1, min(len(key), 8))])
+            for key in (rng.choice(rng.choice(entries).keys()) for _ in range(10_000))
+        ]
+        # Short prefixes on their own too, the largest ranges of the index
+        for length in (1, 2, 3):
+            short: list[str] = [key[:length] for key in prefixes if len(key) >= length]
+            timings: list[float] = self.measure(
+                lambda: autocomplete.search(rng.choice(short)), options["lookups"] // 4
+            )
+            self.report(f"Lookup, {length} characters", timings)
+        timings = self.measure(
+            lambda: autocomplete.search(rng.choice(prefixes)), options["lookups"]
+        )
+        self.report("Lookup, 1 to 8 characters", timings)
+
+        next_id: int = len(rows)
+
+        def add() -> None:
+            nonlocal next_id
+            next_id += 1
+            name: str = " ".join(rng.choice(entries).name.split(" ")[-2:])
+            index.add("film", next_id, name, int(rng.paretovariate(1.2)) - 1)
+
+        def rename() -> None:
+            entry: Entry = rng.choice(entries)
+            index.rename(entry.kind, entry.id, entry.name + " II")
+
+        def review() -> None:
+            entry: Entry = rng.choice(entries)
+            index.add_popularity(entry.kind, entry.id, rng.choice([1, 1, 1, -1]))
+
+        def remove() -> None:
+            entry: Entry = entries.pop(rng.randrange(len(entries)))
+            index.remove(entry.kind, entry.id)
+
+        updates: dict[str, Callable[[], None]] = {
+            "add": add,
+            "rename": rename,
+            "review": review,
+            "remove": remove,
+        }
+        for name, update in updates.items():
+            self.report(f"Update, {name}", self.measure(update, options["updates"]))
+        # A key starts with the prefix when the name has it at the start of a word
+        names: list[tuple[str, Entry]] = [
+            (" " + normalize(entry.name), entry)
+            for entries in index.by_kind.values()
+            for entry in entries.values()
+        ]
+
+        mismatches: int = 0
+        for prefix in rng.sample(prefixes, min(options["checks"], len(prefixes))):
+            expected: list[Entry] = sorted(
+                (entry for name, entry in names if " " + prefix in name),
+                key=Entry.rank,
+            )[: index.results]
+            mismatches += index.search(prefix) != expected
+        if mismatches:
+            self.stderr.write(f"{mismatches} prefixes with mismatching results")
+        self.stdout.write(f"Checked {options['checks']} prefixes against a full scan")
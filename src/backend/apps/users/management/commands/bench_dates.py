@@ -0,0 +1,95 @@
+import re
+import random
+import datetime
+from time import perf_counter
+from typing import Callable
+from django.core.management.base import BaseCommand, CommandParser
+
+from apps.users.dates import parse_date, parse_date_string
+from apps.users.importer import FilmImporter
+from apps.users.models import Film
+
+# Note.
+# Release date parsing over the rows of a large import: the previous parsing (the
+# patterns of every format matched on every call) against the shared parse_date, then
+# the whole row validation of the importer with it. Rows are generated, mostly with
+# ISO dates, and not written to the database.
+
+
+def legacy_parse_date(value: str) -> datetime.datetime | None:
+    """Previous parsing of the release date validators"""
+    patterns: dict[str, str] = {
+        "%Y": r"^\d{4}$",
+        "%Y-%m": r"^\d{4}-\d{2}$",
+        "%Y-%m-%d": r"^\d{4}-\d{2}-\d{2}$",
+        "%m-%Y": r"^\d{2}-\d{4}$",
+        "%d-%m-%Y": r"^\d{2}-\d{2}-\d{4}$",
+    }
+    for date_format, pattern in patterns.items():
+        if re.match(pattern, value):
+            return datetime.datetime.strptime(value, date_format)
+    return None
+
+
+def release(rng: random.Random) -> str:
+    date: datetime.date = datetime.date(1920, 1, 1) + datetime.timedelta(
+        days=rng.randrange(105 * 365)
+    )
+    formats: list[str] = ["%Y-%m-%d", "%Y", "%Y-%m", "%d-%m-%Y"]
+    return date.strftime(rng.choices(formats, weights=[85, 10, 3, 2])[0])
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks release date parsing, before and after the shared parser, and the "
+        "validation of generated import rows."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def time(self, parse: Callable[[str], datetime.datetime | None], values) -> float:
+        start: float = perf_counter()
+        for value in values:
+            parse(value)
+        return perf_counter() - start
+
+    def handle(self, *args, **options) -> None:
+        rng: random.Random = random.Random(options["seed"])
+        rows: list[dict] = [
+            {
+                "name": f"Bench film {number}",
+                "release": release(rng),
+                "genre": rng.choice(Film.GENRE_CHOICES),
+                "description": "benchmark film",
+                "duration": 120,
+                "director": f"Bench Director {number % 1000}",
+                "cast": [f"Bench Actor {rng.randrange(10_000)}" for _ in range(3)],
+            }
+            for number in range(options["rows"])
+        ]
+        values: list[str] = [row["release"] for row in rows]
+        self.stdout.write(
+            f"{len(rows)} rows, {len(set(values))} distinct release dates"
+        )
+
+        legacy: float = self.time(legacy_parse_date, values)
+        parse_date_string.cache_clear()
+        shared: float = self.time(parse_date, values)
+        self.stdout.write(f"legacy parsing  {legacy:>7.2f}s")
+        self.stdout.write(
+            f"shared parsing  {shared:>7.2f}s  {legacy / shared:.1f}x "
+            f"({parse_date_string.cache_info().hits} cache hits)"
+        )
+
+        importer: FilmImporter = FilmImporter()
+        start: float = perf_counter()
+        for row in rows:
+            importer.validate_row(row)
+        validation: float = perf_counter() - start
+        self.stdout.write(
+            f"row validation  {validation:>7.2f}s  "
+            f"{len(rows) / validation:,.0f} rows/s, dates were "
+            f"{legacy / (validation - shared + legacy):.0%} of it before"
+        )
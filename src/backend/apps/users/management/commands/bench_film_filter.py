@@ -0,0 +1,193 @@
+import random
+import datetime
+from time import perf_counter
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import transaction, connection
+from django.db.models import QuerySet, Value, Avg, Case, When
+from django.test.utils import CaptureQueriesContext
+
+from apps.users import ratings
+from apps.users.models import User, Director, Actor, Film, Review
+from apps.users.filters import filter_films, is_set
+from apps.users.search import get_search_backend
+
+# Filter combinations used in the benchmark (validated FilmFilterSerializer data)
+BENCH_FILTERS: list[dict] = [
+    {},
+    {"film_name": "Film 12"},
+    {"director_name": "Director 3", "actor_name": "Actor 42"},
+    {"genre": "Drama", "min_rating": 6},
+    {
+        "film_name": "Film 7",
+        "description": "plot",
+        "min_release": datetime.datetime(2000, 1, 1),
+        "max_release": datetime.datetime(2010, 12, 31),
+        "min_rating": 3,
+        "max_rating": 8,
+    },
+]
+
+
+def legacy_film_filter(queryset: QuerySet, data: dict) -> QuerySet:
+    """Previous query plan: one queryset per criterion, combined with set operations"""
+    string_queryset: QuerySet = Film.objects.none()
+    use_string_filter: bool = False
+    lookups: list[tuple[str, str]] = [
+        ("film_name", "name__icontains"),
+        ("director_name", "director_id__name__icontains"),
+        ("actor_name", "cast__name__icontains"),
+        ("genre", "genre__icontains"),
+        ("description", "description__icontains"),
+    ]
+    for key, lookup in lookups:
+        if is_set(data.get(key, None)):
+            use_string_filter = True
+            string_queryset = string_queryset.union(
+                queryset.filter(**{lookup: data[key]})
+            )
+    if not use_string_filter:
+        string_queryset = queryset.all()
+
+    release_queryset: QuerySet = queryset.all()
+    if is_set(data.get("min_release", None)):
+        release_queryset = release_queryset.filter(
+            release__gte=data["min_release"].date()
+        )
+    if is_set(data.get("max_release", None)):
+        release_queryset = release_queryset.filter(
+            release__lte=data["max_release"].date()
+        )
+
+    rating_queryset: QuerySet = queryset.all()
+    if is_set(data.get("min_rating", None)) or is_set(data.get("max_rating", None)):
+        rating_queryset = rating_queryset.annotate(
+            reviews_avg_rating=Avg(
+                Case(
+                    When(reviews__rating__isnull=True, then=Value(0)),
+                    default="reviews__rating",
+                )
+            )
+        )
+    if is_set(data.get("min_rating", None)):
+        rating_queryset = rating_queryset.filter(
+            reviews_avg_rating__gte=data["min_rating"]
+        )
+    if is_set(data.get("max_rating", None)):
+        rating_queryset = rating_queryset.filter(
+            reviews_avg_rating__lte=data["max_rating"]
+        )
+
+    final_queryset: QuerySet = queryset.all()
+    final_queryset = final_queryset.intersection(string_queryset)
+    final_queryset = final_queryset.intersection(release_queryset)
+    final_queryset = final_queryset.intersection(
+        queryset.filter(id__in=rating_queryset)
+    )
+    return queryset.for_listing().filter(id__in=final_queryset.values("id"))
+
+
+def compiled_film_filter(queryset: QuerySet, data: dict) -> QuerySet:
+    return filter_films(queryset.for_listing(), data)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the compiled film filter against the previous union/intersection "
+        "query plan on a synthetic catalog. All data is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--films", type=int, default=100_000)
+        parser.add_argument("--reviews", type=int, default=200_000)
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def populate(self, n_films: int, n_reviews: int, rng: random.Random) -> None:
+        directors: list[Director] = Director.objects.bulk_create(
+            [Director(name=f"Director {i}") for i in range(max(n_films // 20, 1))]
+        )
+        actors: list[Actor] = Actor.objects.bulk_create(
+            [Actor(name=f"Actor {i}") for i in range(max(n_films // 5, 1))]
+        )
+        films: list[Film] = Film.objects.bulk_create(
+            [
+                Film(
+                    name=f"Film {i}",
+                    release=datetime.date(rng.randint(1950, 2023), 1, 1),
+                    genre=rng.choice(Film.GENRE_CHOICES),
+                    description=f"plot of film {i}",
+                    duration=rng.randint(80, 180),
+                    director_id=rng.choice(directors),
+                )
+                for i in range(n_films)
+            ],
+            batch_size=5000,
+        )
+        through: type = Film.cast.through
+        through.objects.bulk_create(
+            [
+                through(film_id=film.id, actor_id=actor.id)
+                for film in films
+                for actor in rng.sample(actors, min(4, len(actors)))
+            ],
+            batch_size=5000,
+        )
+        users: list[User] = User.objects.bulk_create(
+            [
+                User(username=f"bench{i}", email=f"bench{i}@bench.com")
+                for i in range(max(n_reviews // n_films, 1) * 2)
+            ]
+        )
+        pairs: set[tuple[int, int]] = set()
+        while len(pairs) < min(n_reviews, len(users) * n_films):
+            pairs.add((rng.choice(users).id, rng.choice(films).id))
+        Review.objects.bulk_create(
+            [
+                Review(rating=rng.randint(1, 10), user_id_id=user, film_id_id=film)
+                for user, film in pairs
+            ],
+            batch_size=5000,
+        )
+        ratings.rebuild_ratings()
+        get_search_backend().rebuild()
+
+    def measure(self, build, data: dict, repeat: int) -> tuple[float, int, set[int]]:
+        timings: list[float] = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                start: float = perf_counter()
+                ids: set[int] = {film.id for film in build(Film.objects.all(), data)}
+                timings.append(perf_counter() - start)
+        return min(timings), len(queries), ids
+
+    def handle(self, *args, **options) -> None:
+        rng: random.Random = random.Random(options["seed"])
+        try:
+            with transaction.atomic():
+                start: float = perf_counter()
+                self.populate(options["films"], options["reviews"], rng)
+                self.stdout.write(
+                    f"Populated {options['films']} films in "
+                    f"{perf_counter() - start:.1f}s"
+                )
+
+                for data in BENCH_FILTERS:
+                    legacy = self.measure(legacy_film_filter, data, options["repeat"])
+                    compiled = self.measure(
+                        compiled_film_filter, data, options["repeat"]
+                    )
+                    if legacy[2] != compiled[2]:
+                        self.stderr.write(f"Result mismatch for filter {data}")
+                    self.stdout.write(
+                        f"{str(data):<60.60} {len(compiled[2]):>7} films | "
+                        f"legacy {legacy[0] * 1000:9.1f}ms ({legacy[1]} queries) | "
+                        f"compiled {compiled[0] * 1000:9.1f}ms "
+                        f"({compiled[1]} queries)"
+                    )
+                raise Rollback()
+        except Rollback:
+            pass
@@ -0,0 +1,114 @@
+import random
+from time import perf_counter
+from typing import Callable
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import transaction, connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.users import leaderboards, ratings
+from apps.users.filters import filter_films
+from apps.users.management.commands.bench_film_filter import Command as FilterBench
+from apps.users.models import User, Film, Review, LeaderboardFilm
+from apps.users.pagination import FILM_ORDERINGS
+
+# Note.
+# Top rated films of every genre, as the film search returns them (genre filter,
+# ordered by rating, the films without reviews left out by a minimum rating of 1)
+# against the leaderboards, on the synthetic catalog of the film filter benchmark.
+# Then the cost of keeping the leaderboards up to date: the refresh after each of a
+# batch of new reviews. All data is rolled back afterwards.
+
+
+def filtered_top_films(genre: str, limit: int) -> list[int]:
+    films = filter_films(Film.objects.all(), {"genre": genre, "min_rating": 1})
+    return [film.id for film in films.order_by(*FILM_ORDERINGS["rating"])[:limit]]
+
+
+def leaderboard_top_films(genre: str, limit: int) -> list[int]:
+    films = LeaderboardFilm.objects.for_listing().filter(genre=genre)[:limit]
+    return [film.film_id.id for film in films]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the top rated films of every genre read from the leaderboards "
+        "against the film search, and the refresh of the leaderboards after a review, "
+        "on a synthetic catalog. All data is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--films", type=int, default=100_000)
+        parser.add_argument("--reviews", type=int, default=200_000)
+        parser.add_argument("--limit", type=int, default=100)
+        parser.add_argument("--writes", type=int, default=500)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def measure(
+        self, read: Callable[[str, int], list[int]], genre: str, options: dict
+    ) -> tuple[float, int, list[int]]:
+        timings: list[float] = []
+        for _ in range(options["repeat"]):
+            with CaptureQueriesContext(connection) as queries:
+                start: float = perf_counter()
+                ids: list[int] = read(genre, options["limit"])
+                timings.append(perf_counter() - start)
+        return min(timings), len(queries), ids
+
+    def measure_refresh(self, writes: int, rng: random.Random) -> tuple[float, int]:
+        """
+        Mean time of the refresh after a new review, and the number of reviews after
+        which a genre was ranked again
+        """
+        user: User = User.objects.create(username="leaderboards", email="lb@bench.com")
+        films: list[int] = list(Film.objects.values_list("id", flat=True))
+        elapsed: float = 0
+        ranked: int = 0
+        for film_id in rng.sample(films, writes):
+            review: Review = Review.objects.create(
+                rating=rng.randint(1, 10), user_id=user, film_id_id=film_id
+            )
+            ratings.add_review(review)
+            with CaptureQueriesContext(connection) as queries:
+                start: float = perf_counter()
+                leaderboards.refresh_film(film_id)
+                elapsed += perf_counter() - start
+            ranked += len(queries) > 1
+        return elapsed / max(writes, 1), ranked
+
+    def handle(self, *args, **options) -> None:
+        rng: random.Random = random.Random(options["seed"])
+        try:
+            with transaction.atomic():
+                start: float = perf_counter()
+                FilterBench().populate(options["films"], options["reviews"], rng)
+                leaderboards.rebuild_leaderboards()
+                self.stdout.write(
+                    f"Populated {options['films']} films in "
+                    f"{perf_counter() - start:.1f}s"
+                )
+
+                for genre in Film.GENRE_CHOICES:
+                    search = self.measure(filtered_top_films, genre, options)
+                    board = self.measure(leaderboard_top_films, genre, options)
+                    if search[2] != board[2]:
+                        self.stderr.write(f"Result mismatch for genre {genre}")
+                    self.stdout.write(
+                        f"{genre:<12} {len(board[2]):>4} films | "
+                        f"search {search[0] * 1000:8.2f}ms ({search[1]} queries) | "
+                        f"leaderboard {board[0] * 1000:8.2f}ms ({board[1]} queries)"
+                    )
+
+                writes: int = min(options["writes"], options["films"])
+                refresh, ranked = self.measure_refresh(writes, rng)
+                self.stdout.write(
+                    f"Refresh after a review {refresh * 1000:.2f}ms on average, "
+                    f"{ranked} of {writes} reviews ranked a genre again"
+                )
+                raise Rollback()
+        except Rollback:
+            pass
@@ -0,0 +1,88 @@
+import json
+import importlib.util
+from time import perf_counter
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from apps.users.authentication import login_throttle
+from apps.users.models import User
+from apps.users.management.commands.bench_film_filter import Rollback
+
+PASSWORD = "Password1"
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks logins per second on one core with each password hasher, at the "
+        "cost set in PASSWORD_HASHING, and refused logins once a client is throttled."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--logins", type=int, default=50)
+        parser.add_argument(
+            "--hashers", nargs="+", default=list(settings.HASHERS), help="Algorithms."
+        )
+
+    def login(self, username: str, password: str) -> HttpResponse:
+        # A new client every time, so none of them is already logged in
+        return Client().post(
+            reverse("user_login"),
+            json.dumps({"username": username, "password": password}),
+            content_type="application/json",
+        )
+
+    def rate(self, username: str, password: str, logins: int, status: int) -> float:
+        start: float = perf_counter()
+        for _ in range(logins):
+            response: HttpResponse = self.login(username, password)
+            if response.status_code != status:
+                raise CommandError(
+                    f"Login answered {response.status_code}: {response.content!r}"
+                )
+        return logins / (perf_counter() - start)
+
+    def handle(self, *args, **options) -> None:
+        unknown: set[str] = set(options["hashers"]) - set(settings.HASHERS)
+        if unknown:
+            raise CommandError(f"Unknown hashers: {', '.join(sorted(unknown))}.")
+        hashers: list[str] = options["hashers"]
+        if "argon2" in hashers and importlib.util.find_spec("argon2") is None:
+            self.stderr.write("Skipping argon2, argon2-cffi is not installed.")
+            hashers.remove("argon2")
+
+        self.stdout.write(f"{'hasher':<14} {'logins/s':>9} {'ms/login':>9}")
+        try:
+            with transaction.atomic(), override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]
+            ):
+                for number, hasher in enumerate(hashers):
+                    with override_settings(
+                        PASSWORD_HASHERS=[
+                            settings.HASHERS[hasher],
+                            *settings.PASSWORD_HASHERS,
+                        ]
+                    ):
+                        username: str = f"benchlogin{number}"
+                        User.objects.create_user(
+                            username=username,
+                            email=f"{username}@bench.com",
+                            password=PASSWORD,
+                        )
+                        rate: float = self.rate(
+                            username, PASSWORD, options["logins"], 200
+                        )
+                    self.stdout.write(f"{hasher:<14} {rate:>9.1f} {1000 / rate:>9.2f}")
+
+                # Failed logins up to the limit hash the password, then are refused
+                limit: int = login_throttle.max_failures_per_username
+                self.rate("benchlogin0", "wrong", limit, 401)
+                rate = self.rate("benchlogin0", "wrong", options["logins"], 429)
+                self.stdout.write(f"{'throttled':<14} {rate:>9.1f} {1000 / rate:>9.2f}")
+                raise Rollback()
+        except Rollback:
+            pass
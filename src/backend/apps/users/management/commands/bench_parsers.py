@@ -0,0 +1,111 @@
+import json
+from time import perf_counter
+from typing import Callable
+from urllib.parse import urlencode
+from django.core.management.base import BaseCommand, CommandParser
+from django.test import RequestFactory
+from rest_framework import parsers as drf_parsers
+from rest_framework.request import Request
+
+from apps.users import parsers
+from apps.users.views import AggregateFilmView
+
+# Note.
+# Cost of reading the body of a request (request.data) with DRF's parsers followed
+# by the flattening every view used to do, against the parsers of
+# apps/users/parsers.py, on large film payloads (a film with a large cast, as the
+# film views and bulk imports get) sent as JSON and as a form.
+
+
+def legacy_data(request: Request) -> dict:
+    return {
+        k: v[0] if type(v) is list and len(v) == 1 and not k == "cast" else v
+        for k, v in dict(request.data).items()
+    }
+
+
+def shared_data(request: Request) -> dict:
+    return request.data
+
+
+LEGACY_PARSERS: list = [
+    drf_parsers.JSONParser,
+    drf_parsers.FormParser,
+    drf_parsers.MultiPartParser,
+]
+SHARED_PARSERS: list = [parsers.JSONParser, parsers.FormParser, parsers.MultiPartParser]
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark of the request body parsing of the views, before and after "
+        "the shared parsers, per request on large film payloads."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--cast",
+            type=int,
+            default=900,
+            help="Actors per film (form bodies have 1000 fields at most).",
+        )
+        parser.add_argument("--requests", type=int, default=200)
+
+    def payloads(self, cast: int) -> dict[str, tuple[str, str]]:
+        film: dict = {
+            "name": "Bench film",
+            "release": "2020-01-01",
+            "genre": "Drama",
+            "description": "benchmark film " * 50,
+            "duration": 120,
+            "director": "Bench Director",
+            "cast": [f"Bench Actor {number}" for number in range(cast)],
+        }
+        return {
+            "json": (json.dumps(film), "application/json"),
+            "form": (
+                urlencode(film, doseq=True),
+                "application/x-www-form-urlencoded",
+            ),
+        }
+
+    def time(
+        self,
+        body: str,
+        content_type: str,
+        parser_classes: list,
+        read: Callable[[Request], dict],
+        requests: int,
+    ) -> float:
+        factory: RequestFactory = RequestFactory()
+        view: AggregateFilmView = AggregateFilmView()
+        seconds: float = 0.0
+        for _ in range(requests):
+            # A new request every time, as the body is parsed once per request
+            request: Request = Request(
+                factory.post("/", body, content_type=content_type),
+                parsers=[parser() for parser in parser_classes],
+                parser_context={"view": view},
+            )
+            start: float = perf_counter()
+            read(request)
+            seconds += perf_counter() - start
+        return seconds / requests
+
+    def handle(self, *args, **options) -> None:
+        self.stdout.write(
+            f"{'body':<6} {'KiB':>7} {'legacy ms':>10} {'shared ms':>10} {'speedup':>8}"
+        )
+        for name, (body, content_type) in self.payloads(options["cast"]).items():
+            timings: list[float] = [
+                self.time(body, content_type, parser_classes, read, options["requests"])
+                for parser_classes, read in [
+                    (LEGACY_PARSERS, legacy_data),
+                    (SHARED_PARSERS, shared_data),
+                ]
+            ]
+            legacy, shared = timings
+            self.stdout.write(
+                f"{name:<6} {len(body) / 1024:>7.0f} {legacy * 1000:>10.3f} "
+                f"{shared * 1000:>10.3f} {legacy / shared:>7.2f}x"
+            )
@@ -0,0 +1,119 @@
+import os
+import sys
+import json
+import subprocess
+from statistics import median
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+# Note.
+# Boot of a worker in each settings profile (see core/settings.py), each run in a
+# fresh interpreter: the time to import the WSGI application (settings, apps and
+# middleware) and to serve its first request (URLconf and views), and the modules
+# loaded. Then the per-request cost of the middleware chain: requests to a path
+# without a view, with the profile's middleware and without any, so neither a view
+# nor the database is measured.
+
+# Run by every worker process, prints its measurements as JSON
+WORKER: str = """
+import sys, json
+from time import perf_counter
+
+start = perf_counter()
+from core.wsgi import application
+setup = perf_counter() - start
+
+from django.test import Client
+from django.test.utils import override_settings
+
+def serve(client, requests):
+    start = perf_counter()
+    for _ in range(requests):
+        client.get("/bench-startup/")
+    return (perf_counter() - start) / requests
+
+client = Client(HTTP_HOST="localhost")
+start = perf_counter()
+client.get("/bench-startup/")
+first_request = perf_counter() - start
+requests = int(sys.argv[1])
+request = serve(client, requests)
+with override_settings(MIDDLEWARE=[]):
+    bare_request = serve(Client(HTTP_HOST="localhost"), requests)
+
+print(json.dumps({
+    "setup": setup,
+    "first_request": first_request,
+    "modules": len(sys.modules),
+    "request": request,
+    "bare_request": bare_request,
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the settings profiles: worker boot time, modules imported and the "
+        "per-request cost of their middleware chain."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--profiles", nargs="+", default=list(settings.PROFILES))
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--requests", type=int, default=2000)
+
+    def worker(self, profile: str, requests: int) -> dict:
+        environ: dict[str, str] = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": "core.settings",
+            "DJANGO_PROFILE": profile,
+        }
+        process: subprocess.CompletedProcess = subprocess.run(
+            [sys.executable, "-c", WORKER, str(requests)],
+            cwd=settings.BASE_DIR,
+            env=environ,
+            capture_output=True,
+            text=True,
+        )
+        if process.returncode != 0:
+            raise CommandError(f"The {profile} worker failed:\n{process.stderr}")
+        return json.loads(process.stdout.splitlines()[-1])
+
+    def handle(self, *args, **options) -> None:
+        unknown: set[str] = set(options["profiles"]) - set(settings.PROFILES)
+        if unknown:
+            raise CommandError(f"Unknown profiles: {', '.join(sorted(unknown))}.")
+
+        self.stdout.write(
+            f"{'profile':<8} {'setup ms':>9} {'1st req ms':>11} {'modules':>8} "
+            f"{'req us':>8} {'middleware us':>14}"
+        )
+        results: dict[str, dict] = {}
+        for profile in options["profiles"]:
+            runs: list[dict] = [
+                self.worker(profile, options["requests"])
+                for _ in range(options["runs"])
+            ]
+            # Median of the runs, against the noise of a cold start
+            result: dict = {key: median(run[key] for run in runs) for key in runs[0]}
+            results[profile] = result
+            self.stdout.write(
+                f"{profile:<8} {result['setup'] * 1000:>9.1f} "
+                f"{result['first_request'] * 1000:>11.1f} {result['modules']:>8.0f} "
+                f"{result['request'] * 1e6:>8.1f} "
+                f"{(result['request'] - result['bare_request']) * 1e6:>14.1f}"
+            )
+
+        # dev requests also render the debug 404 page, test is the full chain alone
+        prod: dict | None = results.get("prod", None)
+        for profile, result in results.items():
+            if prod is None or profile == "prod":
+                continue
+            self.stdout.write(
+                f"prod against {profile}: "
+                f"{(result['setup'] - prod['setup']) * 1000:.1f}ms of setup, "
+                f"{(result['first_request'] - prod['first_request']) * 1000:.1f}ms of "
+                f"first request, {result['modules'] - prod['modules']:.0f} modules "
+                f"and {(result['request'] - prod['request']) * 1e6:.1f}us per request "
+                "saved."
+            )
@@ -0,0 +1,109 @@
+import random
+import datetime
+from pathlib import Path
+from time import perf_counter
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import transaction, connection
+from django.test.utils import override_settings
+
+from apps.users.benchmark.catalog import DEFAULT_SCALE, generate_catalog
+from apps.users.benchmark.report import (
+    build_report,
+    format_report,
+    load_report,
+    regressions,
+    save_report,
+)
+from apps.users.benchmark.workload import WEIGHTS, Workload, url_names
+from apps.users.management.commands.bench_film_filter import Rollback
+
+STATIC_STORAGE: dict = {
+    "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks every API endpoint with a mixed workload on a synthetic catalog, "
+        "reporting throughput, latency percentiles and queries per request. All data "
+        "is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--films", type=int, default=DEFAULT_SCALE["films"])
+        parser.add_argument("--reviews", type=int, default=DEFAULT_SCALE["reviews"])
+        parser.add_argument("--users", type=int, default=DEFAULT_SCALE["users"])
+        parser.add_argument("--requests", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", type=Path, help="Save the results as JSON.")
+        parser.add_argument(
+            "--compare",
+            type=Path,
+            help="Fail if the results regress against this previous JSON report.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.25,
+            help="Latency increase allowed by --compare (0.25 is 25%%).",
+        )
+
+    def handle(self, *args, **options) -> None:
+        if options["films"] < 1 or options["users"] < 1:
+            raise CommandError("The catalog needs at least one film and one user.")
+        uncovered: set[str] = set(url_names()) - set(WEIGHTS)
+        if uncovered:
+            raise CommandError(f"No workload for: {', '.join(sorted(uncovered))}.")
+
+        rng: random.Random = random.Random(options["seed"])
+        try:
+            with transaction.atomic():
+                start: float = perf_counter()
+                scale: dict[str, int] = generate_catalog(
+                    options["films"], options["reviews"], options["users"], rng
+                )
+                self.stdout.write(f"Generated {scale} in {perf_counter() - start:.1f}s")
+
+                # Requests are sent in process by the test client, static files
+                # are not collected
+                with override_settings(
+                    ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+                    STORAGES={**settings.STORAGES, "staticfiles": STATIC_STORAGE},
+                ):
+                    workload: Workload = Workload(rng)
+                    start = perf_counter()
+                    samples: list[dict] = workload.run(options["requests"])
+                    elapsed: float = perf_counter() - start
+                raise Rollback()
+        except Rollback:
+            pass
+
+        report: dict = build_report(
+            samples,
+            elapsed,
+            {
+                "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                "database": connection.vendor,
+                "django": django.get_version(),
+                "seed": options["seed"],
+                "scale": scale,
+            },
+        )
+        for line in format_report(report):
+            self.stdout.write(line)
+
+        if options["output"]:
+            save_report(report, options["output"])
+            self.stdout.write(f"Results saved to {options['output']}")
+
+        if options["compare"]:
+            found: list[str] = regressions(
+                load_report(options["compare"]), report, options["threshold"]
+            )
+            for regression in found:
+                self.stderr.write(f"Regression {regression}")
+            if found:
+                raise CommandError(f"{len(found)} regressions.")
+            self.stdout.write(f"No regressions against {options['compare']}.")
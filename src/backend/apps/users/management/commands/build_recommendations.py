@@ -0,0 +1,21 @@
+from time import perf_counter
+from django.core.management.base import BaseCommand
+
+from apps.users import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        "Fits a matrix factorization of the reviews and stores the recommended films "
+        "of every user, and the popular films recommended to new users (see "
+        "apps/users/recommendations.py)."
+    )
+
+    def handle(self, *args, **options) -> None:
+        start: float = perf_counter()
+        # Writes in its own transaction, once the recommendations are computed
+        users, rows = recommendations.build_recommendations()
+        self.stdout.write(
+            f"Recommendations of {users} users built, {rows} rows in "
+            f"{perf_counter() - start:.1f}s."
+        )
@@ -0,0 +1,30 @@
+from time import perf_counter
+from django.core.management.base import BaseCommand, CommandParser
+
+from apps.users import similarity
+
+
+class Command(BaseCommand):
+    help = (
+        "Computes the most similar films of every film from the reviews (see "
+        "apps/users/similarity.py). With --stale, only the films whose reviews changed "
+        "since they were last computed, and the films whose lists they affect."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--stale",
+            action="store_true",
+            help="Only refresh the films marked stale by review writes.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        start: float = perf_counter()
+        # Each writes in its own transaction, once the similar films are computed
+        if options["stale"]:
+            stale, films, rows = similarity.refresh_similar_films()
+            built: str = f"{stale} stale films refreshed ({films} films recomputed)"
+        else:
+            rows = similarity.build_similar_films()
+            built = "Similar films built"
+        self.stdout.write(f"{built}, {rows} rows in {perf_counter() - start:.1f}s.")
@@ -0,0 +1,180 @@
+import re
+import json
+import random
+from time import perf_counter
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import transaction, connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.users.caching import film_cache
+from apps.users.management.commands.bench_film_filter import (
+    BENCH_FILTERS,
+    Command as BenchCommand,
+    Rollback,
+)
+from apps.users.models import User, Film, Review
+from apps.users.views import FilterFilmsView, FilmReviewsView, RetrieveReviewsView
+
+# Note.
+# Query plan audit of the hot read paths: the film filter, film reviews and user history
+# views are called with representative requests, every query they issue is captured,
+# and its plan is printed with its run time, flagging full table scans (and sorts that
+# an index could avoid). Requests go straight to the views (no cookie authentication,
+# no response cache), so only their own queries are audited.
+
+FULL_SCAN_PATTERNS: dict[str, re.Pattern] = {
+    # Plain table scans, not index scans nor scans of the FTS virtual table
+    "sqlite": re.compile(r"^SCAN (?!CONSTANT ROW|\()(?!.*\b(USING|VIRTUAL TABLE)\b)"),
+    "postgresql": re.compile(r"\bSeq Scan on\b"),
+}
+# Rows sorted after being read, instead of read in order from an index
+SORT_PATTERNS: dict[str, re.Pattern] = {
+    "sqlite": re.compile(r"^USE TEMP B-TREE FOR ORDER BY"),
+    "postgresql": re.compile(r"\bSort\b"),
+}
+
+PARAMETER: re.Pattern = re.compile(r"\b\d+\b|'[^']*'")
+
+PAGE_PARAMS: list[str] = ["", "?limit=20&order=rating", "?limit=20&order=release"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Prints the query plan of every query issued by the film filter, film reviews "
+        "and user history views, flagging full table scans."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--films",
+            type=int,
+            default=0,
+            help="Audit a synthetic catalog of this many films (rolled back after).",
+        )
+        parser.add_argument("--reviews", type=int, default=0)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--flagged-only",
+            action="store_true",
+            help="Only print the queries with full table scans.",
+        )
+
+    def explain(self, sql: str) -> list[str]:
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                return [row[3] for row in cursor.fetchall()]
+            cursor.execute(f"EXPLAIN {sql}")
+            return [row[0] for row in cursor.fetchall()]
+
+    def hot_requests(self) -> list[tuple[str, object, object, dict]]:
+        """(label, view, request, view kwargs) of every audited request"""
+        factory: APIRequestFactory = APIRequestFactory()
+        requests: list[tuple[str, object, object, dict]] = []
+
+        for data in BENCH_FILTERS:
+            body: str = json.dumps(data, default=lambda value: value.date().isoformat())
+            for params in PAGE_PARAMS:
+                requests.append(
+                    (
+                        f"film filter {body} {params}",
+                        FilterFilmsView.as_view(),
+                        factory.post(
+                            f"/films/{params}", body, content_type="application/json"
+                        ),
+                        {},
+                    )
+                )
+
+        film: Film | None = Film.objects.order_by("-review_count").first()
+        if film is not None:
+            for params in ["", "?limit=20"]:
+                requests.append(
+                    (
+                        f"film reviews {params}",
+                        FilmReviewsView.as_view(),
+                        factory.get(f"/films/{film.id}/reviews/{params}"),
+                        {"id": film.id},
+                    )
+                )
+
+        review: Review | None = (
+            Review.objects.exclude(user_id=None).order_by("-id").first()
+        )
+        if review is not None:
+            user: User = review.user_id
+            for params in ["", "?limit=20"]:
+                request = factory.get(f"/users/history/{params}")
+                force_authenticate(request, user=user)
+                requests.append(
+                    (
+                        f"user history {params}",
+                        RetrieveReviewsView.as_view(),
+                        request,
+                        {},
+                    )
+                )
+
+        return requests
+
+    def timing(self, sql: str) -> float:
+        """Seconds taken to run the query and fetch its rows"""
+        with connection.cursor() as cursor:
+            start: float = perf_counter()
+            cursor.execute(sql)
+            cursor.fetchall()
+            return perf_counter() - start
+
+    def audit(self, flagged_only: bool) -> int:
+        full_scan_pattern: re.Pattern = FULL_SCAN_PATTERNS[connection.vendor]
+        sort_pattern: re.Pattern = SORT_PATTERNS[connection.vendor]
+        flagged: int = 0
+        for label, view, request, kwargs in self.hot_requests():
+            with CaptureQueriesContext(connection) as queries:
+                view(request, **kwargs).render()
+
+            # Queries that only differ in their parameters are audited once
+            shapes: dict[str, list[dict]] = {}
+            for query in queries.captured_queries:
+                shapes.setdefault(PARAMETER.sub("?", query["sql"]), []).append(query)
+
+            self.stdout.write(f"== {label}")
+            for executions in shapes.values():
+                sql: str = executions[0]["sql"]
+                plan: list[str] = self.explain(sql)
+                full_scan: bool = any(full_scan_pattern.search(line) for line in plan)
+                sort: bool = any(sort_pattern.search(line) for line in plan)
+                flagged += full_scan
+                if flagged_only and not full_scan:
+                    continue
+                marker: str = "FULL SCAN" if full_scan else "SORT" if sort else "ok"
+                self.stdout.write(
+                    f"  [{marker}] {len(executions)}x "
+                    f"{self.timing(sql) * 1000:.1f}ms each | {sql[:160]}"
+                )
+                for line in plan:
+                    self.stdout.write(f"      {line}")
+        return flagged
+
+    def handle(self, *args, **options) -> None:
+        if connection.vendor not in FULL_SCAN_PATTERNS:
+            raise CommandError(f"Query plans of {connection.vendor} are not supported.")
+
+        cache_alias: str | None = film_cache.cache_alias
+        film_cache.cache_alias = None  # Audit the queries, not the cache
+        try:
+            with transaction.atomic():
+                if options["films"]:
+                    BenchCommand().populate(
+                        options["films"],
+                        options["reviews"],
+                        random.Random(options["seed"]),
+                    )
+                flagged: int = self.audit(options["flagged_only"])
+                self.stdout.write(f"{flagged} queries with full table scans.")
+                raise Rollback()
+        except Rollback:
+            pass
+        finally:
+            film_cache.cache_alias = cache_alias
@@ -0,0 +1,62 @@
+import sys
+from typing import IO, Iterator
+from django.core.management.base import BaseCommand, CommandParser, CommandError
+
+from apps.users.importer import (
+    DEFAULT_BATCH_SIZE,
+    FilmImporter,
+    iter_json_array,
+    iter_json_lines,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports films from a JSON file (an array of films or {"films": [...]}) or a '
+        "JSON Lines file, in batches. Invalid films are reported and skipped."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("path", help="File to import, or - to read from stdin.")
+        parser.add_argument(
+            "--format",
+            choices=["json", "jsonl"],
+            default=None,
+            help="Input format. By default, jsonl for .jsonl/.ndjson files.",
+        )
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options) -> None:
+        path: str = options["path"]
+        input_format: str | None = options["format"]
+        if input_format is None:
+            json_lines: bool = path.endswith(".jsonl") or path.endswith(".ndjson")
+            input_format = "jsonl" if json_lines else "json"
+
+        stream: IO
+        try:
+            stream = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+        except OSError as error:
+            raise CommandError(str(error))
+
+        try:
+            rows: Iterator[dict]
+            if input_format == "jsonl":
+                rows = iter_json_lines(stream)
+            else:
+                rows = iter_json_array(stream)
+            report: dict = FilmImporter(options["batch_size"]).import_rows(rows)
+        except ValueError as error:
+            raise CommandError(f"Invalid input: {error}")
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for error in report["errors"]:
+            self.stderr.write(
+                f"Row {error['row']} ({error['name']}) rejected: {error['errors']}"
+            )
+        self.stdout.write(
+            f"{report['created']} films added, {report['updated']} films updated, "
+            f"{len(report['errors'])} films rejected."
+        )
@@ -0,0 +1,108 @@
+import json
+import random
+import threading
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from apps.users.benchmark.report import percentile
+from apps.users.management.commands.bench_film_filter import BENCH_FILTERS
+from apps.users.models import Film
+
+# Note.
+# Load test of the film read endpoints of a running server: concurrent clients send a
+# mix of film detail, film reviews and film search requests, and the throughput and
+# latency percentiles are reported per endpoint. Film ids are read from the local
+# database, which must be the one the server uses. Comparing --prefix "" with
+# --prefix async/ under uvicorn (ASGI) and gunicorn (WSGI) shows what the async views
+# (see apps/users/async_views.py) are worth in a given deployment.
+
+ENDPOINTS: list[str] = ["detail", "reviews", "search"]
+
+
+class Command(BaseCommand):
+    help = "Load tests the film detail, reviews and search endpoints of a server."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--url", default="http://127.0.0.1:8000")
+        parser.add_argument(
+            "--prefix",
+            default="",
+            help='Path prefix of the film endpoints, "async/" for the async views.',
+        )
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def plan(self, count: int, rng: random.Random) -> list[tuple[str, str, str, str]]:
+        """(endpoint, method, path, body) of every request, shuffled"""
+        film_ids: list[int] = list(Film.objects.values_list("id", flat=True))
+        if not film_ids:
+            raise CommandError("There are no films to request.")
+        bodies: list[str] = [
+            json.dumps(data, default=lambda value: value.date().isoformat())
+            for data in BENCH_FILTERS
+        ]
+
+        plan: list[tuple[str, str, str, str]] = []
+        for i in range(count):
+            endpoint: str = ENDPOINTS[i % len(ENDPOINTS)]
+            film_id: int = rng.choice(film_ids)
+            if endpoint == "detail":
+                plan.append((endpoint, "GET", f"films/{film_id}/", ""))
+            elif endpoint == "reviews":
+                plan.append((endpoint, "GET", f"films/{film_id}/reviews/?limit=20", ""))
+            else:
+                plan.append((endpoint, "POST", "films/?limit=20", rng.choice(bodies)))
+        rng.shuffle(plan)
+        return plan
+
+    def handle(self, *args, **options) -> None:
+        base: str = options["url"].rstrip("/") + "/" + options["prefix"]
+        plan: list[tuple[str, str, str, str]] = self.plan(
+            options["requests"], random.Random(options["seed"])
+        )
+
+        # One connection per client thread
+        local: threading.local = threading.local()
+
+        def send(request: tuple[str, str, str, str]) -> tuple[str, float, bool]:
+            endpoint, method, path, body = request
+            if not hasattr(local, "session"):
+                local.session = requests.Session()
+            start: float = perf_counter()
+            response: requests.Response = local.session.request(
+                method,
+                base + path,
+                data=body or None,
+                headers={"Content-Type": "application/json"},
+            )
+            return endpoint, perf_counter() - start, response.status_code == 200
+
+        start: float = perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            results: list[tuple[str, float, bool]] = list(executor.map(send, plan))
+        elapsed: float = perf_counter() - start
+
+        self.stdout.write(
+            f"{len(results)} requests to {base} with {options['concurrency']} "
+            f"clients in {elapsed:.2f}s"
+        )
+        for endpoint in [*ENDPOINTS, "all"]:
+            timings: list[float] = [
+                timing
+                for name, timing, _ in results
+                if endpoint == "all" or name == endpoint
+            ]
+            errors: int = sum(
+                not ok
+                for name, _, ok in results
+                if endpoint == "all" or name == endpoint
+            )
+            self.stdout.write(
+                f"{endpoint:>8}: {len(timings) / elapsed:7.1f} req/s  "
+                f"p50 {percentile(timings, 0.50) * 1000:7.1f}ms  "
+                f"p99 {percentile(timings, 0.99) * 1000:7.1f}ms  "
+                f"{errors} errors"
+            )
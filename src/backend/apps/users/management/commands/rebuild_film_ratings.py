@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import transaction
+
+from apps.users import leaderboards, ratings
+from apps.users.caching import film_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the rating aggregates of every film from its reviews and reports "
+        "the films whose stored aggregates had drifted."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the drift, without fixing it.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        drift: list[dict]
+        with transaction.atomic():
+            if options["dry_run"]:
+                drift = ratings.rating_drift()
+            else:
+                drift = ratings.rebuild_ratings()
+                leaderboards.rebuild_leaderboards()
+                film_cache.invalidate()
+
+        for row in drift:
+            self.stdout.write(
+                f"Film {row['film_id']}: stored (count, sum, avg) {row['stored']}, "
+                f"expected {row['expected']}"
+            )
+
+        action: str = "found" if options["dry_run"] else "fixed"
+        self.stdout.write(f"{len(drift)} films with drifted ratings {action}.")
@@ -0,0 +1,21 @@
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.users import leaderboards
+
+
+class Command(BaseCommand):
+    help = (
+        "Ranks the top rated films of every genre again from the rating aggregates, "
+        "after the leaderboard size changed for instance (see "
+        "apps/users/leaderboards.py)."
+    )
+
+    def handle(self, *args, **options) -> None:
+        start: float = perf_counter()
+        with transaction.atomic():
+            films: int = leaderboards.rebuild_leaderboards()
+        self.stdout.write(
+            f"Leaderboards rebuilt, {films} films in {perf_counter() - start:.1f}s."
+        )
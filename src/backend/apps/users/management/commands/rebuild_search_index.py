@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.users.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the film search index from scratch. Needed after writes that skip "
+        "model signals, such as bulk_create."
+    )
+
+    def handle(self, *args, **options) -> None:
+        with transaction.atomic():
+            get_search_backend().rebuild()
+        self.stdout.write("Film search index rebuilt.")
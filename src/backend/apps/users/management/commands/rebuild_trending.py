@@ -0,0 +1,22 @@
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.users import trending
+
+
+class Command(BaseCommand):
+    help = (
+        "Recounts the hourly review buckets of the trending films from the review "
+        "timestamps, and drops the buckets older than the longest window (see "
+        "apps/users/trending.py)."
+    )
+
+    def handle(self, *args, **options) -> None:
+        start: float = perf_counter()
+        with transaction.atomic():
+            buckets: int = trending.rebuild_buckets()
+        self.stdout.write(
+            f"Trending films rebuilt, {buckets} buckets in "
+            f"{perf_counter() - start:.1f}s."
+        )
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.11 on 2026-10-18 01:01
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_aggregates(apps, schema_editor) -> None:
+    Film = apps.get_model("users", "Film")
+    Review = apps.get_model("users", "Review")
+    aggregates = (
+        Review.objects.filter(film_id__isnull=False)
+        .values("film_id")
+        .annotate(count=Count("id"), total=Sum("rating"))
+    )
+    for row in aggregates:
+        Film.objects.filter(pk=row["film_id"]).update(
+            review_count=row["count"],
+            rating_sum=row["total"],
+            avg_rating=row["total"] / row["count"],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_film_image_url"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="film",
+            name="avg_rating",
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name="film",
+            name="rating_sum",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="film",
+            name="review_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
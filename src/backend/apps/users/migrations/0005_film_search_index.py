@@ -0,0 +1,46 @@
+from django.db import migrations
+
+# Note.
+# FTS5 index used by apps.users.search.SQLiteFTSBackend. It is only created on SQLite;
+# other databases use a different search backend.
+
+CREATE_INDEX_SQL = """
+    CREATE VIRTUAL TABLE users_film_search USING fts5(
+        name, description, director_name, cast_names, prefix='2 3'
+    )
+"""
+
+POPULATE_INDEX_SQL = """
+    INSERT INTO users_film_search(rowid, name, description, director_name, cast_names)
+    SELECT film.id, film.name, film.description, COALESCE(director.name, ''),
+        COALESCE((
+            SELECT group_concat(actor.name, ' ')
+            FROM users_film_cast film_cast
+            JOIN users_actor actor ON actor.id = film_cast.actor_id
+            WHERE film_cast.film_id = film.id
+        ), '')
+    FROM users_film film
+    LEFT JOIN users_director director ON director.id = film.director_id_id
+"""
+
+
+def create_search_index(apps, schema_editor) -> None:
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(CREATE_INDEX_SQL)
+        schema_editor.execute(POPULATE_INDEX_SQL)
+
+
+def drop_search_index(apps, schema_editor) -> None:
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS users_film_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_film_rating_aggregates"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
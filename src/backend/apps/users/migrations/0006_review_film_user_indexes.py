@@ -0,0 +1,54 @@
+# Generated by Django 4.2.11 on 2026-10-18 01:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0005_film_search_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="film",
+            name="release",
+            field=models.DateField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name="review",
+            name="film_id",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="reviews",
+                to="users.film",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="review",
+            name="user_id",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="reviews",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["film_id", "id"], name="users_review_film_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["user_id", "id"], name="users_review_user_id_idx"
+            ),
+        ),
+    ]
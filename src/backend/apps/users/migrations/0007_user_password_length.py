@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-18 02:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0006_review_film_user_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="user",
+            name="password",
+            field=models.CharField(max_length=128),
+        ),
+    ]
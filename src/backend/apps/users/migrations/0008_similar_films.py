@@ -0,0 +1,60 @@
+# Generated by Django 4.2.11 on 2026-10-18 03:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0007_user_password_length"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StaleSimilarFilm",
+            fields=[
+                (
+                    "film_id",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to="users.film",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="SimilarFilm",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("rank", models.PositiveSmallIntegerField()),
+                ("similarity", models.FloatField()),
+                (
+                    "film_id",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="similar_films",
+                        to="users.film",
+                    ),
+                ),
+                (
+                    "similar_id",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="users.film",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="similarfilm",
+            constraint=models.UniqueConstraint(
+                fields=("film_id", "rank"), name="unique_similar_film_rank"
+            ),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.11 on 2026-10-18 03:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0008_similar_films"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecommendedFilm",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("rank", models.PositiveSmallIntegerField()),
+                ("rating", models.FloatField()),
+                (
+                    "film_id",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="users.film",
+                    ),
+                ),
+                (
+                    "user_id",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="recommended_films",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="PopularFilm",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("rank", models.PositiveSmallIntegerField(unique=True)),
+                ("rating", models.FloatField()),
+                (
+                    "film_id",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="users.film",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="recommendedfilm",
+            constraint=models.UniqueConstraint(
+                fields=("user_id", "rank"), name="unique_recommended_film_rank"
+            ),
+        ),
+    ]
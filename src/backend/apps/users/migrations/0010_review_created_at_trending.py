@@ -0,0 +1,61 @@
+# Generated by Django 4.2.11 on 2026-10-18 03:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0009_recommended_films"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FilmHourlyReviews",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("hour", models.DateTimeField()),
+                ("reviews", models.IntegerField(default=0)),
+            ],
+        ),
+        # Existing reviews are left without a timestamp, new ones get theirs
+        migrations.AddField(
+            model_name="review",
+            name="created_at",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AlterField(
+            model_name="review",
+            name="created_at",
+            field=models.DateTimeField(default=django.utils.timezone.now, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(fields=["created_at"], name="users_review_created_idx"),
+        ),
+        migrations.AddField(
+            model_name="filmhourlyreviews",
+            name="film_id",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="hourly_reviews",
+                to="users.film",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="filmhourlyreviews",
+            index=models.Index(
+                fields=["hour", "film_id", "reviews"],
+                name="users_hourly_reviews_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="filmhourlyreviews",
+            constraint=models.UniqueConstraint(
+                fields=("film_id", "hour"), name="unique_film_hourly_reviews"
+            ),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 4.2.11 on 2026-10-18 03:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+LEADERBOARD_SIZE = 100
+# Film.GENRE_CHOICES as of this migration, historical models do not have it
+GENRE_CHOICES = [
+    "Action",
+    "Comedy",
+    "Crime",
+    "Documentary",
+    "Drama",
+    "Horror",
+    "Romance",
+    "Sci-Fi",
+    "Thriller",
+    "Western",
+]
+
+
+def rank_films(apps, schema_editor) -> None:
+    Film = apps.get_model("users", "Film")
+    LeaderboardFilm = apps.get_model("users", "LeaderboardFilm")
+    # Only the genres of the choices have a leaderboard (see leaderboards.py)
+    for genre in GENRE_CHOICES:
+        films = (
+            Film.objects.filter(genre=genre, review_count__gt=0)
+            .order_by("-avg_rating", "-id")
+            .values_list("id", flat=True)[:LEADERBOARD_SIZE]
+        )
+        LeaderboardFilm.objects.bulk_create(
+            [
+                LeaderboardFilm(film_id_id=film_id, genre=genre, rank=rank)
+                for rank, film_id in enumerate(films)
+            ]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0010_review_created_at_trending"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeaderboardFilm",
+            fields=[
+                (
+                    "film_id",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to="users.film",
+                    ),
+                ),
+                ("genre", models.CharField(max_length=64)),
+                ("rank", models.PositiveSmallIntegerField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="leaderboardfilm",
+            constraint=models.UniqueConstraint(
+                fields=("genre", "rank"), name="unique_leaderboard_film_rank"
+            ),
+        ),
+        migrations.RunPython(rank_films, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 
 NAME_MAX_LENGTH = 64
 CONTENT_MAX_LENGTH = 500
@@ -9,7 +10,9 @@ class User(AbstractUser):
     id = models.AutoField(primary_key=True)
     username = models.CharField(max_length=NAME_MAX_LENGTH, unique=True)
     email = models.EmailField(max_length=NAME_MAX_LENGTH, unique=True)
-    password = models.CharField(max_length=NAME_MAX_LENGTH)
+    # As long as AbstractBaseUser's, scrypt hashes take all of it at the default cost
+    # (see PASSWORD_HASHING in core/settings.py)
+    password = models.CharField(max_length=128)
     professional = models.BooleanField(default=False)
 
     # In this case,
@@ -32,6 +35,15 @@ class Actor(models.Model):
     nationality = models.CharField(max_length=NAME_MAX_LENGTH, null=True)
 
 
+class FilmQuerySet(models.QuerySet):
+    def for_listing(self) -> "FilmQuerySet":
+        """
+        Films ready to be serialized: director and cast are fetched up front, so
+        serializing N films costs a constant number of queries.
+        """
+        return self.select_related("director_id").prefetch_related("cast")
+
+
 class Film(models.Model):
 
     GENRE_CHOICES: list[str] = [
@@ -49,7 +61,7 @@ class Film(models.Model):
 
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=NAME_MAX_LENGTH, unique=True)
-    release = models.DateField()
+    release = models.DateField(db_index=True)
     genre = models.CharField(max_length=NAME_MAX_LENGTH)
     description = models.TextField()
     duration = models.FloatField()
@@ -59,6 +71,23 @@ class Film(models.Model):
     )
     cast = models.ManyToManyField(Actor, related_name="films")
 
+    # Rating aggregates, maintained on review write/delete (see ratings.py)
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    avg_rating = models.FloatField(default=0, db_index=True)
+
+    objects = FilmQuerySet.as_manager()
+
+
+class ReviewQuerySet(models.QuerySet):
+    def for_listing(self) -> "ReviewQuerySet":
+        """
+        Reviews ready to be serialized: the name of their film is joined in as
+        film_name, and user and film are only read by id, so serializing N reviews
+        costs a single query.
+        """
+        return self.annotate(film_name=models.F("film_id__name"))
+
 
 class Review(models.Model):
 
@@ -68,6 +97,8 @@ class Review(models.Model):
     id = models.AutoField(primary_key=True)
     rating = models.IntegerField(default=0)
     content = models.TextField(max_length=CONTENT_MAX_LENGTH, null=True)
+    # Reviews written before reviews were timestamped have none
+    created_at = models.DateTimeField(default=timezone.now, null=True)
 
     # Note.
     # The problem of using delete on CASCADE is that it requires to ensure that a
@@ -83,16 +114,153 @@ class Review(models.Model):
     # We prefer to make the field nullable, and ensure existance of foreing instace
     # in the model serializer
 
+    # Indexed along with the id in Meta.indexes
     user_id = models.ForeignKey(
-        User, on_delete=models.SET_NULL, null=True, related_name="reviews"
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="reviews",
+        db_index=False,
     )
     film_id = models.ForeignKey(
-        Film, on_delete=models.SET_NULL, null=True, related_name="reviews"
+        Film,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="reviews",
+        db_index=False,
     )
 
+    objects = ReviewQuerySet.as_manager()
+
     class Meta:
         constraints: list[models.BaseConstraint] = [
             models.UniqueConstraint(
                 fields=["user_id", "film_id"], name="unique_combination"
             )
         ]
+        # Reviews of a film or of a user, in id order (see pagination.py)
+        indexes: list[models.Index] = [
+            models.Index(fields=["film_id", "id"], name="users_review_film_id_idx"),
+            models.Index(fields=["user_id", "id"], name="users_review_user_id_idx"),
+            models.Index(fields=["created_at"], name="users_review_created_idx"),
+        ]
+
+
+class FilmHourlyReviews(models.Model):
+    """Reviews written of a film in an hour, for the trending films (see trending.py)"""
+
+    id = models.AutoField(primary_key=True)
+    # Indexed along with the hour in Meta.constraints
+    film_id = models.ForeignKey(
+        Film, on_delete=models.CASCADE, related_name="hourly_reviews", db_index=False
+    )
+    hour = models.DateTimeField()
+    reviews = models.IntegerField(default=0)
+
+    class Meta:
+        constraints: list[models.BaseConstraint] = [
+            models.UniqueConstraint(
+                fields=["film_id", "hour"], name="unique_film_hourly_reviews"
+            )
+        ]
+        # The buckets of the last hours, whatever their film, read from the index alone
+        indexes: list[models.Index] = [
+            models.Index(
+                fields=["hour", "film_id", "reviews"], name="users_hourly_reviews_idx"
+            ),
+        ]
+
+
+class SimilarFilmQuerySet(models.QuerySet):
+    def for_listing(self) -> "SimilarFilmQuerySet":
+        """Similar films ready to be serialized, most similar first, in one query"""
+        return self.select_related("similar_id").order_by("rank")
+
+
+class SimilarFilm(models.Model):
+    """One of the most similar films of a film (see similarity.py)"""
+
+    id = models.AutoField(primary_key=True)
+    # Indexed along with the rank in Meta.constraints
+    film_id = models.ForeignKey(
+        Film, on_delete=models.CASCADE, related_name="similar_films", db_index=False
+    )
+    similar_id = models.ForeignKey(Film, on_delete=models.CASCADE, related_name="+")
+    rank = models.PositiveSmallIntegerField()
+    similarity = models.FloatField()
+
+    objects = SimilarFilmQuerySet.as_manager()
+
+    class Meta:
+        constraints: list[models.BaseConstraint] = [
+            models.UniqueConstraint(
+                fields=["film_id", "rank"], name="unique_similar_film_rank"
+            )
+        ]
+
+
+class StaleSimilarFilm(models.Model):
+    """A film whose reviews changed since its similar films were computed"""
+
+    film_id = models.OneToOneField(
+        Film, on_delete=models.CASCADE, primary_key=True, related_name="+"
+    )
+
+
+class RankedFilmQuerySet(models.QuerySet):
+    def for_listing(self) -> "RankedFilmQuerySet":
+        """Ranked films ready to be serialized, best first, in one query"""
+        return self.select_related("film_id").order_by("rank")
+
+
+class LeaderboardFilm(models.Model):
+    """One of the top rated films of a genre (see leaderboards.py)"""
+
+    film_id = models.OneToOneField(
+        Film, on_delete=models.CASCADE, primary_key=True, related_name="+"
+    )
+    # Indexed along with the rank in Meta.constraints
+    genre = models.CharField(max_length=NAME_MAX_LENGTH)
+    rank = models.PositiveSmallIntegerField()
+
+    objects = RankedFilmQuerySet.as_manager()
+
+    class Meta:
+        constraints: list[models.BaseConstraint] = [
+            models.UniqueConstraint(
+                fields=["genre", "rank"], name="unique_leaderboard_film_rank"
+            )
+        ]
+
+
+class RecommendedFilm(models.Model):
+    """One of the films recommended to a user (see recommendations.py)"""
+
+    id = models.AutoField(primary_key=True)
+    # Indexed along with the rank in Meta.constraints
+    user_id = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="recommended_films", db_index=False
+    )
+    film_id = models.ForeignKey(Film, on_delete=models.CASCADE, related_name="+")
+    rank = models.PositiveSmallIntegerField()
+    rating = models.FloatField()  # predicted
+
+    objects = RankedFilmQuerySet.as_manager()
+
+    class Meta:
+        constraints: list[models.BaseConstraint] = [
+            models.UniqueConstraint(
+                fields=["user_id", "rank"], name="unique_recommended_film_rank"
+            )
+        ]
+
+
+class PopularFilm(models.Model):
+    """One of the films recommended to users without recommendations of their own"""
+
+    id = models.AutoField(primary_key=True)
+    film_id = models.ForeignKey(Film, on_delete=models.CASCADE, related_name="+")
+    rank = models.PositiveSmallIntegerField(unique=True)
+    rating = models.FloatField()  # damped mean
+
+    objects = RankedFilmQuerySet.as_manager()
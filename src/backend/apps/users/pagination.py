@@ -0,0 +1,163 @@
+import json
+import base64
+import binascii
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+from rest_framework.request import Request
+
+# Note.
+# Keyset (cursor) pagination. Listings are unpaginated unless the request sets the
+# "limit" query parameter. Pages are ordered by a unique key (always ending with the
+# id) and the opaque "cursor" holds the key of the last row of the previous page, so
+# the next page is a WHERE on the key instead of an OFFSET, and every page costs the
+# same no matter how deep it is.
+
+LIMIT_PARAM = "limit"
+CURSOR_PARAM = "cursor"
+ORDER_PARAM = "order"
+MAX_LIMIT = 100
+
+# Orderings of the film search, by name. The cursor compares the key with > and <,
+# so no field of a key may be NULL (the search rank of the films without a text
+# match falls back to a constant, see search.py).
+FILM_ORDERINGS: dict[str, tuple[str, ...]] = {
+    "id": ("id",),
+    "rating": ("-avg_rating", "-id"),
+    "release": ("-release", "-id"),
+    # Only available when searching text (see search.py)
+    "relevance": ("search_rank", "id"),
+}
+REVIEW_ORDERING: tuple[str, ...] = ("id",)
+
+
+def encode_cursor(values: list) -> str:
+    data: bytes = json.dumps(values, default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii")
+
+
+def decode_cursor(cursor: str, length: int) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, binascii.Error):
+        raise ValidationError("Invalid cursor.")
+    if type(values) is not list or not len(values) == length:
+        raise ValidationError("Invalid cursor.")
+    return values
+
+
+def get_limit(request: Request) -> int | None:
+    """The page size, or None if the request does not ask for pagination"""
+    limit: str | None = request.query_params.get(LIMIT_PARAM, None)
+    if limit is None or limit == "":
+        return None
+    if not limit.isdigit() or not 0 < int(limit) <= MAX_LIMIT:
+        raise ValidationError(f"Limit must be an integer between 1 and {MAX_LIMIT}.")
+    return int(limit)
+
+
+def listing_params(request: Request) -> dict:
+    """The pagination and ordering parameters of the request"""
+    return {
+        param: request.query_params[param]
+        for param in (LIMIT_PARAM, CURSOR_PARAM, ORDER_PARAM)
+        if param in request.query_params
+    }
+
+
+def film_ordering(request: Request, queryset: QuerySet) -> tuple[str, ...]:
+    """The requested film ordering, by relevance by default when searching text"""
+    ranked: bool = "search_rank" in queryset.query.annotations
+    order: str = request.query_params.get(ORDER_PARAM, "relevance" if ranked else "id")
+    if order not in FILM_ORDERINGS or (order == "relevance" and not ranked):
+        choices: list[str] = [
+            name for name in FILM_ORDERINGS if ranked or not name == "relevance"
+        ]
+        raise ValidationError(f"Order must be one of: {', '.join(choices)}.")
+    return FILM_ORDERINGS[order]
+
+
+def after(ordering: tuple[str, ...], values: list) -> Q:
+    """Rows strictly after the key values in the given ordering"""
+    condition: Q = Q()
+    equal: dict = {}
+    for order, value in zip(ordering, values):
+        field: str = order.lstrip("-")
+        lookup: str = "lt" if order.startswith("-") else "gt"
+        condition |= Q(**equal, **{f"{field}__{lookup}": value})
+        equal[field] = value
+    return condition
+
+
+def page_queryset(
+    queryset: QuerySet, ordering: tuple[str, ...], limit: int, cursor: str | None
+) -> QuerySet:
+    """The rows of the page after the cursor, and one more if there is a next page"""
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        try:
+            queryset = queryset.filter(
+                after(ordering, decode_cursor(cursor, len(ordering)))
+            )
+        except (TypeError, ValueError):
+            raise ValidationError("Invalid cursor.")
+
+    # One extra row tells if there is a next page
+    return queryset[: limit + 1]
+
+
+def next_page(
+    rows: list, ordering: tuple[str, ...], limit: int
+) -> tuple[list, str | None]:
+    """Returns the page rows and the cursor of the next page, if any"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, field.lstrip("-")) for field in ordering])
+
+
+def paginate(
+    queryset: QuerySet, ordering: tuple[str, ...], limit: int, cursor: str | None
+) -> tuple[list, str | None]:
+    """Returns a page of the queryset and the cursor of the next one, if any"""
+    rows: list = list(page_queryset(queryset, ordering, limit, cursor))
+    return next_page(rows, ordering, limit)
+
+
+async def apaginate(
+    queryset: QuerySet, ordering: tuple[str, ...], limit: int, cursor: str | None
+) -> tuple[list, str | None]:
+    """Async version of paginate"""
+    rows: list = [row async for row in page_queryset(queryset, ordering, limit, cursor)]
+    return next_page(rows, ordering, limit)
+
+
+def paginate_request(
+    request: Request, queryset: QuerySet, ordering: tuple[str, ...]
+) -> tuple[QuerySet | list, dict]:
+    """
+    Returns the rows to serialize and the pagination fields of the response, none if
+    the request is not paginated.
+    """
+    limit: int | None = get_limit(request)
+    if limit is None:
+        return queryset, {}
+    cursor: str | None = request.query_params.get(CURSOR_PARAM, None)
+    rows: list
+    next_cursor: str | None
+    rows, next_cursor = paginate(queryset, ordering, limit, cursor)
+    return rows, {"next": next_cursor}
+
+
+async def apaginate_request(
+    request: Request, queryset: QuerySet, ordering: tuple[str, ...]
+) -> tuple[list, dict]:
+    """Async version of paginate_request, the rows of unpaginated requests included"""
+    limit: int | None = get_limit(request)
+    if limit is None:
+        return [row async for row in queryset], {}
+    cursor: str | None = request.query_params.get(CURSOR_PARAM, None)
+    rows: list
+    next_cursor: str | None
+    rows, next_cursor = await apaginate(queryset, ordering, limit, cursor)
+    return rows, {"next": next_cursor}
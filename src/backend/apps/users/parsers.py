@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.http import QueryDict
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils import json
+
+# Note.
+# Request body parsers of every view (REST_FRAMEWORK["DEFAULT_PARSER_CLASSES"]), so
+# request.data is a plain dict whatever the content type:
+# - JSON bodies are decoded in a single pass and handed over as they are, the values
+#   keep their JSON types.
+# - Form and multipart bodies are flattened: a field sent once is its value, a field
+#   sent more than once is the list of its values. Fields in the view's list_fields
+#   (such as a film's cast) are always lists, even with a single value.
+# Views must not flatten request.data again.
+
+
+def form_data(data: QueryDict, list_fields: tuple[str, ...] = ()) -> dict:
+    return {
+        key: values if key in list_fields or len(values) != 1 else values[0]
+        for key, values in data.lists()
+    }
+
+
+def view_list_fields(parser_context: dict | None) -> tuple[str, ...]:
+    view = (parser_context or {}).get("view", None)
+    return getattr(view, "list_fields", ())
+
+
+class JSONParser(parsers.JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        # The whole body at once rather than through a decoding stream reader
+        encoding: str = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        try:
+            return json.loads(
+                stream.read().decode(encoding),
+                parse_constant=json.strict_constant if self.strict else None,
+            )
+        except ValueError as error:
+            raise ParseError(f"JSON parse error - {error}")
+
+
+class FormParser(parsers.FormParser):
+    def parse(self, stream, media_type=None, parser_context=None) -> dict:
+        data: QueryDict = super().parse(stream, media_type, parser_context)
+        return form_data(data, view_list_fields(parser_context))
+
+
+class MultiPartParser(parsers.MultiPartParser):
+    def parse(
+        self, stream, media_type=None, parser_context=None
+    ) -> parsers.DataAndFiles:
+        parsed: parsers.DataAndFiles = super().parse(stream, media_type, parser_context)
+        parsed.data = form_data(parsed.data, view_list_fields(parser_context))
+        return parsed
@@ -0,0 +1,103 @@
+from django.db.models import (
+    F,
+    Value,
+    Count,
+    Sum,
+    Subquery,
+    OuterRef,
+    FloatField,
+    Expression,
+)
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from apps.users.models import User, Film, Review
+
+# Note.
+# Film keeps review_count, rating_sum and avg_rating so that listings and rating filters
+# read a column instead of aggregating Review. They are updated in place with
+# F-expressions, so concurrent writes never overwrite each other. Callers are expected
+# to run these updates in the same transaction as the review write.
+
+
+def rating_changes(count_delta: int, rating_delta: int | Expression) -> dict:
+    """UPDATE expressions that add a number of reviews and their ratings to a film"""
+    review_count: Expression = F("review_count") + count_delta
+    rating_sum: Expression = F("rating_sum") + rating_delta
+    return {
+        "review_count": review_count,
+        "rating_sum": rating_sum,
+        "avg_rating": Coalesce(
+            Cast(rating_sum, FloatField()) / NullIf(review_count, 0),
+            Value(0.0),
+        ),
+    }
+
+
+def add_review(review: Review) -> None:
+    Film.objects.filter(pk=review.film_id_id).update(**rating_changes(1, review.rating))
+
+
+def remove_review(review: Review) -> None:
+    Film.objects.filter(pk=review.film_id_id).update(
+        **rating_changes(-1, -review.rating)
+    )
+
+
+def remove_user_reviews(user: User) -> None:
+    """Removes the ratings of every review of the user with a single UPDATE"""
+    # A user has at most one review per film (unique_combination)
+    user_rating: Subquery = Subquery(
+        Review.objects.filter(user_id=user, film_id=OuterRef("pk")).values("rating")[:1]
+    )
+    Film.objects.filter(
+        id__in=Review.objects.filter(user_id=user).values("film_id")
+    ).update(**rating_changes(-1, Value(-1) * user_rating))
+
+
+def rating_drift() -> list[dict]:
+    """
+    Compares the stored aggregates of every film with the ones computed from Review.
+    Returns the films whose stored values are wrong along with the expected ones.
+    """
+    expected: dict[int, tuple[int, int]] = {
+        row["film_id"]: (row["count"], row["total"])
+        for row in Review.objects.filter(film_id__isnull=False)
+        .values("film_id")
+        .annotate(count=Count("id"), total=Coalesce(Sum("rating"), 0))
+    }
+
+    drift: list[dict] = []
+    films = Film.objects.values_list("id", "review_count", "rating_sum", "avg_rating")
+    for film_id, review_count, rating_sum, avg_rating in films.iterator():
+        count, total = expected.get(film_id, (0, 0))
+        average: float = total / count if count else 0.0
+        stale_average: bool = abs(avg_rating - average) > 1e-9
+        if (review_count, rating_sum) != (count, total) or stale_average:
+            drift.append(
+                {
+                    "film_id": film_id,
+                    "stored": (review_count, rating_sum, avg_rating),
+                    "expected": (count, total, average),
+                }
+            )
+    return drift
+
+
+def rebuild_ratings() -> list[dict]:
+    """Recomputes the aggregates of every drifted film. Returns the drift found."""
+    drift: list[dict] = rating_drift()
+    films: list[Film] = []
+    for row in drift:
+        count, total, average = row["expected"]
+        films.append(
+            Film(
+                id=row["film_id"],
+                review_count=count,
+                rating_sum=total,
+                avg_rating=average,
+            )
+        )
+    Film.objects.bulk_update(
+        films, ["review_count", "rating_sum", "avg_rating"], batch_size=1000
+    )
+    return drift
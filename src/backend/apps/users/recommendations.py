@@ -0,0 +1,244 @@
+import os
+import multiprocessing
+from typing import Callable, Iterable, Iterator
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy import sparse
+from django.conf import settings
+from django.db import transaction
+
+from apps.users.factors import GROUP_SIZE, solve_factors, top_films
+from apps.users.models import RecommendedFilm, PopularFilm
+from apps.users.similarity import as_rows, insert_rows, load_reviews
+
+# Note.
+# Personal film recommendations, precomputed offline (build_recommendations command)
+# into RecommendedFilm, so a request reads the rows of one user and never Review.
+# Ratings are predicted as the global mean, plus damped film and user biases, plus
+# the dot product of low rank user and film factors. The factors are fitted by
+# alternating least squares on what the biases leave unexplained: with the film
+# factors fixed, every user's factors are a small ridge regression, and the other way
+# round. Those regressions, and the scoring of every candidate film for every user,
+# are independent, so they are split between a pool of WORKERS processes, which run
+# the functions of factors.py (no Django there, see its note).
+# Each user gets the COUNT best predicted films among the films with MIN_REVIEWS
+# reviews, leaving out the films they reviewed. Users without recommendations (new
+# since the last build) get PopularFilm, the films with the best damped mean rating.
+# Every row is computed before the previous ones are deleted, in a short transaction
+# at the end, so that the database is not locked for the fit.
+
+DEFAULT_RECOMMENDATIONS_SETTINGS: dict = {
+    "COUNT": 20,  # films per user
+    "FACTORS": 32,
+    "ITERATIONS": 10,
+    "REGULARIZATION": 0.1,
+    "BIAS_DAMPING": 10,  # reviews of the mean rating added to every film and user
+    "MIN_REVIEWS": 5,  # of a film to be recommended
+    "WORKERS": None,  # processes, every core by default
+    "START_METHOD": None,  # of the processes (fork, spawn...), the platform's default
+    "BLOCK_CELLS": 2**24,  # predicted ratings scored at once by a worker
+}
+
+
+def recommendations_settings() -> dict:
+    return {
+        **DEFAULT_RECOMMENDATIONS_SETTINGS,
+        **getattr(settings, "RECOMMENDATIONS", {}),
+    }
+
+
+def damped_means(
+    index: np.ndarray, values: np.ndarray, size: int, damping: float
+) -> np.ndarray:
+    """Mean of the values of each index, pulled towards 0 by damping zeros"""
+    counts: np.ndarray = np.bincount(index, minlength=size)
+    return np.bincount(index, weights=values, minlength=size) / (counts + damping)
+
+
+def row_blocks(matrix: sparse.csr_matrix, blocks: int) -> list[tuple[int, int]]:
+    """Row ranges splitting the matrix in blocks with about as many ratings each"""
+    bounds: np.ndarray = np.searchsorted(
+        matrix.indptr, np.linspace(0, matrix.nnz, blocks + 1), side="left"
+    )
+    bounds[0], bounds[-1] = 0, matrix.shape[0]
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if a < b]
+
+
+class Factorization:
+    """Biases and factors of the users x films rating matrix"""
+
+    def __init__(self, reviews: np.ndarray, options: dict) -> None:
+        """reviews: (id, user id, film id, rating) rows"""
+        _, user_ids, film_ids, ratings = reviews.T
+        users_index: np.ndarray
+        films_index: np.ndarray
+        self.user_ids, users_index = np.unique(user_ids, return_inverse=True)
+        self.film_ids, films_index = np.unique(film_ids, return_inverse=True)
+        self.options: dict = options
+
+        self.mean: float = float(ratings.mean()) if len(ratings) else 0.0
+        damping: float = options["BIAS_DAMPING"]
+        self.film_biases: np.ndarray = damped_means(
+            films_index, ratings - self.mean, len(self.film_ids), damping
+        )
+        self.user_biases: np.ndarray = damped_means(
+            users_index,
+            ratings - self.mean - self.film_biases[films_index],
+            len(self.user_ids),
+            damping,
+        )
+        residuals: np.ndarray = (
+            ratings
+            - self.mean
+            - self.film_biases[films_index]
+            - self.user_biases[users_index]
+        )
+        shape: tuple[int, int] = (len(self.user_ids), len(self.film_ids))
+        self.by_user: sparse.csr_matrix = sparse.csr_matrix(
+            (residuals, (users_index, films_index)), shape=shape
+        )
+        self.by_film: sparse.csr_matrix = sparse.csr_matrix(
+            (residuals, (films_index, users_index)), shape=shape[::-1]
+        )
+        # Which films each user rated (residuals can be 0)
+        self.rated: sparse.csr_matrix = sparse.csr_matrix(
+            (np.ones(len(ratings)), (users_index, films_index)), shape=shape
+        )
+        self.film_counts: np.ndarray = np.bincount(
+            films_index, minlength=len(self.film_ids)
+        )
+
+        rng: np.random.Generator = np.random.default_rng(0)
+        self.user_factors: np.ndarray = rng.normal(
+            0, 0.1, (len(self.user_ids), options["FACTORS"])
+        )
+        self.film_factors: np.ndarray = rng.normal(
+            0, 0.1, (len(self.film_ids), options["FACTORS"])
+        )
+
+    def solve(
+        self, map: Callable, matrix: sparse.csr_matrix, fixed: np.ndarray
+    ) -> np.ndarray:
+        # A few blocks per worker, so the slower ones are caught up with
+        blocks: list[tuple[int, int]] = row_blocks(matrix, self.options["WORKERS"] * 4)
+        rows: list[sparse.csr_matrix] = [matrix[a:b] for a, b in blocks]
+        solved: Iterable[np.ndarray] = map(
+            solve_factors,
+            [block.indptr for block in rows],
+            [block.indices for block in rows],
+            [block.data for block in rows],
+            [fixed] * len(blocks),
+            [self.options["REGULARIZATION"]] * len(blocks),
+        )
+        factors: np.ndarray = np.zeros((matrix.shape[0], fixed.shape[1]))
+        for (a, b), block in zip(blocks, solved):
+            factors[a:b] = block
+        return factors
+
+    def fit(self, map: Callable) -> None:
+        for _ in range(self.options["ITERATIONS"]):
+            self.user_factors = self.solve(map, self.by_user, self.film_factors)
+            self.film_factors = self.solve(map, self.by_film, self.user_factors)
+
+    def recommendations(self, map: Callable) -> Iterator[tuple[np.ndarray, ...]]:
+        """
+        User ids, film ids, ranks and predicted ratings of the recommendations,
+        arrays per block of users
+        """
+        candidates: np.ndarray = np.flatnonzero(
+            self.film_counts >= self.options["MIN_REVIEWS"]
+        )
+        if not len(candidates) or not len(self.user_ids):
+            return
+        # The ratings of every user, restricted to the candidate films
+        rated: sparse.csr_matrix = self.rated[:, candidates]
+        # Scored in single precision, padded to whole groups of films
+        padding: int = -len(candidates) % GROUP_SIZE
+        film_factors: np.ndarray = np.vstack(
+            [
+                self.film_factors[candidates],
+                np.zeros((padding, self.options["FACTORS"])),
+            ]
+        ).astype(np.float32)
+        film_biases: np.ndarray = np.concatenate(
+            [self.film_biases[candidates], np.full(padding, -np.inf)]
+        ).astype(np.float32)
+
+        size: int = max(self.options["BLOCK_CELLS"] // len(film_biases), 1)
+        blocks: list[tuple[int, int]] = [
+            (start, min(start + size, len(self.user_ids)))
+            for start in range(0, len(self.user_ids), size)
+        ]
+        best: Iterable[tuple[np.ndarray, np.ndarray]] = map(
+            top_films,
+            [self.user_factors[a:b].astype(np.float32) for a, b in blocks],
+            [film_factors] * len(blocks),
+            [film_biases] * len(blocks),
+            [rated[a:b].indptr for a, b in blocks],
+            [rated[a:b].indices for a, b in blocks],
+            [self.options["COUNT"]] * len(blocks),
+        )
+        for (a, b), (films, scores) in zip(blocks, best):
+            ratings: np.ndarray = self.mean + self.user_biases[a:b, None] + scores
+            shown: np.ndarray = np.isfinite(scores)  # Users who rated every candidate
+            users: np.ndarray = np.repeat(self.user_ids[a:b, None], films.shape[1], 1)
+            ranks: np.ndarray = np.broadcast_to(np.arange(films.shape[1]), films.shape)
+            yield (
+                users[shown],
+                self.film_ids[candidates[films[shown]]],
+                ranks[shown],
+                np.clip(ratings[shown], 1, 10),
+            )
+
+    def popular(self) -> list[tuple[int, int, float]]:
+        """(rank, film id, damped mean rating) of the most popular films"""
+        candidates: np.ndarray = np.flatnonzero(
+            self.film_counts >= self.options["MIN_REVIEWS"]
+        )
+        ratings: np.ndarray = self.mean + self.film_biases[candidates]
+        order: np.ndarray = np.argsort(-ratings, kind="stable")[: self.options["COUNT"]]
+        return list(
+            zip(
+                range(len(order)),
+                self.film_ids[candidates[order]].tolist(),
+                ratings[order].tolist(),
+            )
+        )
+
+
+def build_recommendations() -> tuple[int, int]:
+    """
+    Fits the factorization on every review and stores the recommendations of every
+    user and the popular films. Returns the number of users and of rows stored.
+    """
+    options: dict = recommendations_settings()
+    options["WORKERS"] = options["WORKERS"] or os.cpu_count() or 1
+    factorization: Factorization = Factorization(load_reviews(), options)
+
+    # Workers only compute, only this process uses the database
+    pool: ProcessPoolExecutor | None = None
+    if options["WORKERS"] > 1:
+        context: multiprocessing.context.BaseContext = multiprocessing.get_context(
+            options["START_METHOD"]
+        )
+        pool = ProcessPoolExecutor(options["WORKERS"], mp_context=context)
+    with pool or nullcontext():
+        run: Callable = pool.map if pool is not None else map
+        factorization.fit(run)
+        recommended: list[tuple[np.ndarray, ...]] = list(
+            factorization.recommendations(run)
+        )
+
+    with transaction.atomic():
+        RecommendedFilm.objects.all().delete()
+        PopularFilm.objects.all().delete()
+        insert_rows(
+            PopularFilm, ["rank", "film_id", "rating"], [factorization.popular()]
+        )
+        rows: int = insert_rows(
+            RecommendedFilm,
+            ["user_id", "film_id", "rank", "rating"],
+            as_rows(recommended),
+        )
+    return len(factorization.user_ids), rows
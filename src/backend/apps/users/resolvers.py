@@ -0,0 +1,33 @@
+from django.db import models
+
+# Note.
+# Resolve many ids (or names) of a model with a single IN query, instead of one get()
+# per value. in_bulk splits the IN list when the database limits query parameters.
+
+
+def resolve(
+    model: type[models.Model], values: list, field: str = "pk"
+) -> tuple[list[models.Model], list]:
+    """
+    Returns the instances matching the values, in the caller's order, and the values
+    that did not match any instance.
+    """
+    instances: dict = model.objects.in_bulk(
+        list(dict.fromkeys(values)), field_name=field
+    )
+    missing: list = [value for value in dict.fromkeys(values) if value not in instances]
+    return [instances[value] for value in values if value in instances], missing
+
+
+def resolve_or_create(model: type[models.Model], names: list[str]) -> dict:
+    """Maps names to instances, bulk creating the instances that do not exist yet"""
+    instances: dict = model.objects.in_bulk(list(set(names)), field_name="name")
+    missing: list[str] = [name for name in set(names) if name not in instances]
+    if missing:
+        # Conflicts are ignored in case a concurrent request created the same names,
+        # so the created instances are read back to get their ids
+        model.objects.bulk_create(
+            [model(name=name) for name in missing], ignore_conflicts=True
+        )
+        instances.update(model.objects.in_bulk(missing, field_name="name"))
+    return instances
@@ -0,0 +1,202 @@
+import re
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q, Exists, FloatField, OuterRef, QuerySet, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+from django.utils.module_loading import import_string
+
+from apps.users.models import Film
+
+# Note.
+# Film text search (film name, description, director name and cast names) is delegated
+# to a pluggable backend, selected with the FILM_SEARCH_BACKEND setting (by default,
+# depending on the database vendor):
+# - SQLiteFTSBackend keeps an FTS5 index of every film, matched with prefix queries
+#   and ranked by relevance (bm25).
+# - ContainsBackend uses plain icontains lookups, for databases without FTS5.
+# The index is kept in sync by the signals in signals.py.
+
+# Text criteria of FilmFilterSerializer handled by the search backend
+SEARCH_CRITERIA: list[str] = ["film_name", "director_name", "actor_name", "description"]
+
+TOKEN_PATTERN: re.Pattern = re.compile(r"\w+")
+
+# Rank of the films without a text match (matched by the genre criterion only): bm25
+# ranks of the matches are negative, and come first
+UNMATCHED_RANK: float = 1e9
+
+
+class SearchBackend(ABC):
+    @abstractmethod
+    def filter(self, data: dict) -> Q | None:
+        """Q matching the films that satisfy any of the text criteria in data"""
+
+    def rank(self, queryset: QuerySet, data: dict) -> QuerySet:
+        """Orders the queryset by relevance to the text criteria in data"""
+        return queryset
+
+    def index_films(self, film_ids: list[int]) -> None:
+        """(Re)indexes the given films"""
+        pass
+
+    def remove_films(self, film_ids: list[int]) -> None:
+        """Removes the given films from the index"""
+        pass
+
+    def rebuild(self) -> None:
+        """Rebuilds the whole index"""
+        pass
+
+
+def criteria(data: dict) -> dict[str, str]:
+    return {
+        key: data[key]
+        for key in SEARCH_CRITERIA
+        if data.get(key, None) is not None and not data[key] == ""
+    }
+
+
+class ContainsBackend(SearchBackend):
+    LOOKUPS: dict[str, str] = {
+        "film_name": "name__icontains",
+        "director_name": "director_id__name__icontains",
+        "description": "description__icontains",
+    }
+
+    def filter(self, data: dict) -> Q | None:
+        text_filter: Q | None = None
+        for key, value in criteria(data).items():
+            condition: Q
+            if key == "actor_name":
+                # Semi-join, so that films are not duplicated by the cast join
+                condition = Exists(
+                    Film.cast.through.objects.filter(
+                        film_id=OuterRef("pk"), actor__name__icontains=value
+                    )
+                )
+            else:
+                condition = Q(**{self.LOOKUPS[key]: value})
+            text_filter = condition if text_filter is None else text_filter | condition
+        return text_filter
+
+
+class SQLiteFTSBackend(SearchBackend):
+    TABLE = "users_film_search"
+
+    # FTS5 column of each criterion
+    COLUMNS: dict[str, str] = {
+        "film_name": "name",
+        "director_name": "director_name",
+        "actor_name": "cast_names",
+        "description": "description",
+    }
+
+    # Selects the indexed document of every film
+    DOCUMENTS_SQL = """
+        SELECT film.id, film.name, film.description, COALESCE(director.name, ''),
+            COALESCE((
+                SELECT group_concat(actor.name, ' ')
+                FROM users_film_cast film_cast
+                JOIN users_actor actor ON actor.id = film_cast.actor_id
+                WHERE film_cast.film_id = film.id
+            ), '')
+        FROM users_film film
+        LEFT JOIN users_director director ON director.id = film.director_id_id
+    """
+
+    BATCH_SIZE = 500
+
+    def match_expression(self, data: dict) -> str | None:
+        """
+        FTS5 query OR'ing every criterion on its own column. Every word of a criterion
+        must match the beginning of a word of the column (prefix matching).
+        """
+        expressions: list[str] = []
+        for key, value in criteria(data).items():
+            tokens: list[str] = TOKEN_PATTERN.findall(value.lower())
+            if tokens:
+                phrase: str = " ".join(f'"{token}"*' for token in tokens)
+                expressions.append(f"{self.COLUMNS[key]} : ({phrase})")
+        return " OR ".join(expressions) if expressions else None
+
+    def filter(self, data: dict) -> Q | None:
+        if not criteria(data):
+            return None
+        expression: str | None = self.match_expression(data)
+        if expression is None:
+            # Criteria without any word cannot match anything
+            return Q(pk__in=[])
+        return Q(
+            id__in=RawSQL(
+                f"SELECT rowid FROM {self.TABLE} WHERE {self.TABLE} MATCH %s",
+                (expression,),
+            )
+        )
+
+    def rank(self, queryset: QuerySet, data: dict) -> QuerySet:
+        expression: str | None = self.match_expression(data)
+        if expression is None:
+            return queryset
+        # The matches are ranked once and looked up by film. A subquery with a MATCH
+        # on the film's rowid would run the full text query again for every film.
+        # LIMIT -1 keeps SQLite from flattening the ranked matches into that form.
+        # Never NULL, so that it orders and pages like any other key.
+        search_rank: Coalesce = Coalesce(
+            RawSQL(
+                f"SELECT matches.rank FROM (SELECT rowid AS film_id, rank "
+                f"FROM {self.TABLE} WHERE {self.TABLE} MATCH %s LIMIT -1) AS matches "
+                f"WHERE matches.film_id = {Film._meta.db_table}.id",
+                (expression,),
+            ),
+            Value(UNMATCHED_RANK),
+            output_field=FloatField(),
+        )
+        return queryset.annotate(search_rank=search_rank).order_by("search_rank", "id")
+
+    def index_films(self, film_ids: list[int]) -> None:
+        film_ids = list(film_ids)
+        with connection.cursor() as cursor:
+            for start in range(0, len(film_ids), self.BATCH_SIZE):
+                batch: list[int] = film_ids[start : start + self.BATCH_SIZE]
+                placeholders: str = ", ".join(["%s"] * len(batch))
+                cursor.execute(
+                    f"DELETE FROM {self.TABLE} WHERE rowid IN ({placeholders})", batch
+                )
+                cursor.execute(
+                    f"INSERT INTO {self.TABLE}"
+                    "(rowid, name, description, director_name, cast_names) "
+                    f"{self.DOCUMENTS_SQL} WHERE film.id IN ({placeholders})",
+                    batch,
+                )
+
+    def remove_films(self, film_ids: list[int]) -> None:
+        film_ids = list(film_ids)
+        with connection.cursor() as cursor:
+            for start in range(0, len(film_ids), self.BATCH_SIZE):
+                batch: list[int] = film_ids[start : start + self.BATCH_SIZE]
+                placeholders: str = ", ".join(["%s"] * len(batch))
+                cursor.execute(
+                    f"DELETE FROM {self.TABLE} WHERE rowid IN ({placeholders})", batch
+                )
+
+    def rebuild(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.TABLE}")
+            cursor.execute(
+                f"INSERT INTO {self.TABLE}"
+                "(rowid, name, description, director_name, cast_names) "
+                f"{self.DOCUMENTS_SQL}"
+            )
+
+
+@lru_cache(maxsize=None)
+def get_search_backend() -> SearchBackend:
+    backend_path: str | None = getattr(settings, "FILM_SEARCH_BACKEND", None)
+    if backend_path is None:
+        if connection.vendor == "sqlite":
+            return SQLiteFTSBackend()
+        return ContainsBackend()
+    return import_string(backend_path)()
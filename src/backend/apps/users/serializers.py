@@ -4,12 +4,24 @@ from django.http import QueryDict
 from django.contrib.auth.base_user import AbstractBaseUser
 from django.core import validators
 from django.contrib.auth import authenticate
-from django.db.models import Value, Avg, Case, When
+from django.db import transaction
 from rest_framework import serializers, exceptions
 
 # from .models import User, Director, Actor, Film, Score, Review
-from apps.users import models
-from apps.users.models import User, Director, Actor, Film, Review
+from apps.users import models, leaderboards, ratings, trending
+from apps.users.dates import ACCEPTED_FORMATS, parse_date
+from apps.users.resolvers import resolve
+from apps.users.models import (
+    User,
+    Director,
+    Actor,
+    Film,
+    Review,
+    SimilarFilm,
+    LeaderboardFilm,
+    RecommendedFilm,
+    PopularFilm,
+)
 
 PASSWORD_VALIDATION_PATTERN = r"^(?=.*[0-9])(?=.*[A-Z])(?=.*[a-z]).*$"
 
@@ -23,6 +35,24 @@ PASSWORD_VALIDATION_PATTERN = r"^(?=.*[0-9])(?=.*[A-Z])(?=.*[a-z]).*$"
 # https://stackoverflow.com/questions/38845051/how-to-update-user-password-in-django-rest-framework
 
 
+def validate_date(value, field: str) -> datetime.datetime:
+    """Release date validation shared by the film and film filter serializers"""
+    if type(value) is not str and type(value) is not datetime.datetime:
+        message: str = "Invalid date format. Release must be string or datetime"
+        raise serializers.ValidationError({field: [message]})
+    if type(value) is str:
+        try:
+            date: datetime.datetime | None = parse_date(value)
+        except ValueError:
+            raise serializers.ValidationError({field: ["Invalid date."]})
+        if date is None:
+            raise serializers.ValidationError(
+                "Invalid date format.", f"Accepted formats: {ACCEPTED_FORMATS}"
+            )
+        return date
+    return value
+
+
 class UserSerializer(serializers.ModelSerializer):
 
     email: serializers.Field = serializers.EmailField(style={"input_type": "email"})
@@ -424,33 +454,7 @@ class FilmSerializer(serializers.ModelSerializer):
     def validate_release(self, value) -> str:
         if value is None or value == "":
             raise serializers.ValidationError({"release": ["Release date required."]})
-        if type(value) is not str and type(value) is not datetime.datetime:
-            message: str = "Invalid date format. Release must be string or datetime"
-            raise serializers.ValidationError({"release": [message]})
-        if type(value) is str:
-            try:
-                patterns: dict[str, str] = {
-                    "%Y": r"^\d{4}$",
-                    "%Y-%m": r"^\d{4}-\d{2}$",
-                    "%Y-%m-%d": r"^\d{4}-\d{2}-\d{2}$",
-                    "%m-%Y": r"^\d{2}-\d{4}$",
-                    "%d-%m-%Y": r"^\d{2}-\d{2}-\d{4}$",
-                }
-                format_match: bool = False
-                for date_format, pattern in patterns.items():
-                    if re.match(pattern, value):
-                        format_match = True
-                        return datetime.datetime.strptime(value, date_format)
-
-                if not format_match:
-                    raise serializers.ValidationError(
-                        "Invalid date format.",
-                        "Accepted formats: %Y, %Y-%m, %Y-%m-%d, %m-%Y, %d-%m-%Y",
-                    )
-
-            except ValueError:
-                raise serializers.ValidationError({"release": ["Invalid date."]})
-        return value
+        return validate_date(value, "release")
 
     def validate_genre(self, value: str) -> str:
         if value is None or value == "":
@@ -507,42 +511,36 @@ class FilmSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 {"cast": ["Cast must be a list of names (list[str])."]}
             )
-        try:
-            instance: Actor
-            instances: list[Actor] = []
-            for id in value:
-                if id is None or type(id) is not int:
-                    raise serializers.ValidationError({"cast": ["Invalid cast ID."]})
-                else:
-                    # instance = Actor.objects.filter(pk__in=id)
-                    instance = Actor.objects.get(pk=id)
-                    instances.append(instance)
-        except Actor.DoesNotExist:
+        if any(id is None or type(id) is not int for id in value):
             raise serializers.ValidationError({"cast": ["Invalid cast ID."]})
 
+        # Resolve every actor with a single query
+        instances: list[Actor]
+        missing: list[int]
+        instances, missing = resolve(Actor, value)
+        if missing:
+            missing_ids: str = ", ".join(str(id) for id in missing)
+            raise serializers.ValidationError(
+                {"cast": [f"Invalid cast ID: {missing_ids}."]}
+            )
+
         return instances
 
-    def to_representation(self, instance: Review) -> dict:
-        """Transforms the instance into its JSON representation."""
+    def to_representation(self, instance: Film) -> dict:
+        """
+        Transforms the instance into its JSON representation.
+
+        Director and cast are read from the instance itself, so the instance should
+        come from Film.objects.for_listing() to avoid extra queries.
+        """
         representation: dict = super().to_representation(instance)
 
-        director_id: int = representation.pop("director_id", None)
-        representation["director"] = Director.objects.get(id=director_id).name
-        cast_ids: int = representation.get("cast", None)
-        representation["cast"] = [
-            Actor.objects.get(id=cast_id).name for cast_id in cast_ids
-        ]
+        representation.pop("director_id", None)
+        director: Director | None = instance.director_id
+        representation["director"] = director.name if director is not None else None
+        representation["cast"] = [actor.name for actor in instance.cast.all()]
 
-        # Add the average rating
-        avg_rating: float = instance.reviews.aggregate(
-            avg_rating=Avg(
-                Case(
-                    When(rating__isnull=True, then=Value(0)),
-                    default="rating",
-                )
-            )
-        )["avg_rating"]
-        representation["avg_rating"] = avg_rating if avg_rating is not None else 0
+        representation["avg_rating"] = instance.avg_rating
 
         return representation
 
@@ -613,7 +611,7 @@ class FilmFilterSerializer(serializers.Serializer):
         genre: str | None = data.get("genre", None)
         if genre is not None and not genre == "":
             data["genre"] = self.validate_genre(genre)
-        description: str | None = data.get("genre", None)
+        description: str | None = data.get("description", None)
         if description is not None and not description == "":
             data["description"] = self.validate_description(description)
 
@@ -685,62 +683,10 @@ class FilmFilterSerializer(serializers.Serializer):
         return value
 
     def validate_min_release(self, value: str) -> str:
-        if type(value) is not str and type(value) is not datetime.datetime:
-            message: str = "Invalid date format. Release must be string or datetime"
-            raise serializers.ValidationError({"min_release": [message]})
-        if type(value) is str:
-            try:
-                patterns: dict[str, str] = {
-                    "%Y": r"^\d{4}$",
-                    "%Y-%m": r"^\d{4}-\d{2}$",
-                    "%Y-%m-%d": r"^\d{4}-\d{2}-\d{2}$",
-                    "%m-%Y": r"^\d{2}-\d{4}$",
-                    "%d-%m-%Y": r"^\d{2}-\d{2}-\d{4}$",
-                }
-                format_match: bool = False
-                for date_format, pattern in patterns.items():
-                    if re.match(pattern, value):
-                        format_match = True
-                        return datetime.datetime.strptime(value, date_format)
-
-                if not format_match:
-                    raise serializers.ValidationError(
-                        "Invalid date format.",
-                        "Accepted formats: %Y, %Y-%m, %Y-%m-%d, %m-%Y, %d-%m-%Y",
-                    )
-
-            except ValueError:
-                raise serializers.ValidationError({"min_release": ["Invalid date."]})
-        return value
+        return validate_date(value, "min_release")
 
     def validate_max_release(self, value: str) -> str:
-        if type(value) is not str and type(value) is not datetime.datetime:
-            message: str = "Invalid date format. Release must be string or datetime"
-            raise serializers.ValidationError({"max_release": [message]})
-        if type(value) is str:
-            try:
-                patterns: dict[str, str] = {
-                    "%Y": r"^\d{4}$",
-                    "%Y-%m": r"^\d{4}-\d{2}$",
-                    "%Y-%m-%d": r"^\d{4}-\d{2}-\d{2}$",
-                    "%m-%Y": r"^\d{2}-\d{4}$",
-                    "%d-%m-%Y": r"^\d{2}-\d{2}-\d{4}$",
-                }
-                format_match: bool = False
-                for date_format, pattern in patterns.items():
-                    if re.match(pattern, value):
-                        format_match = True
-                        return datetime.datetime.strptime(value, date_format)
-
-                if not format_match:
-                    raise serializers.ValidationError(
-                        "Invalid date format.",
-                        "Accepted formats: %Y, %Y-%m, %Y-%m-%d, %m-%Y, %d-%m-%Y",
-                    )
-
-            except ValueError:
-                raise serializers.ValidationError({"max_release": ["Invalid date."]})
-        return value
+        return validate_date(value, "max_release")
 
     def validate_min_rating(self, value: int) -> int:
         try:
@@ -777,6 +723,89 @@ class DeleteFilmSerializer(serializers.ModelSerializer):
         fields: list[str] = ["name"]
 
 
+def film_summary(film: Film) -> dict:
+    """Fields of a film in the film listings of the similar films, recommendations..."""
+    return {
+        "id": film.id,
+        "name": film.name,
+        "release": film.release.isoformat(),
+        "genre": film.genre,
+        "avg_rating": film.avg_rating,
+    }
+
+
+class SimilarFilmSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SimilarFilm
+        fields: list[str] = ["similarity"]
+
+    def to_representation(self, instance: SimilarFilm) -> dict:
+        """
+        Transforms the instance into the JSON representation of the similar film.
+
+        The film is read from the instance itself, so the instance should come from
+        SimilarFilm.objects.for_listing() to avoid extra queries.
+        """
+        representation: dict = film_summary(instance.similar_id)
+        representation["similarity"] = instance.similarity
+
+        return representation
+
+
+class RecommendedFilmSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RecommendedFilm
+        fields: list[str] = ["rating"]
+
+    def to_representation(self, instance: RecommendedFilm | PopularFilm) -> dict:
+        """
+        Transforms the instance, a recommended or a popular film, into the JSON
+        representation of the film.
+
+        The film is read from the instance itself, so the instance should come from
+        for_listing() to avoid extra queries.
+        """
+        representation: dict = film_summary(instance.film_id)
+        representation["predicted_rating"] = instance.rating
+
+        return representation
+
+
+class TrendingFilmSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Film
+        fields: list[str] = ["id"]
+
+    def to_representation(self, instance: Film) -> dict:
+        """
+        Transforms the film into the JSON representation of a trending film, along
+        with its reviews in the window (from trending.trending_films()).
+        """
+        representation: dict = film_summary(instance)
+        representation["recent_reviews"] = instance.recent_reviews
+
+        return representation
+
+
+class LeaderboardFilmSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LeaderboardFilm
+        fields: list[str] = ["rank"]
+
+    def to_representation(self, instance: LeaderboardFilm) -> dict:
+        """
+        Transforms the instance into the JSON representation of the film, along with
+        its rank in the leaderboard (1 for the best film).
+
+        The film is read from the instance itself, so the instance should come from
+        for_listing() to avoid extra queries.
+        """
+        representation: dict = film_summary(instance.film_id)
+        representation["rank"] = instance.rank + 1
+
+        return representation
+
+
 class ReviewSerializer(serializers.ModelSerializer):
     id: serializers.Field = serializers.IntegerField(read_only=True)
     rating: serializers.Field = serializers.IntegerField()
@@ -872,9 +901,13 @@ class ReviewSerializer(serializers.ModelSerializer):
 
         representation: dict = {}
         representation["id"] = instance.id
-        representation["user_id"] = instance.user_id.id
-        representation["film_id"] = instance.film_id.id
-        representation["film"] = instance.film_id.name
+        # Raw foreign keys, reading the relations would load the user and the film
+        representation["user_id"] = instance.user_id_id
+        representation["film_id"] = instance.film_id_id
+        if hasattr(instance, "film_name"):  # Reviews from for_listing()
+            representation["film"] = instance.film_name
+        else:
+            representation["film"] = instance.film_id.name if instance.film_id else None
         representation["content"] = instance.content
         representation["rating"] = instance.rating
 
@@ -883,10 +916,13 @@ class ReviewSerializer(serializers.ModelSerializer):
     def create(self, validated_data: dict) -> Review:
         film: Film = validated_data.pop("film_id")
         user: User = validated_data.pop("user_id")
-        review: Review = Review.objects.create(**validated_data)
-        review.user_id = user
-        review.film_id = film
-        review.save()
+        with transaction.atomic():
+            review: Review = Review.objects.create(
+                user_id=user, film_id=film, **validated_data
+            )
+            ratings.add_review(review)
+            trending.add_review(review)
+            leaderboards.refresh_film(review.film_id_id)
         return review
 
 
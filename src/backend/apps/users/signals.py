@@ -0,0 +1,144 @@
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from apps.users import leaderboards
+from apps.users.autocomplete import autocomplete_index
+from apps.users.caching import film_cache
+from apps.users.models import Director, Actor, Film, Review
+from apps.users.search import get_search_backend
+from apps.users.similarity import mark_stale
+
+# Note.
+# Keeps the film search index in sync with the indexed fields: film name and
+# description, director name and cast names. Deleting a director or an actor updates
+# its films without sending any film signal (SET_NULL / through rows cascade), so the
+# affected films are collected in pre_delete and reindexed in post_delete.
+# Any change of a film, its director, cast or reviews also invalidates the cached film
+# responses (see caching.py). Bulk writes send no signals, so they invalidate them
+# explicitly.
+# Review writes mark their film for the next similar films refresh (see
+# similarity.py). Edited and deleted films are ranked again in the top rated films of
+# their genre (see leaderboards.py), their reviews are handled by the review views.
+# Names and reviews written by this worker update its autocomplete index once
+# committed (see autocomplete.py).
+
+
+@receiver(post_save, sender=Film)
+def index_saved_film(sender: type, instance: Film, **kwargs) -> None:
+    get_search_backend().index_films([instance.id])
+
+
+@receiver(post_delete, sender=Film)
+def remove_deleted_film(sender: type, instance: Film, **kwargs) -> None:
+    get_search_backend().remove_films([instance.id])
+
+
+@receiver(post_save, sender=Director)
+@receiver(post_save, sender=Actor)
+def index_person_films(sender: type, instance: Director | Actor, **kwargs) -> None:
+    if not kwargs.get("created", False):
+        film_ids: list[int] = list(instance.films.values_list("id", flat=True))
+        get_search_backend().index_films(film_ids)
+
+
+@receiver(pre_delete, sender=Director)
+@receiver(pre_delete, sender=Actor)
+def collect_person_films(sender: type, instance: Director | Actor, **kwargs) -> None:
+    instance._search_film_ids = list(instance.films.values_list("id", flat=True))
+
+
+@receiver(post_delete, sender=Director)
+@receiver(post_delete, sender=Actor)
+def reindex_person_films(sender: type, instance: Director | Actor, **kwargs) -> None:
+    get_search_backend().index_films(getattr(instance, "_search_film_ids", []))
+
+
+@receiver(m2m_changed, sender=Film.cast.through)
+def index_cast_change(
+    sender: type, instance: Film | Actor, action: str, reverse: bool, **kwargs
+) -> None:
+    if action == "pre_clear" and reverse:
+        # The films of the actor are no longer known after the clear
+        instance._search_film_ids = list(instance.films.values_list("id", flat=True))
+    elif action in ("post_add", "post_remove"):
+        if reverse:
+            get_search_backend().index_films(kwargs.get("pk_set") or [])
+        else:
+            get_search_backend().index_films([instance.id])
+    elif action == "post_clear":
+        if reverse:
+            get_search_backend().index_films(getattr(instance, "_search_film_ids", []))
+        else:
+            get_search_backend().index_films([instance.id])
+
+
+@receiver(post_save, sender=Film)
+@receiver(post_delete, sender=Film)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Director)
+@receiver(post_delete, sender=Actor)
+def invalidate_film_responses(sender: type, **kwargs) -> None:
+    film_cache.invalidate()
+
+
+@receiver(post_save, sender=Director)
+@receiver(post_save, sender=Actor)
+def invalidate_person_responses(sender: type, **kwargs) -> None:
+    if not kwargs.get("created", False):
+        film_cache.invalidate()
+
+
+@receiver(m2m_changed, sender=Film.cast.through)
+def invalidate_cast_responses(sender: type, action: str, **kwargs) -> None:
+    if action in ("post_add", "post_remove", "post_clear"):
+        film_cache.invalidate()
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def mark_similar_films_stale(sender: type, instance: Review, **kwargs) -> None:
+    mark_stale(instance)
+
+
+@receiver(post_save, sender=Film)
+def rank_saved_film(sender: type, instance: Film, **kwargs) -> None:
+    # New films have no reviews yet
+    if not kwargs.get("created", False):
+        leaderboards.refresh_film(instance.id)
+
+
+@receiver(post_delete, sender=Film)
+def rank_deleted_film(sender: type, instance: Film, **kwargs) -> None:
+    # Its row is gone with it, the films after it are ranked again
+    if instance.review_count > 0 and instance.genre in Film.GENRE_CHOICES:
+        leaderboards.rank_genre(instance.genre)
+
+
+@receiver(post_save, sender=Film)
+@receiver(post_save, sender=Director)
+@receiver(post_save, sender=Actor)
+def autocomplete_saved_name(
+    sender: type, instance: Film | Director | Actor, **kwargs
+) -> None:
+    autocomplete_index.save(instance)
+
+
+@receiver(post_delete, sender=Film)
+@receiver(post_delete, sender=Director)
+@receiver(post_delete, sender=Actor)
+def autocomplete_deleted_name(
+    sender: type, instance: Film | Director | Actor, **kwargs
+) -> None:
+    autocomplete_index.delete(instance)
+
+
+@receiver(post_save, sender=Review)
+def autocomplete_new_review(sender: type, instance: Review, **kwargs) -> None:
+    if kwargs.get("created", False):
+        autocomplete_index.add_reviews(instance.film_id_id, 1)
+
+
+@receiver(post_delete, sender=Review)
+def autocomplete_deleted_review(sender: type, instance: Review, **kwargs) -> None:
+    autocomplete_index.add_reviews(instance.film_id_id, -1)
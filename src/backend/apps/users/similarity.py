@@ -0,0 +1,261 @@
+from typing import Iterable, Iterator
+import numpy as np
+from scipy import sparse
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import QuerySet
+
+from apps.users.models import Review, SimilarFilm, StaleSimilarFilm
+
+# Note.
+# Item-to-item "similar films", precomputed offline (build_similar_films command) into
+# SimilarFilm, so a request reads the rows of one film. Similarity is the adjusted
+# cosine of the ratings: every rating is centered on the mean of its user, and two
+# films are as similar as the cosine of their centered rating columns.
+# The users x films rating matrix is sparse, films are compared block by block (one
+# sparse product per block of films) and only the top NEIGHBOURS with a positive
+# similarity are kept. Heavy users rate a large part of the catalog and make every
+# product dense, so only their MAX_USER_RATINGS most recent ratings are compared.
+# New and deleted reviews mark their film stale (see signals.py), and a refresh only
+# recomputes the rows of the films affected by the stale ones: the stale films, the
+# films listing one of them, and the films one of them is now similar enough to enter
+# the list of. A review also shifts the mean of its user, and so every rating of the
+# user: other similarities drift until the next full build.
+# Similar films are computed before any row is deleted, and written in a short
+# transaction at the end, so that the database is not locked for the computation.
+
+DEFAULT_SIMILAR_FILMS_SETTINGS: dict = {
+    "NEIGHBOURS": 20,
+    "MAX_USER_RATINGS": 500,
+    "BLOCK_SIZE": 2000,  # films per sparse product
+}
+
+BATCH_SIZE = 5000  # reviews per fetch
+DELETE_BATCH_SIZE = 500  # film ids per DELETE, under SQLite's variable limit
+
+
+def similar_films_settings() -> dict:
+    return {
+        **DEFAULT_SIMILAR_FILMS_SETTINGS,
+        **getattr(settings, "SIMILAR_FILMS", {}),
+    }
+
+
+class RatingMatrix:
+    """Reviews as a sparse users x films matrix of ratings centered per user"""
+
+    def __init__(self, reviews: np.ndarray, max_user_ratings: int) -> None:
+        """reviews: (id, user id, film id, rating) rows"""
+        review_ids, user_ids, film_ids, ratings = reviews.T
+        users: np.ndarray
+        films: np.ndarray
+        users, users_index = np.unique(user_ids, return_inverse=True)
+        self.film_ids, films = np.unique(film_ids, return_inverse=True)
+
+        # Centered on the mean of every rating of the user
+        counts: np.ndarray = np.bincount(users_index, minlength=len(users))
+        means: np.ndarray = np.bincount(users_index, weights=ratings) / counts
+        centered: np.ndarray = ratings - means[users_index]
+
+        # Most recent ratings of each user first, the older ones over the limit dropped
+        order: np.ndarray = np.lexsort((-review_ids, users_index))
+        starts: np.ndarray = np.cumsum(counts) - counts
+        kept: np.ndarray = order[
+            np.arange(len(order)) - starts[users_index[order]] < max_user_ratings
+        ]
+
+        matrix: sparse.csc_matrix = sparse.csc_matrix(
+            (centered[kept], (users_index[kept], films[kept])),
+            shape=(len(users), len(self.film_ids)),
+        )
+        # Unit columns, so products are cosines. Films rated by users who always give
+        # the same score have no direction and are similar to none.
+        norms: np.ndarray = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)))
+        scale: np.ndarray = np.divide(
+            1.0, norms.ravel(), out=np.zeros(norms.size), where=norms.ravel() > 0
+        )
+        self.columns: sparse.csc_matrix = (matrix @ sparse.diags(scale)).tocsc()
+        self.rows: sparse.csr_matrix = self.columns.T.tocsr()
+
+    def neighbours(
+        self, films: np.ndarray, count: int, block_size: int
+    ) -> Iterator[tuple[np.ndarray, ...]]:
+        """
+        Film ids, similar film ids, ranks and similarities of the films (column
+        indexes), arrays per block, most similar first.
+        """
+        for start in range(0, len(films), block_size):
+            block: np.ndarray = films[start : start + block_size]
+            product: sparse.csr_matrix = (self.rows[block] @ self.columns).tocsr()
+
+            rows: np.ndarray = np.repeat(np.arange(len(block)), np.diff(product.indptr))
+            similar: np.ndarray = (product.data > 0) & (product.indices != block[rows])
+            rows = rows[similar]
+            columns: np.ndarray = product.indices[similar]
+            similarities: np.ndarray = product.data[similar]
+
+            # By row, then by decreasing similarity (similarities are at most 1)
+            order: np.ndarray = np.argsort(rows * 2.0 - similarities)
+            rows, columns, similarities = (
+                rows[order],
+                columns[order],
+                similarities[order],
+            )
+            ranks: np.ndarray = np.arange(len(rows)) - np.searchsorted(rows, rows)
+            top: np.ndarray = ranks < count
+            yield (
+                self.film_ids[block[rows[top]]],
+                self.film_ids[columns[top]],
+                ranks[top],
+                similarities[top],
+            )
+
+    def entering(
+        self, films: np.ndarray, thresholds: np.ndarray, block_size: int
+    ) -> np.ndarray:
+        """
+        Ids of the films more similar to one of the films (column indexes) than their
+        threshold (by column index)
+        """
+        entering: list[np.ndarray] = [np.array([], dtype=np.int64)]
+        for start in range(0, len(films), block_size):
+            block: np.ndarray = films[start : start + block_size]
+            # Similarities are symmetric, the rows of the films give their columns
+            product: sparse.csr_matrix = (self.rows[block] @ self.columns).tocsr()
+            entering.append(product.indices[product.data > thresholds[product.indices]])
+        return self.film_ids[np.unique(np.concatenate(entering))]
+
+
+def load_reviews() -> np.ndarray:
+    """(id, user id, film id, rating) rows of every review of a user and a film"""
+    reviews: QuerySet = Review.objects.filter(
+        user_id__isnull=False, film_id__isnull=False
+    ).values_list("id", "user_id", "film_id", "rating")
+    rows: np.ndarray = np.array(list(reviews.iterator(chunk_size=BATCH_SIZE)))
+    return rows.reshape(-1, 4).astype(np.int64)
+
+
+def insert_rows(model: type, fields: list[str], rows: Iterable[list[tuple]]) -> int:
+    """
+    Inserts lists of rows of the fields, millions of them, without building a model
+    instance for each. Returns the rows inserted.
+    """
+    table: str = connection.ops.quote_name(model._meta.db_table)
+    columns: str = ", ".join(
+        connection.ops.quote_name(model._meta.get_field(name).column) for name in fields
+    )
+    placeholders: str = ", ".join(["%s"] * len(fields))
+    inserted: int = 0
+    with connection.cursor() as cursor:
+        for batch in rows:
+            cursor.executemany(
+                f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", batch
+            )
+            inserted += len(batch)
+    return inserted
+
+
+def as_rows(blocks: Iterable[tuple[np.ndarray, ...]]) -> Iterator[list[tuple]]:
+    """Lists of rows (for insert_rows) of blocks of columns (arrays)"""
+    for block in blocks:
+        yield list(zip(*(column.tolist() for column in block)))
+
+
+def load_ratings() -> RatingMatrix:
+    return RatingMatrix(load_reviews(), similar_films_settings()["MAX_USER_RATINGS"])
+
+
+def batches(ids: list[int]) -> Iterator[list[int]]:
+    for start in range(0, len(ids), DELETE_BATCH_SIZE):
+        yield ids[start : start + DELETE_BATCH_SIZE]
+
+
+def compute_similar_films(
+    matrix: RatingMatrix, film_ids: list[int] | None = None
+) -> list[tuple[np.ndarray, ...]]:
+    """The similar films of the films (every rated film by default), per block"""
+    options: dict = similar_films_settings()
+    films: np.ndarray = np.arange(len(matrix.film_ids))
+    if film_ids is not None:
+        films = films[np.isin(matrix.film_ids, film_ids)]
+    return list(matrix.neighbours(films, options["NEIGHBOURS"], options["BLOCK_SIZE"]))
+
+
+def save_similar_films(blocks: list[tuple[np.ndarray, ...]]) -> int:
+    """Stores the similar films computed by compute_similar_films. Returns the rows."""
+    return insert_rows(
+        SimilarFilm,
+        ["film_id", "similar_id", "rank", "similarity"],
+        as_rows(blocks),
+    )
+
+
+def affected_films(matrix: RatingMatrix, stale: list[int]) -> list[int]:
+    """
+    The films whose similar films change along with the stale films: the stale
+    films, the films listing one of them, and the films one of them now enters the
+    list of (more similar than the last one of a full list, or than 0)
+    """
+    options: dict = similar_films_settings()
+    affected: set[int] = set(stale)
+    for batch in batches(stale):
+        affected.update(
+            SimilarFilm.objects.filter(similar_id__in=batch).values_list(
+                "film_id", flat=True
+            )
+        )
+
+    last: dict[int, float] = dict(
+        SimilarFilm.objects.filter(rank=options["NEIGHBOURS"] - 1).values_list(
+            "film_id", "similarity"
+        )
+    )
+    thresholds: np.ndarray = np.array(
+        [last.get(film_id, 0.0) for film_id in matrix.film_ids.tolist()]
+    )
+    stale_films: np.ndarray = np.flatnonzero(np.isin(matrix.film_ids, stale))
+    affected.update(
+        matrix.entering(stale_films, thresholds, options["BLOCK_SIZE"]).tolist()
+    )
+    return sorted(affected)
+
+
+def build_similar_films() -> int:
+    """Recomputes the similar films of every film. Returns the rows stored."""
+    # Films marked stale afterwards are refreshed next time
+    stale: list[int] = list(StaleSimilarFilm.objects.values_list("film_id", flat=True))
+    blocks: list[tuple[np.ndarray, ...]] = compute_similar_films(load_ratings())
+    with transaction.atomic():
+        for batch in batches(stale):
+            StaleSimilarFilm.objects.filter(film_id__in=batch).delete()
+        SimilarFilm.objects.all().delete()
+        return save_similar_films(blocks)
+
+
+def refresh_similar_films() -> tuple[int, int, int]:
+    """
+    Recomputes the similar films of the films affected by the stale films only.
+    Returns the number of stale films, of films recomputed, and the rows stored.
+    """
+    stale: list[int] = list(
+        StaleSimilarFilm.objects.values_list("film_id", flat=True).order_by("film_id")
+    )
+    if not stale:
+        return 0, 0, 0
+    matrix: RatingMatrix = load_ratings()
+    films: list[int] = affected_films(matrix, stale)
+    blocks: list[tuple[np.ndarray, ...]] = compute_similar_films(matrix, films)
+    with transaction.atomic():
+        for batch in batches(stale):
+            StaleSimilarFilm.objects.filter(film_id__in=batch).delete()
+        for batch in batches(films):
+            SimilarFilm.objects.filter(film_id__in=batch).delete()
+        return len(stale), len(films), save_similar_films(blocks)
+
+
+def mark_stale(review: Review) -> None:
+    """Marks the film of a new, updated or deleted review for the next refresh"""
+    if review.film_id_id is not None:
+        StaleSimilarFilm.objects.bulk_create(
+            [StaleSimilarFilm(film_id_id=review.film_id_id)], ignore_conflicts=True
+        )
@@ -0,0 +1,60 @@
+import json
+from typing import Iterator
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+
+# Note.
+# Streaming mode of the listing endpoints, requested with ?stream=true. Instead of
+# building the whole serialized list and rendering it at once, the queryset is read in
+# chunks with iterator(), each row is serialized on its own and the JSON document is
+# sent in fragments, so memory and time to first byte do not depend on the number of
+# rows. The document has the same shape as the regular response.
+# Errors can not be reported once the response has started, so the request must be
+# validated before streaming.
+
+STREAM_PARAM = "stream"
+CHUNK_SIZE = 500  # rows read (and prefetched) from the database at once
+BUFFER_SIZE = 64 * 1024  # bytes sent at once
+
+TRUE_VALUES: list[str] = ["1", "true", "yes"]
+
+
+def wants_stream(request: Request) -> bool:
+    return request.query_params.get(STREAM_PARAM, "").lower() in TRUE_VALUES
+
+
+def iter_json_list(
+    key: str,
+    queryset: QuerySet,
+    serializer: serializers.Serializer,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """Yields the document {key: [rows]} in fragments of about BUFFER_SIZE bytes"""
+    encoder: json.JSONEncoder = JSONEncoder(ensure_ascii=False)
+    buffer: list[str] = [f"{{{json.dumps(key)}: ["]
+    buffered: int = 0
+    separator: str = ""
+    for instance in queryset.iterator(chunk_size=chunk_size):
+        fragment: str = separator + encoder.encode(
+            serializer.to_representation(instance)
+        )
+        separator = ", "
+        buffer.append(fragment)
+        buffered += len(fragment)
+        if buffered >= BUFFER_SIZE:
+            yield "".join(buffer).encode("utf-8")
+            buffer = []
+            buffered = 0
+    buffer.append("]}")
+    yield "".join(buffer).encode("utf-8")
+
+
+def streaming_response(
+    key: str, queryset: QuerySet, serializer: serializers.Serializer
+) -> StreamingHttpResponse:
+    return StreamingHttpResponse(
+        iter_json_list(key, queryset, serializer), content_type="application/json"
+    )
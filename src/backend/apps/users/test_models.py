@@ -1,5 +1,8 @@
 import json
+import datetime
 from django.test import TestCase
+from rest_framework import serializers
+from apps.users.dates import parse_date, parse_date_string
 from apps.users.models import User, Director, Actor, Film
 from apps.users.serializers import (
     UserSerializer,
@@ -340,6 +343,25 @@ class TestModels(TestCase):
                 f"Failed film test {i+1}. {message}\nData:\n{json.dumps(data)}",
             )
 
+    def test_film_cast_validation(self) -> None:
+        actors: list[Actor] = Actor.objects.bulk_create(
+            [Actor(name=f"Test Actor {i}") for i in range(60)]
+        )
+        cast: list[int] = [actor.id for actor in reversed(actors)]
+        serializer: FilmSerializer = FilmSerializer()
+
+        # The whole cast is resolved with one query, keeping the caller's order
+        with self.assertNumQueries(1):
+            instances: list[Actor] = serializer.validate_cast(cast)
+        self.assertEqual([actor.id for actor in instances], cast)
+
+        # Every missing id is reported
+        with self.assertRaises(serializers.ValidationError) as context:
+            serializer.validate_cast([998, actors[0].id, 999])
+        self.assertEqual(
+            context.exception.detail["cast"], ["Invalid cast ID: 998, 999."]
+        )
+
     def test_review(self) -> None:
         valid_user: User = User.objects.create(
             username="test_username", email="test1@test1.com", password="Password1"
@@ -424,3 +446,29 @@ class TestModels(TestCase):
                 instance_valid is valid,
                 f"Failed review test {i+1}. {message}\nData:\n{json.dumps(data)}",
             )
+
+    def test_release_dates(self) -> None:
+        date_tests: list[tuple[str, datetime.datetime | None]] = [
+            ("2021-03-04", datetime.datetime(2021, 3, 4)),
+            ("2021", datetime.datetime(2021, 1, 1)),
+            ("2021-03", datetime.datetime(2021, 3, 1)),
+            ("03-2021", datetime.datetime(2021, 3, 1)),
+            ("04-03-2021", datetime.datetime(2021, 3, 4)),
+            ("2021-01-01a", None),
+            ("20210101", None),  # Other ISO forms are not accepted
+            ("2021-W01-1", None),
+        ]
+        for value, date in date_tests:
+            self.assertEqual(parse_date(value), date, msg=value)
+            # Cached
+            self.assertEqual(parse_date(value), date, msg=value)
+
+        # Strings longer than any date are not cached
+        size: int = parse_date_string.cache_info().currsize
+        self.assertIsNone(parse_date("2021-01-01" * 100))
+        self.assertEqual(parse_date_string.cache_info().currsize, size)
+
+        with self.assertRaises(ValueError):
+            parse_date("2021-02-30")
+        with self.assertRaises(serializers.ValidationError):
+            FilmSerializer().validate_release("2021-13-01")
@@ -51,6 +51,38 @@ class TestUrls(SimpleTestCase):
         url: str = reverse("film_reviews", args=[1])
         self.assertEqual(resolve(url).func.view_class.__name__, "FilmReviewsView")
 
+    def test_user_recommendations_url(self) -> None:
+        url: str = reverse("user_recommendations")
+        self.assertEqual(resolve(url).func.view_class.__name__, "RecommendationsView")
+
+    def test_film_similar_url(self) -> None:
+        url: str = reverse("film_similar", args=[1])
+        self.assertEqual(resolve(url).func.view_class.__name__, "SimilarFilmsView")
+
+    def test_film_trending_url(self) -> None:
+        url: str = reverse("film_trending")
+        self.assertEqual(resolve(url).func.view_class.__name__, "TrendingFilmsView")
+
+    def test_film_leaderboard_url(self) -> None:
+        url: str = reverse("film_leaderboard", args=["Drama"])
+        self.assertEqual(resolve(url).func.view_class.__name__, "LeaderboardView")
+
+    def test_autocomplete_url(self) -> None:
+        url: str = reverse("autocomplete")
+        self.assertEqual(resolve(url).func.view_class.__name__, "AutocompleteView")
+
+    def test_async_film_filter_url(self) -> None:
+        url: str = reverse("async_film_filter")
+        self.assertEqual(resolve(url).func.view_class.__name__, "AsyncFilterFilmsView")
+
+    def test_async_film_info_url(self) -> None:
+        url: str = reverse("async_film_info", args=[1])
+        self.assertEqual(resolve(url).func.view_class.__name__, "AsyncFilmDetailView")
+
+    def test_async_film_reviews_url(self) -> None:
+        url: str = reverse("async_film_reviews", args=[1])
+        self.assertEqual(resolve(url).func.view_class.__name__, "AsyncFilmReviewsView")
+
     def test_add_dir_url(self) -> None:
         url: str = reverse("add_dir")
         self.assertEqual(resolve(url).func.view_class.__name__, "AggregateDirectorView")
@@ -63,6 +95,10 @@ class TestUrls(SimpleTestCase):
         url: str = reverse("add_film")
         self.assertEqual(resolve(url).func.view_class.__name__, "AggregateFilmView")
 
+    def test_bulk_films_url(self) -> None:
+        url: str = reverse("bulk_films")
+        self.assertEqual(resolve(url).func.view_class.__name__, "BulkFilmImportView")
+
     def test_del_dir_url(self) -> None:
         url: str = reverse("del_dir")
         self.assertEqual(resolve(url).func.view_class.__name__, "DeleteDirectorView")
@@ -1,9 +1,42 @@
 import json
-from datetime import datetime
-from apps.users.models import User, Film, Director, Actor, Review
+import random
+import tempfile
+import threading
+import tracemalloc
+from io import BytesIO, StringIO
+from pathlib import Path
+from urllib.parse import urlencode
+from datetime import datetime, timedelta
+from core.database import SQLITE_PRAGMAS, database_from_environment
+from core.middleware import QueryBudgetExceeded
+from apps.users import leaderboards, ratings, trending
+from apps.users.autocomplete import PrefixIndex, Entry, autocomplete_index
+from apps.users.authentication import login_throttle, token_cache
+from apps.users.models import (
+    User,
+    Film,
+    Director,
+    Actor,
+    Review,
+    SimilarFilm,
+    StaleSimilarFilm,
+    RecommendedFilm,
+    PopularFilm,
+    FilmHourlyReviews,
+)
+from apps.users.importer import READ_CHUNK_SIZE, iter_json_array
+from apps.users.benchmark.report import regressions
+from apps.users.benchmark.workload import url_names
+from apps.users.management.commands import bench_film_filter, bench_leaderboards
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
 from django.http.response import HttpResponse
 from django.test import TestCase, Client
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.authtoken.models import Token
 
 
 class TestRegisterViews(TestCase):
@@ -200,6 +233,82 @@ class TestLoginViews(TestCase):
         # Check cookie is not set
         self.assertFalse("session" in response.cookies, msg="Cookie should not be set")
 
+    def test_login_reuses_token(self) -> None:
+        response: HttpResponse = self.client.post(
+            self.login_url, json.dumps(self.data), content_type="application/json"
+        )
+        # The user and their token are read with one query
+        with self.assertNumQueries(1):
+            second: HttpResponse = Client().post(
+                self.login_url, json.dumps(self.data), content_type="application/json"
+            )
+        self.assertEqual(
+            second.cookies["session"].value, response.cookies["session"].value
+        )
+
+    def test_login_upgrades_password_hash(self) -> None:
+        with self.settings(PASSWORD_HASHERS=settings.PASSWORD_HASHERS[::-1]):
+            User.objects.create_user(
+                username="olduser", email="old@test.com", password="Password1"
+            )
+        self.assertFalse(
+            User.objects.get(username="olduser").password.startswith(
+                settings.PASSWORD_HASHER
+            )
+        )
+
+        response: HttpResponse = self.client.post(
+            self.login_url,
+            json.dumps({"username": "olduser", "password": "Password1"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            User.objects.get(username="olduser").password.startswith(
+                settings.PASSWORD_HASHER + "$"
+            )
+        )
+
+    def test_failed_login_throttle(self) -> None:
+        self.addCleanup(
+            login_throttle.cache.delete_many,
+            list(login_throttle.limits("127.0.0.1", self.data["username"])),
+        )
+        wrong: dict[str, str] = {**self.data, "password": "Wrong1"}
+        for _ in range(login_throttle.max_failures_per_username):
+            response: HttpResponse = self.client.post(
+                self.login_url, json.dumps(wrong), content_type="application/json"
+            )
+            self.assertEqual(response.status_code, 401)
+
+        # Refused even with the right password, without hashing it
+        with self.assertNumQueries(0):
+            response = self.client.post(
+                self.login_url, json.dumps(self.data), content_type="application/json"
+            )
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], str(login_throttle.window))
+        self.assertFalse("session" in response.cookies, msg="Cookie should not be set")
+
+    def test_failed_login_throttle_ignores_forwarded_for(self) -> None:
+        self.addCleanup(
+            login_throttle.cache.delete_many,
+            list(login_throttle.limits("127.0.0.1", self.data["username"])),
+        )
+        key: str = login_throttle.ident_key("127.0.0.1")
+        self.assertNotIn("127.0.0.1", key)
+
+        # Without proxies, clients cannot pick the IP they are throttled by
+        wrong: dict[str, str] = {**self.data, "password": "Wrong1"}
+        for forwarded_for in ("10.0.0.1", "10.0.0.2"):
+            self.client.post(
+                self.login_url,
+                json.dumps(wrong),
+                content_type="application/json",
+                HTTP_X_FORWARDED_FOR=forwarded_for,
+            )
+        self.assertEqual(login_throttle.cache.get(key), 2)
+
 
 class TestProfileViews(TestCase):
     def setUp(self) -> None:
@@ -641,6 +750,105 @@ class TestDeleteProfileViews(TestCase):
         )
 
 
+class TestCookieTokenAuthentication(TestCase):
+    def setUp(self) -> None:
+        self.client = Client()
+        self.user_data: dict[str, str] = {
+            "username": "testuser",
+            "email": "test@test.com",
+            "password": "Password1",
+        }
+        self.client.post(
+            reverse("user_register"),
+            json.dumps(self.user_data),
+            content_type="application/json",
+        )
+        self.user_data.pop("email")
+        self.client.post(
+            path=reverse("user_login"),
+            data=json.dumps(self.user_data),
+            content_type="application/json",
+        )
+
+    def test_cached_authentication_queries(self) -> None:
+        self.client.get(reverse("user_info"))
+
+        # The user is cached after the first request
+        with self.assertNumQueries(0):
+            response: HttpResponse = self.client.get(reverse("user_info"))
+        self.assertEqual(response.json()["username"], "testuser")
+
+    def test_cached_user_without_password(self) -> None:
+        self.client.get(reverse("user_info"))
+        snapshot: dict = token_cache.get(self.client.cookies["session"].value)
+        self.assertNotIn("password", snapshot)
+
+        # Updating the cached user keeps its password
+        response: HttpResponse = self.client.put(
+            path=reverse("user_update"),
+            data=json.dumps(
+                {
+                    "current_password": "Password1",
+                    "username": "newuser",
+                    "email": "",
+                    "new_password": "",
+                }
+            ),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            User.objects.get(username="newuser").check_password("Password1")
+        )
+
+    def test_update_invalidates_cached_user(self) -> None:
+        self.client.get(reverse("user_info"))
+        self.client.put(
+            path=reverse("user_update"),
+            data=json.dumps(
+                {
+                    "current_password": "Password1",
+                    "username": "newuser",
+                    "email": "",
+                    "new_password": "",
+                }
+            ),
+            content_type="application/json",
+        )
+        response: HttpResponse = self.client.get(reverse("user_info"))
+        self.assertEqual(response.json()["username"], "newuser")
+
+    def test_logout_invalidates_cached_user(self) -> None:
+        session_key: str = self.client.cookies["session"].value
+        self.client.get(reverse("user_info"))
+        self.client.delete(reverse("user_logout"))
+
+        self.client.cookies["session"] = session_key
+        response: HttpResponse = self.client.get(reverse("user_info"))
+        self.assertEqual(
+            response.status_code,
+            401,
+            msg=f"Response is {response.status_code}, expected 401.",
+        )
+
+    def test_delete_invalidates_cached_user(self) -> None:
+        session_key: str = self.client.cookies["session"].value
+        self.client.get(reverse("user_info"))
+        self.client.put(
+            path=reverse("user_delete"),
+            data=json.dumps({"password": "Password1"}),
+            content_type="application/json",
+        )
+
+        self.client.cookies["session"] = session_key
+        response: HttpResponse = self.client.get(reverse("user_info"))
+        self.assertEqual(
+            response.status_code,
+            401,
+            msg=f"Response is {response.status_code}, expected 401.",
+        )
+
+
 class TestCreateDirectorViews(TestCase):
     def setUp(self) -> None:
         self.client = Client()
@@ -965,6 +1173,199 @@ class TestCreateFilmViews(TestCase):
         )
 
 
+class TestRequestParsers(TestCase):
+    def setUp(self) -> None:
+        self.client = Client()
+        self.film_data: dict = {
+            "name": "testfilm",
+            "release": "2021-01-01",
+            "genre": "Action",
+            "description": "test film description",
+            "duration": 120,
+            "director": "Test Director",
+            "cast": ["Test Actor"],
+        }
+
+    def test_form_body(self) -> None:
+        # A field sent once is its value, except the list fields of the view
+        response: HttpResponse = self.client.post(
+            reverse("add_film"),
+            urlencode(self.film_data, doseq=True),
+            content_type="application/x-www-form-urlencoded",
+        )
+        self.assertEqual(response.status_code, 201, msg=response.content)
+        film: Film = Film.objects.get(name="testfilm")
+        self.assertEqual(film.duration, 120)
+        self.assertEqual([actor.name for actor in film.cast.all()], ["Test Actor"])
+
+    def test_multipart_body(self) -> None:
+        response: HttpResponse = self.client.post(
+            reverse("add_film"), {**self.film_data, "cast": ["Actor One", "Actor Two"]}
+        )
+        self.assertEqual(response.status_code, 201, msg=response.content)
+        self.assertEqual(Film.objects.get(name="testfilm").cast.count(), 2)
+
+    def test_json_body(self) -> None:
+        response: HttpResponse = self.client.post(
+            reverse("add_film"),
+            json.dumps(self.film_data),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201, msg=response.content)
+
+        response = self.client.post(
+            reverse("film_filter"), "{not json", content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.json()["detail"].startswith("JSON parse error"))
+
+        response = self.client.post(
+            reverse("film_filter"),
+            '{"min_rating": NaN}',
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class TestBulkFilmImportViews(TestCase):
+    def setUp(self) -> None:
+        self.client = Client()
+        self.bulk_url: str = reverse("bulk_films")
+        self.films: list[dict] = [
+            {
+                "name": f"testfilm{i}",
+                "release": "2021-01-01",
+                "genre": "Action",
+                "description": "testdescription",
+                "duration": 120,
+                "director": f"Test Director{i % 2}",
+                "cast": ["Test Actor1", f"Test Actor{i + 2}"],
+            }
+            for i in range(5)
+        ]
+
+    def test_bulk_import_correct_POST(self) -> None:
+        invalid_film: dict = {**self.films[0], "name": "badfilm", "genre": "Opera"}
+        response: HttpResponse = self.client.post(
+            self.bulk_url,
+            json.dumps({"films": [*self.films, invalid_film]}),
+            content_type="application/json",
+        )
+
+        # Check if the response is 201
+        self.assertEqual(
+            response.status_code,
+            201,
+            msg=(
+                f"Response is {response.status_code}, expected 201. "
+                f"Response content: {response.content}"
+            ),
+        )
+
+        # Valid films are created, the invalid one is reported
+        data: dict = response.json()
+        self.assertEqual(data["created"], 5)
+        self.assertEqual([error["name"] for error in data["errors"]], ["badfilm"])
+        self.assertEqual(Film.objects.count(), 5)
+        self.assertEqual(Director.objects.count(), 2)
+        self.assertEqual(Actor.objects.count(), 6)
+        self.assertEqual(
+            sorted(
+                Film.objects.get(name="testfilm3").cast.values_list("name", flat=True)
+            ),
+            ["Test Actor1", "Test Actor5"],
+        )
+
+        # Imported films are searchable
+        response = self.client.post(
+            reverse("film_filter"),
+            json.dumps({"director_name": "Director1"}),
+            content_type="application/json",
+        )
+        self.assertEqual(len(response.json()["films"]), 2)
+
+    def test_bulk_import_json_lines_update(self) -> None:
+        self.client.post(
+            self.bulk_url, json.dumps(self.films), content_type="application/json"
+        )
+        self.films[0]["cast"] = ["Other Actor"]
+        response: HttpResponse = self.client.post(
+            self.bulk_url,
+            "\n".join(json.dumps(film) for film in self.films[:2]),
+            content_type="application/jsonl",
+        )
+
+        data: dict = response.json()
+        self.assertEqual((data["created"], data["updated"]), (0, 2))
+        self.assertEqual(
+            list(
+                Film.objects.get(name="testfilm0").cast.values_list("name", flat=True)
+            ),
+            ["Other Actor"],
+        )
+
+    def test_bulk_import_json_lines_invalid_line(self) -> None:
+        lines: list[str] = [json.dumps(film) for film in self.films[:3]]
+        lines.insert(1, '{"name": "broken",')
+        response: HttpResponse = self.client.post(
+            self.bulk_url, "\n".join(lines), content_type="application/jsonl"
+        )
+
+        # The other lines are imported, the broken one is reported
+        self.assertEqual(response.status_code, 201, msg=response.content)
+        data: dict = response.json()
+        self.assertEqual(data["created"], 3)
+        self.assertEqual(
+            data["errors"],
+            [{"row": 2, "name": None, "errors": {"film": ["Invalid JSON on line 2."]}}],
+        )
+
+    def test_bulk_import_POST_invalid_json(self) -> None:
+        response: HttpResponse = self.client.post(
+            self.bulk_url, "[{", content_type="application/json"
+        )
+
+        # Check if the response is 400
+        self.assertEqual(
+            response.status_code,
+            400,
+            msg=(
+                f"Response is {response.status_code}, expected 400. "
+                f"Response content: {response.content}"
+            ),
+        )
+
+    def test_json_array_stream(self) -> None:
+        # The two bytes of the é are split between the first two chunks
+        name: str = "x" * (READ_CHUNK_SIZE - len('[{"name": "') - 1) + "é"
+        stream: BytesIO = BytesIO(
+            json.dumps([{"name": name}, 1], ensure_ascii=False).encode("utf-8")
+        )
+        self.assertEqual(list(iter_json_array(stream)), [{"name": name}, 1])
+
+        # The films of a wrapper object, after a member holding brackets
+        stream = BytesIO(b'{"note": "[1, 2]", "films": [{"name": "a"}]}')
+        self.assertEqual(list(iter_json_array(stream)), [{"name": "a"}])
+
+    def test_json_array_stream_fails_early(self) -> None:
+        stream: BytesIO = BytesIO(
+            b'[{"name": "a"}, {"name": b}' + b" " * READ_CHUNK_SIZE * 10 + b"]"
+        )
+        with self.assertRaises(ValueError):
+            list(iter_json_array(stream))
+        self.assertEqual(
+            stream.tell(), READ_CHUNK_SIZE, msg="Only the first chunk should be read"
+        )
+
+    def test_import_films_command(self) -> None:
+        output: StringIO = StringIO()
+        call_command(
+            "import_films", "utils/films.json", "--batch-size", "2", stdout=output
+        )
+        self.assertIn("5 films added", output.getvalue())
+        self.assertEqual(Film.objects.count(), 5)
+
+
 class TestCreateReviewViews(TestCase):
     def setUp(self) -> None:
         self.client = Client()
@@ -1637,84 +2038,975 @@ class TestListFilmViews(TestCase):
         )
 
 
-class TestDetailFilmViews(TestCase):
+class TestFilmRatingAggregates(TestCase):
     def setUp(self) -> None:
         self.client = Client()
+        self.film: Film = Film.objects.create(
+            name="testfilm",
+            release="2021-01-01",
+            genre="Action",
+            description="testdescription",
+            duration=120,
+        )
+        self.tokens: list[str] = []
+        for i, rating in enumerate([4, 9]):
+            user_data: dict[str, str] = {
+                "username": f"testuser{i}",
+                "email": f"test{i}@test.com",
+                "password": "Password1",
+            }
+            self.client.post(
+                reverse("user_register"),
+                json.dumps(user_data),
+                content_type="application/json",
+            )
+            user_data.pop("email")
+            self.client.post(
+                reverse("user_login"),
+                json.dumps(user_data),
+                content_type="application/json",
+            )
+            token_key: str = self.client.cookies["session"].value
+            self.client.post(
+                path=reverse("user_add_review"),
+                data=json.dumps({"rating": rating, "film_id": self.film.id}),
+                content_type="application/json",
+                HTTP_AUTHORIZATION=f"Token {token_key}",
+            )
+            self.client.cookies.pop("session")
+            self.tokens.append(token_key)
 
-        self.film_data: dict = {
-            "name": "testfilm",
-            "release": "2021-01-01",
-            "genre": "Action",
-            "description": "testdescription",
-            "duration": 120,
-            "director": "Test Director",
-            "cast": ["Test Actor 1", "Test Actor 2", "Test Actor 3"],
-        }
+    def assertAggregates(self, count: int, total: int, average: float) -> None:
+        self.film.refresh_from_db()
+        self.assertEqual(
+            (self.film.review_count, self.film.rating_sum, self.film.avg_rating),
+            (count, total, average),
+            msg="Film rating aggregates are not up to date",
+        )
 
-    def test_detail_film_view_correct_GET(self) -> None:
+    def test_aggregates_on_review_create(self) -> None:
+        self.assertAggregates(2, 13, 6.5)
+
+    def test_aggregates_on_review_delete(self) -> None:
+        review: Review = Review.objects.get(rating=9)
+        self.client.cookies["session"] = self.tokens[1]
         self.client.post(
-            path=reverse("add_film"),
-            data=json.dumps(self.film_data),
+            path=reverse("user_del_review"),
+            data=json.dumps({"review_id": review.id}),
             content_type="application/json",
         )
-        self.film_id: int = Film.objects.all().first().id
-        response: HttpResponse = self.client.get(
-            path=reverse("film_info", kwargs={"id": self.film_id})
-        )
+        self.assertAggregates(1, 4, 4.0)
 
-        # Check if the response is 200
-        self.assertEqual(
-            response.status_code,
-            200,
-            msg=(
-                f"Response is {response.status_code}, expected 200. "
-                f"Response content: {response.content}"
-            ),
+    def test_aggregates_on_user_delete(self) -> None:
+        self.client.cookies["session"] = self.tokens[0]
+        self.client.put(
+            path=reverse("user_delete"),
+            data=json.dumps({"password": "Password1"}),
+            content_type="application/json",
         )
+        self.assertAggregates(1, 9, 9.0)
+        self.assertEqual(Review.objects.count(), 1, msg="User reviews not deleted")
 
-        # Check if the film is returned
-        data: dict = response.json()
-        self.assertTrue("name" in data, msg="Title should be present")
-        self.assertTrue("release" in data, msg="Release should be present")
-        self.assertTrue("genre" in data, msg="Genre should be present")
-        self.assertTrue("description" in data, msg="Description should be present")
-        self.assertTrue("duration" in data, msg="Duration should be present")
-
-    def test_detail_film_view_GET_wrong_id(self) -> None:
-        response: HttpResponse = self.client.get(
-            path=reverse("film_info", kwargs={"id": 999})
-        )
+    def test_rebuild_film_ratings_command(self) -> None:
+        Film.objects.filter(pk=self.film.pk).update(review_count=0, avg_rating=1)
+        output: StringIO = StringIO()
+        call_command("rebuild_film_ratings", "--dry-run", stdout=output)
+        self.assertIn("1 films with drifted ratings found.", output.getvalue())
+        self.assertAggregates(0, 13, 1.0)
 
-        # Check if the response is 404
-        self.assertEqual(
-            response.status_code,
-            404,
-            msg=(
-                f"Response is {response.status_code}, expected 404. "
-                f"Response content: {response.content}"
-            ),
-        )
+        call_command("rebuild_film_ratings", stdout=StringIO())
+        self.assertAggregates(2, 13, 6.5)
 
 
-class TestGetFilmReviewsViews(TestCase):
+class TestFilmFilterCompiler(TestCase):
     def setUp(self) -> None:
-        self.client = Client()
+        bench_film_filter.Command().populate(60, 300, random.Random(0))
+
+    def test_compiled_filter_matches_legacy_filter(self) -> None:
+        for data in bench_film_filter.BENCH_FILTERS:
+            legacy: set[int] = set(
+                bench_film_filter.legacy_film_filter(
+                    Film.objects.all(), data
+                ).values_list("id", flat=True)
+            )
+            compiled: set[int] = set(
+                bench_film_filter.compiled_film_filter(
+                    Film.objects.all(), data
+                ).values_list("id", flat=True)
+            )
+            self.assertEqual(
+                legacy, compiled, msg=f"Filter {data} returns different films"
+            )
 
-        self.login_url: str = reverse("user_login")
+    def test_compiled_filter_single_query(self) -> None:
+        data: dict = bench_film_filter.BENCH_FILTERS[-1]
+        with self.assertNumQueries(1):
+            list(
+                bench_film_filter.compiled_film_filter(
+                    Film.objects.all(), data
+                ).values_list("id", flat=True)
+            )
 
-        self.user_data: dict[str, str] = {
-            "username": "testuser",
-            "email": "test@test.com",
-            "password": "Password1",
-        }
-        self.film_data: dict = {
-            "name": "testfilm",
-            "release": "2021-01-01",
-            "genre": "Action",
-            "description": "testdescription",
-            "duration": 120,
-            "director": "Test Director",
-            "cast": ["Test Actor 1", "Test Actor 2", "Test Actor 3"],
+
+class TestExplainHotQueries(TestCase):
+    def test_review_access_paths_use_indexes(self) -> None:
+        output: StringIO = StringIO()
+        call_command("explain_hot_queries", films=60, reviews=300, stdout=output)
+        report: str = output.getvalue()
+
+        self.assertIn("users_review_film_id_idx", report)
+        self.assertIn("users_review_user_id_idx", report)
+        # The only full scan is the unfiltered, unpaginated film listing
+        self.assertIn("1 queries with full table scans.", report)
+        # The audit data is rolled back
+        self.assertEqual(Film.objects.count(), 0)
+
+
+class TestBenchmarkApi(TestCase):
+    def test_benchmark_report(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path: Path = Path(directory) / "benchmark.json"
+            call_command(
+                "benchmark_api",
+                films=40,
+                reviews=300,
+                users=30,
+                requests=60,
+                output=path,
+                stdout=StringIO(),
+            )
+            report: dict = json.loads(path.read_text())
+
+        self.assertEqual(report["scale"]["films"], 40)
+        self.assertEqual(report["requests"], 60)
+        # Every URL is requested, and every request succeeds
+        self.assertEqual(set(report["endpoints"]), set(url_names()))
+        for name, stats in report["endpoints"].items():
+            self.assertEqual(stats["errors"], 0, msg=f"{name}: {stats['statuses']}")
+            self.assertGreaterEqual(stats["latency_ms"]["p99"], 0)
+        self.assertGreater(report["endpoints"]["film_filter"]["queries"]["mean"], 0)
+        # The benchmark data is rolled back
+        self.assertEqual(Film.objects.count(), 0)
+        self.assertEqual(User.objects.count(), 0)
+
+    def test_benchmark_regressions(self) -> None:
+        def report(p50: float, p99: float, queries: float) -> dict:
+            return {
+                "endpoints": {
+                    "film_info": {
+                        "requests": 100,
+                        "latency_ms": {"p50": p50, "p99": p99},
+                        "queries": {"mean": queries},
+                    }
+                }
+            }
+
+        baseline: dict = report(10, 20, 2)
+        self.assertEqual(regressions(baseline, report(11, 22, 2), 0.25), [])
+        self.assertEqual(regressions(baseline, report(11.5, 20, 2), 0.1), [])
+        self.assertEqual(len(regressions(baseline, report(15, 20, 2), 0.25)), 1)
+        self.assertEqual(len(regressions(baseline, report(10, 30, 3), 0.25)), 2)
+
+
+class TestDatabaseConfiguration(TestCase):
+    def test_database_from_environment(self) -> None:
+        sqlite: dict = database_from_environment(Path("/app"), {})
+        self.assertEqual(sqlite["ENGINE"], "django.db.backends.sqlite3")
+        self.assertEqual(sqlite["NAME"], Path("/app") / "db.sqlite3")
+        self.assertTrue(sqlite["CONN_HEALTH_CHECKS"])
+
+        postgresql: dict = database_from_environment(
+            Path("/app"),
+            {
+                "DATABASE_ENGINE": "postgresql",
+                "DATABASE_HOST": "localhost",
+                "DATABASE_CONN_MAX_AGE": "none",
+                "DATABASE_POOL": "pgbouncer",
+            },
+        )
+        self.assertEqual(postgresql["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(postgresql["HOST"], "localhost")
+        self.assertIsNone(postgresql["CONN_MAX_AGE"])
+        self.assertTrue(postgresql["DISABLE_SERVER_SIDE_CURSORS"])
+
+        with self.assertRaises(ValueError):
+            database_from_environment(Path("/app"), {"DATABASE_ENGINE": "oracle"})
+
+    def test_sqlite_pragmas(self) -> None:
+        if not connection.vendor == "sqlite":
+            self.skipTest("SQLite only")
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], SQLITE_PRAGMAS["busy_timeout"])
+
+
+class TestSettingsProfiles(TestCase):
+    def test_test_profile(self) -> None:
+        self.assertEqual(settings.PROFILE, "test")
+        self.assertFalse(settings.DEBUG)
+        self.assertTrue(settings.QUERY_METRICS["FAIL_OVER_BUDGET"])
+        self.assertNotIn("debug_toolbar", settings.INSTALLED_APPS)
+        self.assertNotIn("DEFAULT_SCHEMA_CLASS", settings.REST_FRAMEWORK)
+
+    def test_bench_startup(self) -> None:
+        # Boots a worker in the prod profile: no admin site, sessions or messages
+        stdout: StringIO = StringIO()
+        call_command(
+            "bench_startup",
+            "--profiles",
+            "test",
+            "prod",
+            "--runs",
+            "1",
+            "--requests",
+            "10",
+            stdout=stdout,
+        )
+        lines: list[str] = stdout.getvalue().splitlines()
+        self.assertTrue(lines[1].startswith("test"))
+        self.assertTrue(lines[2].startswith("prod"))
+        self.assertTrue(lines[3].startswith("prod against test"))
+
+
+class TestFilmSearchIndex(TestCase):
+    def setUp(self) -> None:
+        self.client = Client()
+        self.list_url: str = reverse("film_filter")
+        self.film_data: list[dict] = [
+            {
+                "name": "Avengers",
+                "release": "2012-05-04",
+                "genre": "Action",
+                "description": "testdescription",
+                "duration": 120,
+                "director": "Anthony Russo",
+                "cast": ["Mark Ruffalo", "Chris Evans"],
+            },
+            {
+                "name": "Avengers Avengers",
+                "release": "2019-04-26",
+                "genre": "Action",
+                "description": "testdescription",
+                "duration": 120,
+                "director": "Joe Russo",
+                "cast": ["Chris Evans"],
+            },
+        ]
+        for film in self.film_data:
+            self.client.post(
+                path=reverse("add_film"),
+                data=json.dumps(film),
+                content_type="application/json",
+            )
+
+    def search(self, params: dict) -> list[str]:
+        response: HttpResponse = self.client.post(
+            self.list_url, json.dumps(params), content_type="application/json"
+        )
+        return [film["name"] for film in response.json()["films"]]
+
+    def test_search_prefix_and_ranking(self) -> None:
+        self.assertEqual(
+            self.search({"film_name": "aveng"}),
+            ["Avengers Avengers", "Avengers"],
+            msg="Prefix search should return the most relevant film first",
+        )
+        self.assertEqual(self.search({"director_name": "anth rus"}), ["Avengers"])
+
+    def test_genre_matches_rank_after_text_matches(self) -> None:
+        self.client.post(
+            path=reverse("add_film"),
+            data=json.dumps({**self.film_data[0], "name": "Heat", "genre": "Drama"}),
+            content_type="application/json",
+        )
+        self.assertEqual(
+            self.search({"film_name": "aveng", "genre": "Drama"}),
+            ["Avengers Avengers", "Avengers", "Heat"],
+            msg="Films matching only the genre should come after the ranked matches",
+        )
+
+    def test_search_index_follows_changes(self) -> None:
+        director: Director = Director.objects.get(name="Joe Russo")
+        director.name = "Joseph Russo"
+        director.save()
+        self.assertEqual(
+            self.search({"director_name": "joseph"}), ["Avengers Avengers"]
+        )
+
+        actor: Actor = Actor.objects.create(name="Scarlett Johansson")
+        Film.objects.get(name="Avengers").cast.add(actor)
+        self.assertEqual(self.search({"actor_name": "scarlett"}), ["Avengers"])
+
+        actor.delete()
+        self.assertEqual(self.search({"actor_name": "scarlett"}), [])
+
+        Film.objects.get(name="Avengers").delete()
+        self.assertEqual(self.search({"film_name": "avengers"}), ["Avengers Avengers"])
+
+
+class TestDetailFilmViews(TestCase):
+    def setUp(self) -> None:
+        self.client = Client()
+
+        self.film_data: dict = {
+            "name": "testfilm",
+            "release": "2021-01-01",
+            "genre": "Action",
+            "description": "testdescription",
+            "duration": 120,
+            "director": "Test Director",
+            "cast": ["Test Actor 1", "Test Actor 2", "Test Actor 3"],
+        }
+
+    def test_detail_film_view_correct_GET(self) -> None:
+        self.client.post(
+            path=reverse("add_film"),
+            data=json.dumps(self.film_data),
+            content_type="application/json",
+        )
+        self.film_id: int = Film.objects.all().first().id
+        response: HttpResponse = self.client.get(
+            path=reverse("film_info", kwargs={"id": self.film_id})
+        )
+
+        # Check if the response is 200
+        self.assertEqual(
+            response.status_code,
+            200,
+            msg=(
+                f"Response is {response.status_code}, expected 200. "
+                f"Response content: {response.content}"
+            ),
+        )
+
+        # Check if the film is returned
+        data: dict = response.json()
+        self.assertTrue("name" in data, msg="Title should be present")
+        self.assertTrue("release" in data, msg="Release should be present")
+        self.assertTrue("genre" in data, msg="Genre should be present")
+        self.assertTrue("description" in data, msg="Description should be present")
+        self.assertTrue("duration" in data, msg="Duration should be present")
+
+    def test_detail_film_view_GET_wrong_id(self) -> None:
+        response: HttpResponse = self.client.get(
+            path=reverse("film_info", kwargs={"id": 999})
+        )
+
+        # Check if the response is 404
+        self.assertEqual(
+            response.status_code,
+            404,
+            msg=(
+                f"Response is {response.status_code}, expected 404. "
+                f"Response content: {response.content}"
+            ),
+        )
+
+
+def create_films(
+    n_films: int,
+    director: Director,
+    actors: list[Actor] | None = None,
+    reviewer: User | None = None,
+) -> list[Film]:
+    """
+    Bulk creates films of the director, numbered after the existing ones, with the
+    actors as cast and rated 7 by the reviewer if any.
+    """
+    start: int = Film.objects.count()
+    films: list[Film] = Film.objects.bulk_create(
+        [
+            Film(
+                name=f"testfilm{i}",
+                release="2021-01-01",
+                genre="Action",
+                description="testdescription",
+                duration=120,
+                director_id=director,
+            )
+            for i in range(start, start + n_films)
+        ]
+    )
+    through: type = Film.cast.through
+    through.objects.bulk_create(
+        [
+            through(film_id=film.id, actor_id=actor.id)
+            for film in films
+            for actor in actors or []
+        ]
+    )
+    if reviewer is not None:
+        for film in films:
+            review: Review = Review.objects.create(
+                rating=7, user_id=reviewer, film_id=film
+            )
+            ratings.add_review(review)
+    return films
+
+
+class TestFilmListingQueries(TestCase):
+    def setUp(self) -> None:
+        self.client = Client()
+        self.list_url: str = reverse("film_filter")
+        self.user: User = User.objects.create_user(
+            username="testuser", email="test@test.com", password="Password1"
+        )
+        self.director: Director = Director.objects.create(name="Test Director")
+        self.actors: list[Actor] = [
+            Actor.objects.create(name=f"Test Actor{i}") for i in range(3)
+        ]
+
+    def test_list_film_view_constant_queries(self) -> None:
+        for n_films in (2, 20):
+            Film.objects.all().delete()
+            create_films(n_films, self.director, self.actors, self.user)
+
+            # One query for the films and one for the prefetched cast
+            with self.assertNumQueries(2):
+                response: HttpResponse = self.client.post(self.list_url)
+
+            data: dict = response.json()
+            self.assertEqual(
+                len(data["films"]),
+                n_films,
+                msg=f"There are {len(data['films'])} films, expected {n_films}",
+            )
+            self.assertTrue(
+                all(film["avg_rating"] == 7 for film in data["films"]),
+                msg="Average rating should be 7 for every film",
+            )
+            self.assertTrue(
+                all(len(film["cast"]) == 3 for film in data["films"]),
+                msg="Every film should have 3 cast members",
+            )
+
+    def test_detail_film_view_constant_queries(self) -> None:
+        create_films(1, self.director, self.actors, self.user)
+        film_id: int = Film.objects.first().id
+
+        with self.assertNumQueries(2):
+            response: HttpResponse = self.client.get(
+                path=reverse("film_info", kwargs={"id": film_id})
+            )
+
+        data: dict = response.json()
+        self.assertEqual(data["director"], "Test Director")
+        self.assertEqual(data["avg_rating"], 7)
+
+
+class TestKeysetPagination(TestCase):
+    def setUp(self) -> None:
+        self.client = Client()
+        self.director: Director = Director.objects.create(name="Test Director")
+        self.films: list[Film] = [
+            Film.objects.create(
+                name=f"testfilm{i}",
+                release=f"20{i % 5 + 10}-01-01",
+                genre="Action",
+                description="testdescription",
+                duration=120,
+                director_id=self.director,
+            )
+            for i in range(12)
+        ]
+        self.users: list[User] = [
+            User.objects.create_user(
+                username=f"testuser{i}", email=f"test{i}@test.com", password="Password1"
+            )
+            for i in range(12)
+        ]
+        for i, user in enumerate(self.users):
+            review: Review = Review.objects.create(
+                rating=i % 4 + 1, user_id=user, film_id=self.films[i % 2]
+            )
+            ratings.add_review(review)
+
+    def pages(
+        self,
+        url: str,
+        key: str,
+        method: str = "get",
+        body: dict | None = None,
+        **params,
+    ) -> list[list]:
+        pages: list[list] = []
+        cursor: str | None = None
+        content: dict = (
+            {"data": json.dumps(body), "content_type": "application/json"}
+            if body
+            else {}
+        )
+        while True:
+            query: dict = {**params, "cursor": cursor} if cursor else params
+            response: HttpResponse = getattr(self.client, method)(
+                f"{url}?{urlencode(query)}", **content
+            )
+            self.assertEqual(response.status_code, 200, msg=response.content)
+            data: dict = response.json()
+            pages.append(data[key])
+            cursor = data["next"]
+            if cursor is None:
+                return pages
+
+    def test_film_search_pages(self) -> None:
+        url: str = reverse("film_filter")
+        unpaginated: dict = self.client.post(url).json()
+        self.assertNotIn("next", unpaginated)
+
+        for order, key in (
+            ("id", lambda film: film.id),
+            ("rating", lambda film: (-film.avg_rating, -film.id)),
+            ("release", lambda film: (-film.release.toordinal(), -film.id)),
+        ):
+            pages: list[list] = self.pages(url, "films", "post", limit=5, order=order)
+            self.assertEqual([len(page) for page in pages], [5, 5, 2])
+            expected: list[str] = [
+                film.name for film in sorted(Film.objects.all(), key=key)
+            ]
+            self.assertEqual(
+                [film["name"] for page in pages for film in page],
+                expected,
+                msg=f"Pages ordered by {order} should list every film once",
+            )
+
+    def test_relevance_pages(self) -> None:
+        # testfilm1, testfilm10 and testfilm11 match the name, the rest only the genre
+        url: str = reverse("film_filter")
+        body: dict = {"film_name": "testfilm1", "genre": "Action"}
+        pages: list[list] = self.pages(url, "films", "post", body, limit=1)
+        self.assertEqual(len(pages), 12)
+
+        names: list[str] = [film["name"] for page in pages for film in page]
+        self.assertEqual(sorted(names[:3]), ["testfilm1", "testfilm10", "testfilm11"])
+        self.assertEqual(
+            names[3:],
+            [f"testfilm{i}" for i in range(12) if i not in (1, 10, 11)],
+            msg="Films matching only the genre should follow, by id",
+        )
+
+    def test_film_reviews_pages(self) -> None:
+        url: str = reverse("film_reviews", kwargs={"id": self.films[0].id})
+        pages: list[list] = self.pages(url, "reviews", limit=4)
+        self.assertEqual([len(page) for page in pages], [4, 2])
+
+        review_ids: list[int] = [review["id"] for page in pages for review in page]
+        self.assertEqual(
+            review_ids,
+            list(
+                Review.objects.filter(film_id=self.films[0])
+                .order_by("id")
+                .values_list("id", flat=True)
+            ),
+        )
+
+    def test_invalid_pagination(self) -> None:
+        url: str = reverse("film_reviews", kwargs={"id": self.films[0].id})
+        for query in ("limit=0", "limit=abc", "limit=1000", "limit=5&cursor=abc"):
+            response: HttpResponse = self.client.get(f"{url}?{query}")
+            self.assertEqual(
+                response.status_code, 400, msg=f"Query {query} should be rejected"
+            )
+
+
+class TestStreamingListings(TestCase):
+    def setUp(self) -> None:
+        self.client = Client()
+        self.list_url: str = reverse("film_filter")
+        self.director: Director = Director.objects.create(name="Test Director")
+
+    def test_streamed_listing_matches_regular_listing(self) -> None:
+        create_films(30, self.director)
+        actor: Actor = Actor.objects.create(name="Test Actor")
+        Film.objects.first().cast.add(actor)
+        user: User = User.objects.create_user(
+            username="testuser", email="test@test.com", password="Password1"
+        )
+        for film in Film.objects.all()[:5]:
+            ratings.add_review(
+                Review.objects.create(rating=5, user_id=user, film_id=film)
+            )
+
+        response: HttpResponse = self.client.post(f"{self.list_url}?stream=true")
+        self.assertTrue(response.streaming)
+        streamed: dict = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(streamed, self.client.post(self.list_url).json())
+
+        film_id: int = Film.objects.first().id
+        url: str = reverse("film_reviews", kwargs={"id": film_id})
+        response = self.client.get(f"{url}?stream=1")
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            json.loads(b"".join(response.streaming_content)),
+            self.client.get(url).json(),
+        )
+
+    def stream_films(self) -> tuple[int, int, int]:
+        """Streams every film, returns rows, bytes and peak of memory used"""
+        tracemalloc.start()
+        try:
+            response: HttpResponse = self.client.post(f"{self.list_url}?stream=true")
+            size: int = 0
+            rows: int = 0
+            for fragment in response.streaming_content:
+                size += len(fragment)
+                rows += fragment.count(b'"testfilm')
+            peak: int = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return rows, size, peak
+
+    def test_streamed_listing_memory(self) -> None:
+        create_films(5_000, self.director)
+        # Leave out the one-off allocations of the first request
+        self.client.post(f"{self.list_url}?limit=1")
+        small_peak: int = self.stream_films()[2]
+
+        create_films(45_000, self.director)
+        rows: int
+        size: int
+        peak: int
+        rows, size, peak = self.stream_films()
+
+        self.assertEqual(rows, 50_000)
+        self.assertLess(
+            peak,
+            small_peak * 1.5,
+            msg=f"Peak memory grew from {small_peak} to {peak} bytes with 10x films",
+        )
+        # Only a few chunks of films are held at once
+        self.assertLess(
+            peak,
+            32 * 1024 * 1024,
+            msg=f"Streaming {size} bytes peaked at {peak} bytes of memory",
+        )
+
+
+class TestFilmResponseCache(TestCase):
+    def setUp(self) -> None:
+        self.client = Client()
+        self.film: Film = Film.objects.create(
+            name="testfilm",
+            release="2021-01-01",
+            genre="Action",
+            description="testdescription",
+            duration=120,
+        )
+        self.detail_url: str = reverse("film_info", kwargs={"id": self.film.id})
+        self.list_url: str = reverse("film_filter")
+
+    def post_review(self, rating: int) -> None:
+        user_data: dict[str, str] = {
+            "username": "testuser",
+            "email": "test@test.com",
+            "password": "Password1",
+        }
+        self.client.post(
+            reverse("user_register"),
+            json.dumps(user_data),
+            content_type="application/json",
+        )
+        user_data.pop("email")
+        self.client.post(
+            reverse("user_login"),
+            json.dumps(user_data),
+            content_type="application/json",
+        )
+        self.client.post(
+            path=reverse("user_add_review"),
+            data=json.dumps({"rating": rating, "film_id": self.film.id}),
+            content_type="application/json",
+        )
+
+    def test_film_detail_cache(self) -> None:
+        response: HttpResponse = self.client.get(self.detail_url)
+        self.assertEqual(response["X-Cache"], "MISS")
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.detail_url)
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(response.json()["avg_rating"], 0)
+
+        # Posting a review invalidates the cached film
+        self.post_review(8)
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["avg_rating"], 8)
+
+    def test_film_search_cache(self) -> None:
+        response: HttpResponse = self.client.post(
+            self.list_url,
+            json.dumps({"genre": "Action", "film_name": "testfilm"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response["X-Cache"], "MISS")
+
+        # Same criteria in another order, plus an empty one
+        response = self.client.post(
+            self.list_url,
+            json.dumps({"film_name": "testfilm", "genre": "Action", "description": ""}),
+            content_type="application/json",
+        )
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(len(response.json()["films"]), 1)
+
+        # Other pagination parameters are another entry
+        response = self.client.post(
+            f"{self.list_url}?limit=1",
+            json.dumps({"genre": "Action", "film_name": "testfilm"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response["X-Cache"], "MISS")
+
+        # Deleting the film invalidates the search
+        self.client.post(
+            reverse("del_film"),
+            json.dumps({"name": self.film.name}),
+            content_type="application/json",
+        )
+        response = self.client.post(
+            self.list_url,
+            json.dumps({"genre": "Action", "film_name": "testfilm"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["films"], [])
+
+
+class TestAsyncFilmViews(TestCase):
+    def setUp(self) -> None:
+        self.client = Client()
+        director: Director = Director.objects.create(name="Test Director")
+        actor: Actor = Actor.objects.create(name="Test Actor")
+        self.films: list[Film] = []
+        for i in range(6):
+            film: Film = Film.objects.create(
+                name=f"testfilm{i}",
+                release=f"20{i + 10}-01-01",
+                genre="Action",
+                description="testdescription",
+                duration=120,
+                director_id=director,
+            )
+            film.cast.add(actor)
+            self.films.append(film)
+        for i in range(5):
+            user: User = User.objects.create_user(
+                username=f"testuser{i}", email=f"test{i}@test.com", password="Password1"
+            )
+            review: Review = Review.objects.create(
+                rating=i + 1, user_id=user, film_id=self.films[0]
+            )
+            ratings.add_review(review)
+
+    def test_async_views_match_sync_views(self) -> None:
+        film_id: int = self.films[0].id
+        requests: list[tuple[str, str, dict, str]] = [
+            ("get", "film_info", {"id": film_id}, ""),
+            ("get", "film_info", {"id": 0}, ""),
+            ("get", "film_reviews", {"id": film_id}, ""),
+            ("get", "film_reviews", {"id": film_id}, "?limit=2"),
+            ("get", "film_reviews", {"id": film_id}, "?limit=1000"),
+            ("get", "film_reviews", {"id": 0}, ""),
+            ("get", "film_filter", {}, ""),
+            ("post", "film_filter", {}, ""),
+            ("post", "film_filter", {}, "?limit=2&order=release"),
+            ("post", "film_filter", {}, "?order=relevance"),
+        ]
+        bodies: list[dict] = [
+            {},
+            {"genre": "Action", "min_release": "2012"},
+            {"genre": "Western"},
+        ]
+        for method, name, kwargs, query in requests:
+            for body in bodies if method == "post" else [{}]:
+                responses: list[HttpResponse] = [
+                    getattr(self.client, method)(
+                        reverse(prefix + name, kwargs=kwargs) + query,
+                        json.dumps(body) if method == "post" else None,
+                        content_type="application/json",
+                    )
+                    for prefix in ("", "async_")
+                ]
+                sync_response, async_response = responses
+                self.assertEqual(
+                    async_response.status_code,
+                    sync_response.status_code,
+                    msg=f"{method} {name}{query} {body}",
+                )
+                self.assertEqual(
+                    async_response.json(),
+                    sync_response.json(),
+                    msg=f"{method} {name}{query} {body}",
+                )
+
+    async def test_async_film_detail_cache(self) -> None:
+        url: str = reverse("async_film_info", kwargs={"id": self.films[0].id})
+        first: HttpResponse = await self.async_client.get(url)
+        second: HttpResponse = await self.async_client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(first.json()["cast"], ["Test Actor"])
+
+    def test_middleware_is_async_capable(self) -> None:
+        # A synchronous middleware would run every ASGI request in a thread
+        for middleware in settings.MIDDLEWARE:
+            self.assertTrue(
+                getattr(import_string(middleware), "async_capable", False),
+                msg=f"{middleware} should be async capable",
+            )
+
+
+class TestQueryMetrics(TestCase):
+    def setUp(self) -> None:
+        self.client = Client()
+        self.film: Film = Film.objects.create(
+            name="testfilm",
+            release="2021-01-01",
+            genre="Action",
+            description="testdescription",
+            duration=120,
+        )
+        for i in range(3):
+            user: User = User.objects.create_user(
+                username=f"testuser{i}", email=f"test{i}@test.com", password="Password1"
+            )
+            Review.objects.create(rating=i + 1, user_id=user, film_id=self.film)
+
+    def test_server_timing(self) -> None:
+        response: HttpResponse = self.client.get(
+            reverse("film_info", kwargs={"id": self.film.id})
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(
+            response["Server-Timing"],
+            r'^db;dur=[0-9.]+;desc="\d+ queries", app;dur=[0-9.]+$',
+        )
+
+    def test_query_log(self) -> None:
+        url: str = reverse("film_reviews", kwargs={"id": self.film.id})
+        with self.assertLogs("core.queries", level="INFO") as logs:
+            self.client.get(url)
+        line: dict = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(line["url_name"], "film_reviews")
+        self.assertEqual(line["status"], 200)
+        self.assertGreater(line["queries"], 0)
+        self.assertGreaterEqual(line["duplicates"], 0)
+        self.assertIn("sql_ms", line)
+
+    async def test_async_query_log(self) -> None:
+        url: str = reverse("async_film_reviews", kwargs={"id": self.film.id})
+        with self.assertLogs("core.queries", level="INFO") as logs:
+            response: HttpResponse = await self.async_client.get(url)
+        line: dict = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(line["url_name"], "async_film_reviews")
+        self.assertEqual(line["duplicates"], 0)
+        self.assertIn(f'desc="{line["queries"]} queries"', response["Server-Timing"])
+
+    def test_query_budget(self) -> None:
+        url: str = reverse("film_reviews", kwargs={"id": self.film.id})
+        options: dict = {**settings.QUERY_METRICS, "BUDGETS": {"film_reviews": 1}}
+        with self.settings(QUERY_METRICS={**options, "FAIL_OVER_BUDGET": False}):
+            with self.assertLogs("core.queries", level="WARNING") as logs:
+                response: HttpResponse = Client().get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(logs.records[-1].getMessage())["budget"], 1)
+
+        with self.settings(QUERY_METRICS={**options, "FAIL_OVER_BUDGET": True}):
+            with self.assertLogs("core.queries", level="WARNING") as logs:
+                with self.assertRaises(QueryBudgetExceeded):
+                    Client().get(url)
+            self.assertEqual(json.loads(logs.records[-1].getMessage())["budget"], 1)
+
+
+class TestReviewListingQueries(TestCase):
+    """Review listings run the same queries for 1 review as for 1000"""
+
+    REVIEWS = 1000
+
+    def setUp(self) -> None:
+        self.film: Film = Film.objects.create(
+            name="testfilm",
+            release="2021-01-01",
+            genre="Action",
+            description="testdescription",
+            duration=120,
+        )
+        self.user: User = User.objects.create_user(
+            username="testuser", email="test@test.com", password="Password1"
+        )
+        users: list[User] = User.objects.bulk_create(
+            User(username=f"reviewer{i}", email=f"reviewer{i}@test.com")
+            for i in range(self.REVIEWS - 1)
+        )
+        films: list[Film] = Film.objects.bulk_create(
+            Film(
+                name=f"film{i}",
+                release="2021-01-01",
+                genre="Drama",
+                description="testdescription",
+                duration=90,
+            )
+            for i in range(self.REVIEWS - 1)
+        )
+        Review.objects.bulk_create(
+            [
+                Review(rating=5, user_id=self.user, film_id=self.film),
+                *(
+                    Review(rating=i % 5 + 1, user_id=user, film_id=self.film)
+                    for i, user in enumerate(users)
+                ),
+                *(
+                    Review(rating=i % 5 + 1, user_id=self.user, film_id=film)
+                    for i, film in enumerate(films)
+                ),
+            ]
+        )
+        self.client = Client()
+        self.client.cookies["session"] = Token.objects.create(user=self.user).key
+        self.client.get(reverse("user_info"))  # the user is then read from the cache
+
+    def assertListingQueries(self, url: str, queries: int) -> None:
+        # The whole listing, serialized at once and streamed
+        for query in [{}, {"stream": "true"}]:
+            with self.assertNumQueries(queries):
+                response: HttpResponse = self.client.get(f"{url}?{urlencode(query)}")
+                content: bytes = b"".join(getattr(response, "streaming_content", []))
+            reviews: list[dict] = json.loads(content or response.content)["reviews"]
+            self.assertEqual(len(reviews), self.REVIEWS)
+            self.assertTrue(all(review["film"] for review in reviews))
+
+    def test_film_reviews(self) -> None:
+        self.assertListingQueries(
+            reverse("film_reviews", kwargs={"id": self.film.id}), 2
+        )
+
+    def test_user_history(self) -> None:
+        self.assertListingQueries(reverse("user_history"), 1)
+
+
+class TestGetFilmReviewsViews(TestCase):
+    def setUp(self) -> None:
+        self.client = Client()
+
+        self.login_url: str = reverse("user_login")
+
+        self.user_data: dict[str, str] = {
+            "username": "testuser",
+            "email": "test@test.com",
+            "password": "Password1",
+        }
+        self.film_data: dict = {
+            "name": "testfilm",
+            "release": "2021-01-01",
+            "genre": "Action",
+            "description": "testdescription",
+            "duration": 120,
+            "director": "Test Director",
+            "cast": ["Test Actor 1", "Test Actor 2", "Test Actor 3"],
         }
         self.review_data: dict = {
             "rating": 5,
@@ -1788,6 +3080,698 @@ class TestGetFilmReviewsViews(TestCase):
         )
 
 
+class TestSimilarFilms(TestCase):
+    # Scores of each user for films A, B, C and D: A and B are liked by the same
+    # users, C by the others, and D gets average scores
+    SCORES: list[list[int]] = [
+        [10, 9, 2, 5],
+        [9, 10, 1, 6],
+        [2, 3, 9, 5],
+        [3, 1, 10, 4],
+    ]
+
+    def setUp(self) -> None:
+        self.client = Client()
+        self.films: list[Film] = [
+            Film.objects.create(
+                name=f"film{name}",
+                release="2021-01-01",
+                genre="Drama",
+                description="testdescription",
+                duration=120,
+            )
+            for name in "ABCD"
+        ]
+        self.users: list[User] = [
+            User.objects.create_user(
+                username=f"testuser{i}", email=f"test{i}@test.com", password="Password1"
+            )
+            for i in range(len(self.SCORES))
+        ]
+        for user, scores in zip(self.users, self.SCORES):
+            for film, rating in zip(self.films, scores):
+                Review.objects.create(rating=rating, user_id=user, film_id=film)
+        call_command("build_similar_films", stdout=StringIO())
+
+    def similar(self, film: Film) -> list[dict]:
+        url: str = reverse("film_similar", kwargs={"id": film.id})
+        response: HttpResponse = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()["films"]
+
+    def test_similar_films(self) -> None:
+        similar: list[dict] = self.similar(self.films[0])
+        self.assertEqual(similar[0]["id"], self.films[1].id)
+        self.assertEqual(similar[0]["name"], "filmB")
+        self.assertGreater(similar[0]["similarity"], 0.8)
+        # Only positive similarities, most similar first
+        self.assertNotIn(self.films[2].id, [film["id"] for film in similar])
+        self.assertEqual(
+            [film["similarity"] for film in similar],
+            sorted((film["similarity"] for film in similar), reverse=True),
+        )
+        self.assertEqual(self.similar(self.films[2])[0]["id"], self.films[3].id)
+        self.assertFalse(StaleSimilarFilm.objects.exists())
+
+    def test_similar_films_queries(self) -> None:
+        url: str = reverse("film_similar", kwargs={"id": self.films[0].id})
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+    def test_similar_films_not_found(self) -> None:
+        response: HttpResponse = self.client.get(
+            reverse("film_similar", kwargs={"id": 999})
+        )
+        self.assertEqual(response.status_code, 404)
+
+        film: Film = Film.objects.create(
+            name="unrated",
+            release="2021-01-01",
+            genre="Drama",
+            description="testdescription",
+            duration=120,
+        )
+        self.assertEqual(self.similar(film), [])
+
+    def test_refresh_stale_films(self) -> None:
+        film_a, film_b, film_c, film_d = self.films
+
+        # D now follows A and B
+        Review.objects.filter(film_id=film_d).delete()
+        for user, rating in zip(self.users, [9, 10, 2, 1]):
+            Review.objects.create(rating=rating, user_id=user, film_id=film_d)
+        self.assertEqual(
+            list(StaleSimilarFilm.objects.values_list("film_id", flat=True)),
+            [film_d.id],
+        )
+
+        output: StringIO = StringIO()
+        call_command("build_similar_films", "--stale", stdout=output)
+        self.assertIn("1 stale films refreshed", output.getvalue())
+        self.assertFalse(StaleSimilarFilm.objects.exists())
+        self.assertIn(self.similar(film_d)[0]["id"], [film_a.id, film_b.id])
+        self.assertNotIn(film_c.id, [film["id"] for film in self.similar(film_d)])
+        # D enters the lists of A and B, and leaves the list of C if it was in it
+        for film in (film_a, film_b):
+            self.assertIn(film_d.id, [similar["id"] for similar in self.similar(film)])
+        self.assertNotIn(film_d.id, [similar["id"] for similar in self.similar(film_c)])
+        refreshed: list[tuple] = list(
+            SimilarFilm.objects.values_list("film_id", "similar_id", "rank")
+        )
+        call_command("build_similar_films", stdout=StringIO())
+        self.assertCountEqual(
+            SimilarFilm.objects.values_list("film_id", "similar_id", "rank"), refreshed
+        )
+
+
+class TestRecommendations(TestCase):
+    FILMS = 8
+    USERS = 10
+
+    def setUp(self) -> None:
+        self.films: list[Film] = [
+            Film.objects.create(
+                name=f"film{i}",
+                release="2021-01-01",
+                genre="Drama",
+                description="testdescription",
+                duration=120,
+            )
+            for i in range(self.FILMS)
+        ]
+        self.users: list[User] = [
+            User.objects.create_user(
+                username=f"testuser{i}", email=f"test{i}@test.com", password="Password1"
+            )
+            for i in range(self.USERS)
+        ]
+        # Users of even number like the first half of the films and dislike the
+        # other, users of odd number the opposite. Each user misses two films.
+        for i, user in enumerate(self.users):
+            for j, film in enumerate(self.films):
+                if j in (i % self.FILMS, (i + 1) % self.FILMS):
+                    continue
+                liked: bool = (j < self.FILMS // 2) == (i % 2 == 0)
+                rating: int = (9 if liked else 3) + (i + j) % 2
+                Review.objects.create(rating=rating, user_id=user, film_id=film)
+        call_command("build_recommendations", stdout=StringIO())
+
+    def login(self, user: User) -> Client:
+        client: Client = Client()
+        client.cookies["session"] = Token.objects.create(user=user).key
+        client.get(reverse("user_info"))  # the user is then read from the cache
+        return client
+
+    def test_recommendations(self) -> None:
+        user: User = self.users[0]
+        response: HttpResponse = self.login(user).get(reverse("user_recommendations"))
+        self.assertEqual(response.status_code, 200)
+        data: dict = response.json()
+        self.assertTrue(data["personal"])
+
+        # Only the two films the user did not review, liked by the users alike
+        self.assertCountEqual(
+            [film["id"] for film in data["films"]],
+            [self.films[0].id, self.films[1].id],
+        )
+        ratings: list[float] = [film["predicted_rating"] for film in data["films"]]
+        self.assertEqual(ratings, sorted(ratings, reverse=True))
+        self.assertGreater(min(ratings), 6)
+
+    def test_popular_films_for_new_users(self) -> None:
+        user: User = User.objects.create_user(
+            username="newuser", email="new@test.com", password="Password1"
+        )
+        response: HttpResponse = self.login(user).get(reverse("user_recommendations"))
+        data: dict = response.json()
+        self.assertFalse(data["personal"])
+        self.assertEqual(
+            [film["id"] for film in data["films"]],
+            list(
+                PopularFilm.objects.order_by("rank").values_list("film_id", flat=True)
+            ),
+        )
+        self.assertEqual(len(data["films"]), self.FILMS)
+
+    def test_recommendations_queries(self) -> None:
+        client: Client = self.login(self.users[0])
+        with self.assertNumQueries(1):
+            client.get(reverse("user_recommendations"))
+
+        user: User = User.objects.create_user(
+            username="newuser", email="new@test.com", password="Password1"
+        )
+        client = self.login(user)
+        with self.assertNumQueries(2):
+            client.get(reverse("user_recommendations"))
+
+    def test_recommendations_unauthenticated(self) -> None:
+        response: HttpResponse = Client().get(reverse("user_recommendations"))
+        self.assertEqual(response.status_code, 401)
+
+    def test_process_pool(self) -> None:
+        fields: list[str] = ["user_id", "film_id", "rank", "rating"]
+        rows: list[tuple] = list(
+            RecommendedFilm.objects.order_by("user_id", "rank").values_list(*fields)
+        )
+        # Spawned workers start without Django set up
+        for method in (None, "spawn"):
+            options: dict = {
+                **settings.RECOMMENDATIONS,
+                "WORKERS": 2,
+                "START_METHOD": method,
+            }
+            with self.settings(RECOMMENDATIONS=options):
+                call_command("build_recommendations", stdout=StringIO())
+            self.assertEqual(
+                list(
+                    RecommendedFilm.objects.order_by("user_id", "rank").values_list(
+                        *fields
+                    )
+                ),
+                rows,
+            )
+
+
+class TestTrendingFilms(TestCase):
+    def setUp(self) -> None:
+        self.films: list[Film] = [
+            Film.objects.create(
+                name=f"film{i}",
+                release="2021-01-01",
+                genre="Drama",
+                description="testdescription",
+                duration=120,
+            )
+            for i in range(3)
+        ]
+        self.users: list[User] = [
+            User.objects.create_user(
+                username=f"testuser{i}", email=f"test{i}@test.com", password="Password1"
+            )
+            for i in range(3)
+        ]
+        self.clients: list[Client] = [self.login(user) for user in self.users]
+        # Three reviews of the first film, two of the second, one of the last
+        for i, client in enumerate(self.clients):
+            for film in self.films[: len(self.films) - i]:
+                client.post(
+                    reverse("user_add_review"),
+                    json.dumps({"rating": 7, "film_id": film.id}),
+                    content_type="application/json",
+                )
+
+    def login(self, user: User) -> Client:
+        client: Client = Client()
+        client.cookies["session"] = Token.objects.create(user=user).key
+        client.get(reverse("user_info"))  # the user is then read from the cache
+        return client
+
+    def trending(self, params: str = "") -> list[tuple[int, int]]:
+        response: HttpResponse = Client().get(reverse("film_trending") + params)
+        self.assertEqual(response.status_code, 200)
+        return [
+            (film["id"], film["recent_reviews"]) for film in response.json()["films"]
+        ]
+
+    def review(self, film: Film, user: User, age: timedelta) -> Review:
+        """A review written age ago, counted as if posted then"""
+        review: Review = Review.objects.create(
+            rating=5, user_id=user, film_id=film, created_at=timezone.now() - age
+        )
+        trending.add_review(review)
+        return review
+
+    def test_trending_films(self) -> None:
+        self.assertEqual(
+            self.trending(),
+            [(self.films[0].id, 3), (self.films[1].id, 2), (self.films[2].id, 1)],
+        )
+        self.assertEqual(
+            self.trending("?limit=1"),
+            [(self.films[0].id, 3)],
+        )
+        response: HttpResponse = Client().get(reverse("film_trending"))
+        self.assertEqual(response.json()["window"], "24h")
+        self.assertEqual(response.json()["films"][0]["name"], "film0")
+
+    def test_trending_on_review_delete(self) -> None:
+        for user, client in zip(self.users[:2], self.clients):
+            review: Review = Review.objects.get(user_id=user, film_id=self.films[0])
+            client.post(
+                reverse("user_del_review"),
+                json.dumps({"review_id": review.id}),
+                content_type="application/json",
+            )
+        self.assertEqual(
+            self.trending(),
+            [(self.films[1].id, 2), (self.films[0].id, 1), (self.films[2].id, 1)],
+        )
+
+    def test_trending_on_user_delete(self) -> None:
+        self.clients[0].put(
+            reverse("user_delete"),
+            json.dumps({"password": "Password1"}),
+            content_type="application/json",
+        )
+        self.assertEqual(
+            self.trending(), [(self.films[0].id, 2), (self.films[1].id, 1)]
+        )
+
+    def test_trending_windows(self) -> None:
+        # Older reviews of the last film only count in the 7 days window
+        for user in self.users[1:]:
+            self.review(self.films[2], user, timedelta(days=3))
+        self.assertEqual(self.trending()[-1], (self.films[2].id, 1))
+        self.assertEqual(
+            self.trending("?window=7d"),
+            [(self.films[0].id, 3), (self.films[2].id, 3), (self.films[1].id, 2)],
+        )
+
+    def test_untimestamped_reviews(self) -> None:
+        user: User = User.objects.create_user(
+            username="olduser", email="old@test.com", password="Password1"
+        )
+        review: Review = Review.objects.create(
+            rating=5, user_id=user, film_id=self.films[2], created_at=None
+        )
+        trending.add_review(review)
+        trending.remove_review(review)
+        self.assertEqual(self.trending()[-1], (self.films[2].id, 1))
+
+    def test_trending_deleted_film(self) -> None:
+        # Buckets of a film deleted between the sum and the read of the films
+        bucket: FilmHourlyReviews = FilmHourlyReviews.objects.create(
+            film_id_id=self.films[-1].id + 1,
+            hour=trending.hour_of(timezone.now()),
+            reviews=10,
+        )
+        self.addCleanup(bucket.delete)  # Before the foreign keys are checked
+        self.assertEqual(
+            self.trending(),
+            [(self.films[0].id, 3), (self.films[1].id, 2), (self.films[2].id, 1)],
+        )
+
+    def test_invalid_parameters(self) -> None:
+        for params in ["?window=1y", "?limit=0"]:
+            response: HttpResponse = Client().get(reverse("film_trending") + params)
+            self.assertEqual(response.status_code, 400, msg=params)
+
+    def test_rebuild_trending_command(self) -> None:
+        self.review(self.films[1], self.users[2], timedelta(days=10))
+        FilmHourlyReviews.objects.update(reviews=0)
+        output: StringIO = StringIO()
+        call_command("rebuild_trending", stdout=output)
+        self.assertIn("Trending films rebuilt, 3 buckets", output.getvalue())
+        self.assertEqual(
+            self.trending("?window=7d"),
+            [(self.films[0].id, 3), (self.films[1].id, 2), (self.films[2].id, 1)],
+        )
+
+    def test_trending_queries(self) -> None:
+        client: Client = Client()
+        with self.assertNumQueries(2):
+            client.get(reverse("film_trending"))
+
+
+class TestLeaderboards(TestCase):
+    def setUp(self) -> None:
+        self.films: dict[str, Film] = {
+            name: Film.objects.create(
+                name=name,
+                release="2021-01-01",
+                genre=genre,
+                description="testdescription",
+                duration=120,
+            )
+            for name, genre in [
+                ("best", "Drama"),
+                ("good", "Drama"),
+                ("fair", "Drama"),
+                ("unrated", "Drama"),
+                ("comedy", "Comedy"),
+            ]
+        }
+        self.users: list[User] = [
+            User.objects.create_user(
+                username=f"testuser{i}", email=f"test{i}@test.com", password="Password1"
+            )
+            for i in range(2)
+        ]
+        self.clients: list[Client] = [self.login(user) for user in self.users]
+        for name, rating in [("best", 9), ("good", 8), ("fair", 7), ("comedy", 5)]:
+            self.post_review(self.clients[0], self.films[name], rating)
+
+    def login(self, user: User) -> Client:
+        client: Client = Client()
+        client.cookies["session"] = Token.objects.create(user=user).key
+        client.get(reverse("user_info"))  # the user is then read from the cache
+        return client
+
+    def post_review(self, client: Client, film: Film, rating: int) -> None:
+        client.post(
+            reverse("user_add_review"),
+            json.dumps({"rating": rating, "film_id": film.id}),
+            content_type="application/json",
+        )
+
+    def leaderboard(self, genre: str, params: str = "") -> list[str]:
+        path: str = reverse("film_leaderboard", kwargs={"genre": genre})
+        response: HttpResponse = Client().get(path + params)
+        self.assertEqual(response.status_code, 200)
+        return [film["name"] for film in response.json()["films"]]
+
+    def test_leaderboards(self) -> None:
+        path: str = reverse("film_leaderboard", kwargs={"genre": "Drama"})
+        data: dict = Client().get(path).json()
+        self.assertEqual(data["genre"], "Drama")
+        self.assertEqual([film["rank"] for film in data["films"]], [1, 2, 3])
+        self.assertEqual(self.leaderboard("Drama"), ["best", "good", "fair"])
+        self.assertEqual(self.leaderboard("drama"), ["best", "good", "fair"])
+        self.assertEqual(self.leaderboard("Comedy"), ["comedy"])
+        self.assertEqual(self.leaderboard("Western"), [])
+
+        response: HttpResponse = Client().get(
+            reverse("film_leaderboard", kwargs={"genre": "Opera"})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_leaderboard_pages(self) -> None:
+        path: str = reverse("film_leaderboard", kwargs={"genre": "Drama"})
+        data: dict = Client().get(path + "?limit=2").json()
+        self.assertEqual([film["name"] for film in data["films"]], ["best", "good"])
+        self.assertEqual(
+            self.leaderboard("Drama", f"?limit=2&cursor={data['next']}"), ["fair"]
+        )
+
+    def test_reviews_enter_and_leave_leaderboard(self) -> None:
+        with self.settings(LEADERBOARDS={"SIZE": 2}):
+            leaderboards.rebuild_leaderboards()
+            self.assertEqual(self.leaderboard("Drama"), ["best", "good"])
+
+            # fair gets an average of 8.5
+            self.post_review(self.clients[1], self.films["fair"], 10)
+            self.assertEqual(self.leaderboard("Drama"), ["best", "fair"])
+
+            review: Review = Review.objects.get(user_id=self.users[1])
+            self.clients[1].post(
+                reverse("user_del_review"),
+                json.dumps({"review_id": review.id}),
+                content_type="application/json",
+            )
+            self.assertEqual(self.leaderboard("Drama"), ["best", "good"])
+
+    def test_leaderboard_on_user_delete(self) -> None:
+        with self.settings(LEADERBOARDS={"SIZE": 2}):
+            leaderboards.rebuild_leaderboards()
+            self.post_review(self.clients[1], self.films["fair"], 10)
+            self.clients[1].put(
+                reverse("user_delete"),
+                json.dumps({"password": "Password1"}),
+                content_type="application/json",
+            )
+            self.assertEqual(self.leaderboard("Drama"), ["best", "good"])
+
+    def test_leaderboard_on_film_changes(self) -> None:
+        film: Film = Film.objects.get(name="good")  # With its rating aggregates
+        film.genre = "Comedy"
+        film.save()
+        self.assertEqual(self.leaderboard("Drama"), ["best", "fair"])
+        self.assertEqual(self.leaderboard("Comedy"), ["good", "comedy"])
+
+        self.films["best"].delete()
+        self.assertEqual(self.leaderboard("Drama"), ["fair"])
+
+    def test_leaderboard_on_bulk_import(self) -> None:
+        # Two films swap genres
+        films: list[dict] = [
+            {
+                "name": name,
+                "release": "2021-01-01",
+                "genre": genre,
+                "description": "testdescription",
+                "duration": 120,
+                "director": "Test Director",
+                "cast": ["Test Actor"],
+            }
+            for name, genre in [("good", "Comedy"), ("comedy", "Drama")]
+        ]
+        response: HttpResponse = Client().post(
+            reverse("bulk_films"), json.dumps(films), content_type="application/json"
+        )
+        self.assertEqual(response.json()["updated"], 2)
+        self.assertEqual(self.leaderboard("Drama"), ["best", "fair", "comedy"])
+        self.assertEqual(self.leaderboard("Comedy"), ["good"])
+
+    def test_leaderboards_match_film_search(self) -> None:
+        bench_film_filter.Command().populate(60, 300, random.Random(0))
+        leaderboards.rebuild_leaderboards()
+        for genre in Film.GENRE_CHOICES:
+            self.assertEqual(
+                bench_leaderboards.leaderboard_top_films(genre, 100),
+                bench_leaderboards.filtered_top_films(genre, 100),
+                msg=f"Leaderboard of {genre} differs from the film search",
+            )
+
+    def test_leaderboard_queries(self) -> None:
+        client: Client = Client()
+        with self.assertNumQueries(1):
+            client.get(reverse("film_leaderboard", kwargs={"genre": "Drama"}))
+
+    def test_bench_leaderboards(self) -> None:
+        stdout: StringIO = StringIO()
+        stderr: StringIO = StringIO()
+        call_command(
+            "bench_leaderboards",
+            *["--films", "60", "--reviews", "300", "--writes", "20", "--repeat", "1"],
+            stdout=stdout,
+            stderr=stderr,
+        )
+        self.assertEqual(stderr.getvalue(), "")
+        self.assertIn("Refresh after a review", stdout.getvalue())
+        self.assertEqual(Film.objects.count(), len(self.films))  # Rolled back
+
+
+class TestAutocomplete(TestCase):
+    def setUp(self) -> None:
+        autocomplete_index.clear()
+        self.directors: dict[str, Director] = {
+            name: Director.objects.create(name=name)
+            for name in ["Francis Coppola", "George Lucas"]
+        }
+        self.actors: dict[str, Actor] = {
+            name: Actor.objects.create(name=name)
+            for name in ["Al Pacino", "Mark Hamill", "Audrey Tautou"]
+        }
+        self.films: dict[str, Film] = {}
+        for name, reviews, director, cast in [
+            ("The Godfather", 30, "Francis Coppola", ["Al Pacino"]),
+            ("Star Wars", 50, "George Lucas", ["Mark Hamill"]),
+            ("Stardust", 5, None, []),
+            ("Amélie", 20, None, ["Audrey Tautou"]),
+        ]:
+            self.films[name] = Film.objects.create(
+                name=name,
+                release="2021-01-01",
+                genre="Drama",
+                description="testdescription",
+                duration=120,
+                director_id=self.directors.get(director),
+                review_count=reviews,
+            )
+            self.films[name].cast.set([self.actors[actor] for actor in cast])
+        # As the server loads it in the background as it starts
+        autocomplete_index.load()
+
+    def tearDown(self) -> None:
+        autocomplete_index.clear()
+
+    def autocomplete(self, text: str, params: str = "") -> list[str]:
+        response: HttpResponse = Client().get(
+            reverse("autocomplete") + "?" + urlencode({"q": text}) + params
+        )
+        self.assertEqual(response.status_code, 200)
+        return [result["name"] for result in response.json()["results"]]
+
+    def test_autocomplete(self) -> None:
+        response: HttpResponse = Client().get(reverse("autocomplete") + "?q=god")
+        self.assertEqual(
+            response.json(),
+            {
+                "query": "god",
+                "results": [
+                    {
+                        "type": "film",
+                        "id": self.films["The Godfather"].id,
+                        "name": "The Godfather",
+                    }
+                ],
+            },
+        )
+        # Most popular first, people by the reviews of their films
+        self.assertEqual(self.autocomplete("sta"), ["Star Wars", "Stardust"])
+        self.assertEqual(
+            self.autocomplete("a"), ["Al Pacino", "Amélie", "Audrey Tautou"]
+        )
+        self.assertEqual(self.autocomplete("the g"), ["The Godfather"])
+        self.assertEqual(self.autocomplete("  AME  "), ["Amélie"])
+        self.assertEqual(self.autocomplete("lucas"), ["George Lucas"])
+        self.assertEqual(self.autocomplete("a", "&limit=1"), ["Al Pacino"])
+        self.assertEqual(self.autocomplete("wars star"), [])
+        self.assertEqual(self.autocomplete("!?"), [])
+
+    def test_autocomplete_errors(self) -> None:
+        client: Client = Client()
+        for params in ["", "?q=", "?q=%20", "?q=star&limit=0", "?q=star&limit=21"]:
+            response: HttpResponse = client.get(reverse("autocomplete") + params)
+            self.assertEqual(response.status_code, 400, msg=params)
+
+    def test_autocomplete_follows_changes(self) -> None:
+        self.assertEqual(self.autocomplete("star"), ["Star Wars", "Stardust"])
+        with self.captureOnCommitCallbacks(execute=True):
+            Film.objects.create(
+                name="Starman",
+                release="2021-01-01",
+                genre="Drama",
+                description="testdescription",
+                duration=120,
+            )
+            stardust: Film = self.films["Stardust"]
+            stardust.name = "Lost Stardust"
+            stardust.save()
+            self.films["Star Wars"].delete()
+            Director.objects.create(name="Stanley Kubrick")
+        self.assertEqual(self.autocomplete("star"), ["Lost Stardust", "Starman"])
+        self.assertEqual(
+            self.autocomplete("sta"), ["Lost Stardust", "Stanley Kubrick", "Starman"]
+        )
+
+        # Reviews make Starman the most popular
+        starman: Film = Film.objects.get(name="Starman")
+        users: list[User] = [
+            User.objects.create(username=f"testuser{i}", email=f"test{i}@test.com")
+            for i in range(6)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            for user in users:
+                Review.objects.create(rating=5, user_id=user, film_id=starman)
+        self.assertEqual(self.autocomplete("star"), ["Starman", "Lost Stardust"])
+        with self.captureOnCommitCallbacks(execute=True):
+            starman.reviews.all().delete()
+        self.assertEqual(self.autocomplete("star"), ["Lost Stardust", "Starman"])
+
+    def test_autocomplete_queries(self) -> None:
+        with self.assertNumQueries(0):
+            Client().get(reverse("autocomplete") + "?q=god")
+
+    def test_autocomplete_loading(self) -> None:
+        # A loader thread of the worker still running
+        loaded: threading.Event = threading.Event()
+        autocomplete_index.clear()
+        autocomplete_index.loader = threading.Thread(target=loaded.wait)
+        autocomplete_index.loader.start()
+        try:
+            response: HttpResponse = Client().get(reverse("autocomplete") + "?q=god")
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response["Retry-After"], "5")
+            # The lookup left the running loader alone
+            self.assertIsNone(autocomplete_index.index)
+        finally:
+            loaded.set()
+            autocomplete_index.loader.join()
+        autocomplete_index.load()
+        self.assertEqual(self.autocomplete("god"), ["The Godfather"])
+
+    def test_prefix_index_updates(self) -> None:
+        # Few results and a low scan limit, so most prefixes keep their best
+        rng: random.Random = random.Random(0)
+        words: list[str] = ["ab", "abc", "b", "ba", "bab", "c"]
+        index: PrefixIndex = PrefixIndex(results=3, scan_limit=4)
+        index.load(
+            ("film", i, " ".join(rng.choices(words, k=2)), rng.randint(0, 5))
+            for i in range(60)
+        )
+        self.assertTrue(index.top)
+        for i in range(300):
+            kind, id = "film", rng.randrange(80)
+            change: int = rng.randrange(4)
+            if change == 0:
+                index.rename(kind, id, " ".join(rng.choices(words, k=2)))
+            elif change == 1:
+                index.remove(kind, id)
+            else:
+                index.add_popularity(kind, id, rng.choice([-2, -1, 1, 2]))
+
+            entries: list[Entry] = [
+                entry
+                for entries in index.by_kind.values()
+                for entry in entries.values()
+            ]
+            for prefix in ["a", "ab", "b", "ba", "c", "ab b"]:
+                expected: list[Entry] = sorted(
+                    (
+                        entry
+                        for entry in entries
+                        if any(key.startswith(prefix) for key in entry.keys())
+                    ),
+                    key=Entry.rank,
+                )[:3]
+                self.assertEqual(index.search(prefix), expected, msg=f"{i} {prefix}")
+
+    def test_bench_autocomplete(self) -> None:
+        stdout: StringIO = StringIO()
+        stderr: StringIO = StringIO()
+        call_command(
+            "bench_autocomplete",
+            *["--names", "3000", "--words", "200", "--lookups", "200"],
+            *["--updates", "50", "--checks", "20"],
+            stdout=stdout,
+            stderr=stderr,
+        )
+        self.assertEqual(stderr.getvalue(), "")
+        self.assertIn("Lookup, 1 to 8 characters", stdout.getvalue())
+
+
 class TestGetUserReviewsViews(TestCase):
     def setUp(self) -> None:
         self.client = Client()
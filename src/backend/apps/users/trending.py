@@ -0,0 +1,132 @@
+import datetime
+from collections import Counter
+from django.db import connection
+from django.db.models import Count, F, OuterRef, QuerySet, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncHour
+from django.utils import timezone
+
+from apps.users.models import User, Film, Review, FilmHourlyReviews
+from apps.users.similarity import BATCH_SIZE, insert_rows
+
+# Note.
+# Trending films are the films with the most reviews written in the last WINDOWS. Each
+# film keeps its number of reviews written in every hour (FilmHourlyReviews), updated
+# as reviews are written and deleted, so the trending films add up the buckets of the
+# window rather than counting reviews. Callers are expected to run these updates in
+# the same transaction as the review write, as for the rating aggregates (ratings.py).
+# Buckets older than the longest window are no longer read, the rebuild_trending
+# command drops them (and recounts the others from the review timestamps).
+
+WINDOWS: dict[str, datetime.timedelta] = {
+    "24h": datetime.timedelta(hours=24),
+    "7d": datetime.timedelta(days=7),
+}
+DEFAULT_WINDOW = "24h"
+HOUR = datetime.timedelta(hours=1)
+
+
+def hour_of(moment: datetime.datetime) -> datetime.datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def window_hours(window: datetime.timedelta) -> tuple[datetime.datetime, ...]:
+    """First and last hours of the window, the current one being its last"""
+    last: datetime.datetime = hour_of(timezone.now())
+    return last - window + HOUR, last
+
+
+def add_review(review: Review) -> None:
+    """Counts the review in the bucket of its hour, created if it is the first"""
+    if review.created_at is None or review.film_id_id is None:
+        return
+    table: str = connection.ops.quote_name(FilmHourlyReviews._meta.db_table)
+    film, hour, reviews = (
+        connection.ops.quote_name(FilmHourlyReviews._meta.get_field(name).column)
+        for name in ["film_id", "hour", "reviews"]
+    )
+    # A single statement, concurrent first reviews of an hour can not both insert
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({film}, {hour}, {reviews}) VALUES (%s, %s, 1) "
+            f"ON CONFLICT ({film}, {hour}) "
+            f"DO UPDATE SET {reviews} = {table}.{reviews} + 1",
+            [
+                review.film_id_id,
+                connection.ops.adapt_datetimefield_value(hour_of(review.created_at)),
+            ],
+        )
+
+
+def remove_review(review: Review) -> None:
+    if review.created_at is None or review.film_id_id is None:
+        return
+    FilmHourlyReviews.objects.filter(
+        film_id=review.film_id_id, hour=hour_of(review.created_at)
+    ).update(reviews=F("reviews") - 1)
+
+
+def remove_user_reviews(user: User) -> None:
+    """Removes every review of the user from its bucket with a single UPDATE"""
+    bucket_reviews: Subquery = Subquery(
+        Review.objects.filter(user_id=user, film_id=OuterRef("film_id"))
+        .annotate(hour=TruncHour("created_at", tzinfo=datetime.timezone.utc))
+        .filter(hour=OuterRef("hour"))
+        .values("hour")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    FilmHourlyReviews.objects.filter(
+        film_id__in=Review.objects.filter(user_id=user).values("film_id")
+    ).update(reviews=F("reviews") - Coalesce(bucket_reviews, Value(0)))
+
+
+def trending_films(window: datetime.timedelta, limit: int) -> list[Film]:
+    """
+    The limit films with the most reviews in the window, most reviewed first,
+    annotated with their reviews in the window (recent_reviews)
+    """
+    # Summed from the buckets alone, the films of the top ones are read afterwards.
+    # Bounded on both ends, SQLite reads the window from the hour index rather than
+    # scanning the (film, hour) one to group without sorting.
+    top: list[dict] = list(
+        FilmHourlyReviews.objects.filter(
+            hour__range=window_hours(window), reviews__gt=0
+        )
+        .values("film_id")
+        .annotate(recent_reviews=Sum("reviews"))
+        .order_by("-recent_reviews", "film_id")[:limit]
+    )
+    films: dict[int, Film] = Film.objects.in_bulk([row["film_id"] for row in top])
+    trending: list[Film] = []
+    for row in top:
+        film: Film | None = films.get(row["film_id"], None)
+        if film is None:  # Deleted since the buckets were summed
+            continue
+        film.recent_reviews = row["recent_reviews"]
+        trending.append(film)
+    return trending
+
+
+def rebuild_buckets() -> int:
+    """
+    Recounts the buckets of the longest window from the review timestamps, and drops
+    the older ones. Returns the buckets stored.
+    """
+    FilmHourlyReviews.objects.all().delete()
+    # Truncated here, SQLite truncates dates with a Python function per review anyway
+    reviews: QuerySet = Review.objects.filter(
+        created_at__gte=window_hours(max(WINDOWS.values()))[0], film_id__isnull=False
+    ).values_list("film_id", "created_at")
+    buckets: Counter = Counter(
+        (film, hour_of(created_at))
+        for film, created_at in reviews.iterator(chunk_size=BATCH_SIZE)
+    )
+    rows: list[tuple] = [
+        (film, connection.ops.adapt_datetimefield_value(hour), count)
+        for (film, hour), count in buckets.items()
+    ]
+    return insert_rows(
+        FilmHourlyReviews,
+        ["film_id", "hour", "reviews"],
+        (rows[start : start + BATCH_SIZE] for start in range(0, len(rows), BATCH_SIZE)),
+    )
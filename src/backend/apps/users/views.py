@@ -1,20 +1,46 @@
-import datetime
+from typing import Iterator
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.contrib.auth.base_user import AbstractBaseUser
 from django.db import transaction, IntegrityError
-from django.db.models import QuerySet, Value, Avg, Case, When
+from django.db.models import QuerySet
 from django.db.models.manager import BaseManager
 from rest_framework import generics, status, serializers
 from rest_framework.views import APIView
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, Throttled
+from rest_framework.throttling import BaseThrottle
 
 # from rest_framework.authentication import SessionAuthentication
 # from rest_framework.exceptions import PermissionDenied
 
-from apps.users.models import User, Film, Director, Actor, Review
+from apps.users import leaderboards, ratings, trending
+from apps.users.autocomplete import autocomplete_index, IndexLoading, RETRY_AFTER
+from apps.users.authentication import login_throttle, login_token, token_cache
+from apps.users.caching import film_cache, search_key
+from apps.users.models import (
+    User,
+    Film,
+    Director,
+    Actor,
+    Review,
+    SimilarFilm,
+    LeaderboardFilm,
+    RecommendedFilm,
+    PopularFilm,
+)
+from apps.users.filters import filter_films
+from apps.users.pagination import (
+    REVIEW_ORDERING,
+    film_ordering,
+    get_limit,
+    listing_params,
+    paginate_request,
+)
+from apps.users.streaming import streaming_response, wants_stream
+from apps.users.resolvers import resolve_or_create
+from apps.users.importer import FilmImporter, iter_json_array, iter_json_lines
 from apps.users.serializers import (
     UserSerializer,
     UserLoginSerializer,
@@ -27,10 +53,16 @@ from apps.users.serializers import (
     FilmSerializer,
     FilmFilterSerializer,
     DeleteFilmSerializer,
+    SimilarFilmSerializer,
+    RecommendedFilmSerializer,
+    TrendingFilmSerializer,
+    LeaderboardFilmSerializer,
     ReviewSerializer,
     DeleteReviewSerializer,
 )
 
+JSON_LINES_TYPES: list[str] = ["application/jsonl", "application/x-ndjson"]
+
 # To display headers and authenticators of a view request:
 # print("\nRequest headers:")
 # for header, value in request.META.items():
@@ -48,11 +80,8 @@ class UserRegisterView(generics.CreateAPIView):
     # Specify that unauthenticated (service) users have access to this view
 
     def post(self, request: Request) -> Response:
-        # parse data
-        data: dict = {
-            k: v[0] if type(v) is list and len(v) == 1 else v
-            for k, v in dict(request.data).items()
-        }
+        # parse request data
+        data: dict = request.data
         # serialize
         serializer: serializers.Serializer = self.get_serializer(data=data)
         response: Response
@@ -72,35 +101,41 @@ class UserLoginView(generics.GenericAPIView):
     serializer_class: type = UserLoginSerializer
     # Specify that unauthenticated (web) users have access to this view
 
-    def get_object(self) -> AbstractBaseUser:
+    def get_object(self) -> AbstractBaseUser | None:
         """Overwrite method to get the authenticated user object"""
-        try:
-            session_key: str = self.request.COOKIES.get("session")
-            user: AbstractBaseUser = Token.objects.get(key=session_key).user
-        except ObjectDoesNotExist:
-            user = None
-        return user
+        if not self.request.user.is_authenticated:
+            return None
+        return self.request.user
+
+    def get_ident(self) -> str:
+        """Client IP, behind NUM_PROXIES proxies (see DRF's throttling)"""
+        return BaseThrottle().get_ident(self.request)
 
     def post(self, request: Request) -> Response:
         response: Response
         user: AbstractBaseUser
 
         try:
-            # parse data
-            data: dict = {
-                k: v[0] if type(v) is list and len(v) == 1 else v
-                for k, v in dict(request.data).items()
-            }
+            # parse request data
+            data: dict = request.data
             # Verify the absence of session token
             serializer: serializers.Serializer = self.get_serializer(data=data)
             user = self.get_object()
             if user:
                 raise ValidationError("Already logged in.")
 
+            # Refuse clients with too many failed logins before hashing the password
+            ident: str = self.get_ident()
+            username: str = str(data.get("username", ""))
+            if not login_throttle.allowed(ident, username):
+                raise Throttled(wait=login_throttle.window)
+
             # Run serializer validations
             user = serializer.is_valid()
             if not user:
+                login_throttle.failed(ident, username)
                 raise ValidationError("Unable to log in with provided credentials.")
+            login_throttle.succeeded(username)
 
             # Create response content (in this case, just a confirmation message)
             response_content: dict[str, str] = {
@@ -109,8 +144,7 @@ class UserLoginView(generics.GenericAPIView):
             # Create response object
             response = Response(data=response_content, status=status.HTTP_200_OK)
             # Aggregate cookie to the response
-            token: Token
-            token, _ = Token.objects.get_or_create(user=serializer.validated_data)
+            token: Token = login_token(serializer.validated_data)
             response.set_cookie(
                 key="session",
                 value=token.key,
@@ -125,6 +159,13 @@ class UserLoginView(generics.GenericAPIView):
                 status=status.HTTP_401_UNAUTHORIZED,
             )
 
+        except Throttled as error:
+            response = Response(
+                {"detail": error.detail},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(error.wait)},
+            )
+
         return response
 
 
@@ -134,17 +175,9 @@ class UserProfileInfoView(generics.RetrieveAPIView):
 
     def get_object(self) -> AbstractBaseUser:
         """Overwrite method to get the authenticated user object"""
-
-        # Note.
-        # I think that once I have specified permission classes I could simply do this:
-        # return self.request.user
-
-        try:
-            session_key: str = self.request.COOKIES.get("session")
-            user: AbstractBaseUser = Token.objects.get(key=session_key).user
-        except ObjectDoesNotExist:
+        if not self.request.user.is_authenticated:
             raise PermissionDenied("session cookie missing or not valid")
-        return user
+        return self.request.user
 
     def get(self, request: Request) -> Response:
 
@@ -173,11 +206,14 @@ class UserProfileUpdateView(generics.UpdateAPIView):
         return UserUpdateSerializer
 
     def get_object(self) -> AbstractBaseUser:
-        """Overwrite method to get the authenticated user object"""
-        try:
-            session_key: str = self.request.COOKIES.get("session")
-            user: AbstractBaseUser = Token.objects.get(key=session_key).user
-        except ObjectDoesNotExist:
+        """
+        Overwrite method to get the authenticated user object, read again with its
+        password hash (left out of the cached user)
+        """
+        if not self.request.user.is_authenticated:
+            raise PermissionDenied("session cookie missing or not valid")
+        user: User | None = User.objects.filter(pk=self.request.user.pk).first()
+        if user is None:  # Deleted since it was cached
             raise PermissionDenied("session cookie missing or not valid")
         return user
 
@@ -185,11 +221,8 @@ class UserProfileUpdateView(generics.UpdateAPIView):
         response: Response
 
         try:
-            # parse data
-            data: dict = {
-                k: v[0] if type(v) is list and len(v) == 1 else v
-                for k, v in dict(request.data).items()
-            }
+            # parse request data
+            data: dict = request.data
             # Get user (or raise error if no cookie)
             user: AbstractBaseUser = self.get_object()
 
@@ -200,6 +233,7 @@ class UserProfileUpdateView(generics.UpdateAPIView):
             )
             serializer.is_valid(raise_exception=True)  # Check user's current password
             serializer.save()
+            token_cache.invalidate(self.request.auth)  # Cached user is outdated
 
             response = Response(
                 status=status.HTTP_200_OK,
@@ -247,6 +281,7 @@ class UserLogoutView(generics.GenericAPIView):
             )
             response.delete_cookie(key="session")
             token.delete()
+            token_cache.invalidate(session_key)
 
         except ObjectDoesNotExist:
             response = Response(
@@ -266,11 +301,14 @@ class UserDeleteView(generics.DestroyAPIView):
         return UserDeleteSerializer
 
     def get_object(self) -> AbstractBaseUser:
-        """Overwrite method to get the authenticated user object"""
-        try:
-            session_key: str = self.request.COOKIES.get("session")
-            user: AbstractBaseUser = Token.objects.get(key=session_key).user
-        except ObjectDoesNotExist:
+        """
+        Overwrite method to get the authenticated user object, read again with its
+        password hash (left out of the cached user)
+        """
+        if not self.request.user.is_authenticated:
+            raise PermissionDenied("session cookie missing or not valid")
+        user: User | None = User.objects.filter(pk=self.request.user.pk).first()
+        if user is None:  # Deleted since it was cached
             raise PermissionDenied("session cookie missing or not valid")
         return user
 
@@ -282,15 +320,7 @@ class UserDeleteView(generics.DestroyAPIView):
             user: User = self.get_object()
 
             # parse request data
-            data: dict = {
-                k: v[0] if type(v) is list and len(v) == 1 else v
-                for k, v in dict(request.data).items()
-            }
-            # Get user using session cookie
-            session_key: str = self.request.COOKIES.get("session")
-            token: Token = Token.objects.get(key=session_key)
-            user: AbstractBaseUser = token.user
-
+            data: dict = request.data
             # Validate password
             serializer: serializers.ModelSerializer = self.get_serializer(
                 user, data=data, partial=True
@@ -302,8 +332,15 @@ class UserDeleteView(generics.DestroyAPIView):
                 data={"detail": "Account deletion successful"},
             )
             response.delete_cookie(key="session")
-            token.delete()
-            user.delete()
+            with transaction.atomic():
+                # Remove the user's reviews along with their film ratings
+                ratings.remove_user_reviews(user)
+                trending.remove_user_reviews(user)
+                leaderboards.remove_user_reviews(user)
+                user.reviews.all().delete()
+                Token.objects.filter(user=user).delete()
+                user.delete()
+            token_cache.invalidate(self.request.auth)
 
         except PermissionDenied as error:
             response = Response(
@@ -337,12 +374,9 @@ class FilterFilmsView(APIView):
 
     def get_object(self) -> AbstractBaseUser:
         """Overwrite method to get the authenticated user object"""
-        try:
-            session_key: str = self.request.COOKIES.get("session")
-            user: AbstractBaseUser = Token.objects.get(key=session_key).user
-        except ObjectDoesNotExist:
+        if not self.request.user.is_authenticated:
             raise PermissionDenied("session cookie missing or not valid")
-        return user
+        return self.request.user
 
     def get(self, request: Request) -> Response:
         # For some reason, django rest framework doesnt render the form when using
@@ -360,139 +394,40 @@ class FilterFilmsView(APIView):
         response: Response
         try:
             # parse request data
-            filter_data: dict = {
-                k: v[0] if type(v) is list and len(v) == 1 else v
-                for k, v in dict(request.data).items()
-            }
+            filter_data: dict = request.data
 
             serializer: serializers.Serializer = FilmFilterSerializer(data=filter_data)
             serializer.is_valid(raise_exception=True)
             validated_data: dict = serializer.validated_data
 
-            film_name: str = filter_data.get("film_name", None)
-            director_name: str = filter_data.get("director_name", None)
-            actor_name: str = filter_data.get("actor_name", None)
-            film_genre: str = filter_data.get("genre", None)
-            film_description: str = filter_data.get("description", None)
-            min_release: str = filter_data.get("min_release", None)
-            max_release: str = filter_data.get("max_release", None)
-            min_rating: float = filter_data.get("min_rating", None)
-            max_rating: float = filter_data.get("max_rating", None)
-
-            # String Filters
-            use_union: bool = True
-            use_string_filter: bool = False
-            if use_union:
-                string_queryset: QuerySet = Film.objects.none()  # empty Film queryset
-            else:
-                string_queryset: QuerySet = Film.objects.all()
+            # Compile every criterion into a single query
+            films: QuerySet = filter_films(self.queryset.for_listing(), validated_data)
 
-            if film_name is not None and not film_name == "":
-                use_string_filter = True
-                film_name_queryset: QuerySet = self.queryset.filter(
-                    name__icontains=film_name
-                )
-                if use_union:
-                    string_queryset = string_queryset.union(film_name_queryset)
-                else:
-                    string_queryset = string_queryset.intersection(film_name_queryset)
-
-            if director_name is not None and not director_name == "":
-                use_string_filter = True
-                dir_name_queryset: QuerySet = self.queryset.filter(
-                    director_id__name__icontains=director_name
-                )
-                if use_union:
-                    string_queryset = string_queryset.union(dir_name_queryset)
-                else:
-                    string_queryset = string_queryset.intersection(dir_name_queryset)
-
-            if actor_name is not None and not actor_name == "":
-                use_string_filter = True
-                actor_name_queryset: QuerySet = self.queryset.filter(
-                    cast__name__icontains=actor_name
-                )
-                if use_union:
-                    string_queryset = string_queryset.union(actor_name_queryset)
-                else:
-                    string_queryset = string_queryset.intersection(actor_name_queryset)
-
-            if film_genre is not None and not film_genre == "":
-                use_string_filter = True
-                genre_queryset: QuerySet = self.queryset.filter(
-                    genre__icontains=film_genre
+            if wants_stream(request) and get_limit(request) is None:
+                # Whole listing, serialized row by row (see streaming.py)
+                response = streaming_response("films", films, FilmSerializer())
+            else:
+                cache_key: str | None
+                cached: dict | None
+                cache_key, cached = film_cache.lookup(
+                    "search", search_key(validated_data, listing_params(request))
                 )
-                if use_union:
-                    string_queryset = string_queryset.union(genre_queryset)
-                else:
-                    string_queryset = string_queryset.intersection(genre_queryset)
-
-            if film_description is not None and not film_description == "":
-                use_string_filter = True
-                description_queryset: QuerySet = self.queryset.filter(
-                    description__icontains=film_description
+                if cached is not None:
+                    return film_cache.hit(cached)
+
+                page: dict
+                films, page = paginate_request(
+                    request, films, film_ordering(request, films)
                 )
-                if use_union:
-                    string_queryset = string_queryset.union(description_queryset)
-                else:
-                    string_queryset = string_queryset.intersection(description_queryset)
-
-            if not use_string_filter:
-                string_queryset = self.queryset.all()
-
-            # Filter films by release year
-            relase_queryset: QuerySet = self.queryset.all()
-            if min_release is not None and not min_release == "":
-                min_date: datetime.datetime = validated_data.get("min_release")
-                relase_queryset = relase_queryset.filter(release__gte=min_date.date())
-
-            if max_release is not None and not max_release == "":
-                max_date: datetime.datetime = validated_data.get("max_release")
-                relase_queryset = relase_queryset.filter(release__lte=max_date.date())
-
-            # Filter films by average rating
-            rating_queryset: QuerySet = self.queryset.all()
-            if min_rating is not None and not min_rating == "":
-                min_value: int = validated_data.get("min_rating")
-                # Annotate each film with its average rating
-                rating_queryset = rating_queryset.annotate(
-                    avg_rating=Avg(
-                        Case(
-                            When(reviews__rating__isnull=True, then=Value(0)),
-                            default="reviews__rating",
-                        )
-                    )
+                serializer = FilmSerializer(films, many=True)
+
+                response = film_cache.store(
+                    cache_key,
+                    Response(
+                        status=status.HTTP_200_OK,
+                        data={"films": serializer.data, **page},
+                    ),
                 )
-                rating_queryset = rating_queryset.filter(avg_rating__gte=min_value)
-
-            if max_rating is not None and not max_rating == "":
-                max_value: int = validated_data.get("max_rating")
-                # If not already annotated, annotate each film with its average rating
-                if min_rating is None or min_release == "":
-                    rating_queryset = rating_queryset.annotate(
-                        avg_rating=Avg(
-                            Case(
-                                When(reviews__rating__isnull=True, then=Value(0)),
-                                default="reviews__rating",
-                            )
-                        )
-                    )
-                rating_queryset = rating_queryset.filter(avg_rating__lte=max_value)
-
-            processed_rating_queryset: BaseManager[Film] = self.queryset.filter(
-                id__in=rating_queryset
-            )
-
-            final_queryset: QuerySet = self.queryset.all()
-            final_queryset = final_queryset.intersection(string_queryset)
-            final_queryset = final_queryset.intersection(relase_queryset)
-            final_queryset = final_queryset.intersection(processed_rating_queryset)
-            serializer = FilmSerializer(final_queryset, many=True)
-
-            response = Response(
-                status=status.HTTP_200_OK,
-                data={"films": serializer.data},
-            )
 
         except ValidationError as error:
             response = Response(
@@ -508,7 +443,7 @@ class FilmDetailView(generics.RetrieveAPIView):
 
     def get_object(self, value: int) -> Film:
         try:
-            film: Film = Film.objects.get(pk=value)
+            film: Film = self.queryset.for_listing().get(pk=value)
         except Film.DoesNotExist:
             film = None
             raise ValidationError("Film not found.")
@@ -517,10 +452,18 @@ class FilmDetailView(generics.RetrieveAPIView):
     def get(self, request: Request, id: int) -> Response:
         response: Response
 
+        cache_key: str | None
+        cached: dict | None
+        cache_key, cached = film_cache.lookup("detail", str(id))
+        if cached is not None:
+            return film_cache.hit(cached)
+
         try:
             film: Film = self.get_object(id)
             serializer: serializers.Serializer = FilmSerializer(film)
-            response = Response(serializer.data, status=status.HTTP_200_OK)
+            response = film_cache.store(
+                cache_key, Response(serializer.data, status=status.HTTP_200_OK)
+            )
 
         except ValidationError as error:
             response = Response(
@@ -546,12 +489,87 @@ class FilmReviewsView(generics.ListAPIView):
         response: Response
         try:
             film: Film = self.get_object(id)
-            reviews: BaseManager[Review] = self.queryset.filter(film_id=film)
+            reviews: QuerySet[Review] = self.queryset.for_listing().filter(film_id=film)
 
-            # Create response
-            review_serializer: ReviewSerializer = ReviewSerializer(reviews, many=True)
+            if wants_stream(request) and get_limit(request) is None:
+                # Whole listing, serialized row by row (see streaming.py)
+                response = streaming_response("reviews", reviews, ReviewSerializer())
+            else:
+                page: dict
+                reviews, page = paginate_request(request, reviews, REVIEW_ORDERING)
+
+                # Create response
+                review_serializer: ReviewSerializer = ReviewSerializer(
+                    reviews, many=True
+                )
+                response = Response(
+                    {"reviews": review_serializer.data, **page},
+                    status=status.HTTP_200_OK,
+                )
+
+        except ValidationError as error:
             response = Response(
-                {"reviews": review_serializer.data},
+                {"detail": error.message}, status=status.HTTP_400_BAD_REQUEST
+            )
+        except ObjectDoesNotExist as error:
+            response = Response(
+                {"detail": str(error)}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        return response
+
+
+class SimilarFilmsView(generics.ListAPIView):
+    """Most similar films first, as of the last similar films build (similarity.py)"""
+
+    queryset: BaseManager[SimilarFilm] = SimilarFilm.objects.all()
+
+    def get(self, request: Request, id: int) -> Response:
+        response: Response
+        try:
+            similar: list[SimilarFilm] = list(
+                self.queryset.for_listing().filter(film_id=id)
+            )
+            # A film with similar films exists, only an empty listing is checked
+            if not similar and not Film.objects.filter(pk=id).exists():
+                raise ObjectDoesNotExist("Film not found.")
+
+            serializer: SimilarFilmSerializer = SimilarFilmSerializer(
+                similar, many=True
+            )
+            response = Response({"films": serializer.data}, status=status.HTTP_200_OK)
+
+        except ObjectDoesNotExist as error:
+            response = Response(
+                {"detail": str(error)}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        return response
+
+
+class TrendingFilmsView(generics.ListAPIView):
+    """
+    Films with the most reviews in the last 24 hours, or the last 7 days with
+    ?window=7d, from the hourly review buckets (trending.py)
+    """
+
+    DEFAULT_LIMIT = 20
+
+    def get(self, request: Request) -> Response:
+        response: Response
+        try:
+            window: str = request.query_params.get("window", trending.DEFAULT_WINDOW)
+            if window not in trending.WINDOWS:
+                choices: str = ", ".join(trending.WINDOWS)
+                raise ValidationError(f"Window must be one of: {choices}.")
+            limit: int = get_limit(request) or self.DEFAULT_LIMIT
+
+            films: list[Film] = trending.trending_films(trending.WINDOWS[window], limit)
+            serializer: TrendingFilmSerializer = TrendingFilmSerializer(
+                films, many=True
+            )
+            response = Response(
+                {"films": serializer.data, "window": window},
                 status=status.HTTP_200_OK,
             )
 
@@ -559,10 +577,88 @@ class FilmReviewsView(generics.ListAPIView):
             response = Response(
                 {"detail": error.message}, status=status.HTTP_400_BAD_REQUEST
             )
+
+        return response
+
+
+class LeaderboardView(generics.ListAPIView):
+    """Top rated films of a genre, best first, from its leaderboard (leaderboards.py)"""
+
+    queryset: BaseManager[LeaderboardFilm] = LeaderboardFilm.objects.all()
+
+    def get(self, request: Request, genre: str) -> Response:
+        response: Response
+        try:
+            # Genres are matched regardless of case, /films/top-rated/drama/ included
+            genres: dict[str, str] = {name.lower(): name for name in Film.GENRE_CHOICES}
+            if genre.lower() not in genres:
+                raise ObjectDoesNotExist("Genre not found.")
+            genre = genres[genre.lower()]
+
+            films: QuerySet[LeaderboardFilm] = self.queryset.for_listing().filter(
+                genre=genre
+            )
+            page: dict
+            films, page = paginate_request(request, films, ("rank",))
+
+            serializer: LeaderboardFilmSerializer = LeaderboardFilmSerializer(
+                films, many=True
+            )
+            response = Response(
+                {"genre": genre, "films": serializer.data, **page},
+                status=status.HTTP_200_OK,
+            )
+
         except ObjectDoesNotExist as error:
             response = Response(
                 {"detail": str(error)}, status=status.HTTP_404_NOT_FOUND
             )
+        except ValidationError as error:
+            response = Response(
+                {"detail": error.message}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return response
+
+
+class AutocompleteView(APIView):
+    """
+    Film, director and actor names starting with ?q=, or with one of their words
+    starting with it, most popular first, from the prefix index (autocomplete.py)
+    """
+
+    # Names are public, and a lookup reads neither the session nor the database
+    authentication_classes: tuple = ()
+
+    def get(self, request: Request) -> Response:
+        response: Response
+        try:
+            text: str = request.query_params.get("q", "")
+            if text.strip() == "":
+                raise ValidationError("Query must be provided.")
+            limit: int | None = get_limit(request)
+            if limit is not None and limit > autocomplete_index.max_results:
+                raise ValidationError(
+                    "Limit must be an integer between 1 and "
+                    f"{autocomplete_index.max_results}."
+                )
+
+            response = Response(
+                {"query": text, "results": autocomplete_index.search(text, limit)},
+                status=status.HTTP_200_OK,
+            )
+
+        except ValidationError as error:
+            response = Response(
+                {"detail": error.message}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        except IndexLoading as error:
+            response = Response(
+                {"detail": str(error)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(RETRY_AFTER)},
+            )
 
         return response
 
@@ -572,12 +668,9 @@ class PostReviewView(generics.CreateAPIView):
 
     def get_object(self) -> AbstractBaseUser:
         """Overwrite method to get the authenticated user object"""
-        try:
-            session_key: str = self.request.COOKIES.get("session")
-            user: AbstractBaseUser = Token.objects.get(key=session_key).user
-        except ObjectDoesNotExist:
+        if not self.request.user.is_authenticated:
             raise PermissionDenied("session cookie missing or not valid")
-        return user
+        return self.request.user
 
     def post(self, request: Request) -> Response:
 
@@ -587,10 +680,7 @@ class PostReviewView(generics.CreateAPIView):
 
         try:
             # parse request data
-            data: dict = {
-                k: v[0] if type(v) is list and len(v) == 1 else v
-                for k, v in dict(request.data).items()
-            }
+            data: dict = request.data
             # Get authenticated user & request data
             user: User = self.get_object()
             review_data: dict = dict()
@@ -634,25 +724,31 @@ class RetrieveReviewsView(generics.RetrieveAPIView):
 
     def get_object(self) -> AbstractBaseUser:
         """Overwrite method to get the authenticated user object"""
-        try:
-            session_key: str = self.request.COOKIES.get("session")
-            user: AbstractBaseUser = Token.objects.get(key=session_key).user
-        except ObjectDoesNotExist:
+        if not self.request.user.is_authenticated:
             raise PermissionDenied("session cookie missing or not valid")
-        return user
+        return self.request.user
 
     def get(self, request: Request) -> Response:
         response: Response
         try:
             user: User = self.get_object()
-            reviews: BaseManager[Review] = self.queryset.filter(user_id=user)
+            reviews: QuerySet[Review] = self.queryset.for_listing().filter(user_id=user)
 
-            # Create response
-            review_serializer: ReviewSerializer = ReviewSerializer(reviews, many=True)
-            response = Response(
-                {"reviews": review_serializer.data},
-                status=status.HTTP_200_OK,
-            )
+            if wants_stream(request) and get_limit(request) is None:
+                # Whole listing, serialized row by row (see streaming.py)
+                response = streaming_response("reviews", reviews, ReviewSerializer())
+            else:
+                page: dict
+                reviews, page = paginate_request(request, reviews, REVIEW_ORDERING)
+
+                # Create response
+                review_serializer: ReviewSerializer = ReviewSerializer(
+                    reviews, many=True
+                )
+                response = Response(
+                    {"reviews": review_serializer.data, **page},
+                    status=status.HTTP_200_OK,
+                )
 
         except ValidationError as error:
             response = Response(
@@ -666,27 +762,62 @@ class RetrieveReviewsView(generics.RetrieveAPIView):
         return response
 
 
+class RecommendationsView(generics.ListAPIView):
+    """
+    Films recommended to the user as of the last recommendations build, or the
+    popular films if the user has none yet (see recommendations.py)
+    """
+
+    queryset: BaseManager[RecommendedFilm] = RecommendedFilm.objects.all()
+
+    def get_object(self) -> AbstractBaseUser:
+        """Overwrite method to get the authenticated user object"""
+        if not self.request.user.is_authenticated:
+            raise PermissionDenied("session cookie missing or not valid")
+        return self.request.user
+
+    def get(self, request: Request) -> Response:
+        response: Response
+        try:
+            user: User = self.get_object()
+            films: list[RecommendedFilm | PopularFilm] = list(
+                self.queryset.for_listing().filter(user_id=user.id)
+            )
+            personal: bool = bool(films)
+            if not personal:
+                films = list(PopularFilm.objects.for_listing())
+
+            serializer: RecommendedFilmSerializer = RecommendedFilmSerializer(
+                films, many=True
+            )
+            response = Response(
+                {"films": serializer.data, "personal": personal},
+                status=status.HTTP_200_OK,
+            )
+
+        except PermissionDenied as error:
+            response = Response(
+                {"detail": str(error)}, status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        return response
+
+
 class DeleteReviewView(generics.DestroyAPIView):
     serializer_class: type = DeleteReviewSerializer
 
     def get_object(self) -> AbstractBaseUser:
         """Overwrite method to get the authenticated user object"""
-        try:
-            session_key: str = self.request.COOKIES.get("session")
-            user: AbstractBaseUser = Token.objects.get(key=session_key).user
-        except ObjectDoesNotExist:
+        if not self.request.user.is_authenticated:
             raise PermissionDenied("session cookie missing or not valid")
-        return user
+        return self.request.user
 
     def post(self, request: Request) -> Response:
 
         response: Response
         try:
             # parse request data
-            data: dict = {
-                k: v[0] if type(v) is list and len(v) == 1 else v
-                for k, v in dict(request.data).items()
-            }
+            data: dict = request.data
             # Verify that the provided ID is numeric
             review_id: int = data.get("review_id", None)
             if review_id is None or review_id == "":
@@ -711,7 +842,15 @@ class DeleteReviewView(generics.DestroyAPIView):
                     "Unauthorized to delete an unauthenticated user's post."
                 )
 
-            review.delete()
+            with transaction.atomic():
+                # Deleted first, so that of concurrent deletes of the review only the
+                # one that deletes it removes its rating
+                deleted: int
+                deleted, _ = Review.objects.filter(pk=review.pk).delete()
+                if deleted > 0:
+                    ratings.remove_review(review)
+                    trending.remove_review(review)
+                    leaderboards.refresh_film(review.film_id_id)
 
             # Create response
             response = Response(
@@ -743,10 +882,7 @@ class AggregateDirectorView(generics.CreateAPIView):
         with transaction.atomic():  # Ensure all or nothing persistence
             try:
                 # parse request data
-                director_data: dict = {
-                    k: v[0] if type(v) is list and len(v) == 1 else v
-                    for k, v in dict(request.data).items()
-                }
+                director_data: dict = request.data
                 # serialize director
                 director_serializer = DirectorSerializer(data=director_data)
                 director_serializer.is_valid(raise_exception=True)
@@ -784,10 +920,7 @@ class DeleteDirectorView(generics.DestroyAPIView):
         with transaction.atomic():  # Ensure all or nothing persistence
             try:
                 # parse request data
-                director_data: dict = {
-                    k: v[0] if type(v) is list and len(v) == 1 else v
-                    for k, v in dict(request.data).items()
-                }
+                director_data: dict = request.data
                 # Get the director id from the request data
                 director_id: int = director_data.get("id")
                 if not director_id:
@@ -839,10 +972,7 @@ class AggregateActorView(generics.CreateAPIView):
         with transaction.atomic():  # Ensure all or nothing persistence
             try:
                 # parse request data
-                actor_data: dict = {
-                    k: v[0] if type(v) is list and len(v) == 1 else v
-                    for k, v in dict(request.data).items()
-                }
+                actor_data: dict = request.data
                 # serialize actor
                 actor_serializer = ActorSerializer(data=actor_data)
                 actor_serializer.is_valid(raise_exception=True)
@@ -880,10 +1010,7 @@ class DeleteActorView(generics.DestroyAPIView):
         with transaction.atomic():  # Ensure all or nothing persistence
             try:
                 # parse request data
-                actor_data: dict = {
-                    k: v[0] if type(v) is list and len(v) == 1 else v
-                    for k, v in dict(request.data).items()
-                }
+                actor_data: dict = request.data
                 # Get the director name from the request data
                 actor_id: str = actor_data.get("id")
                 if not actor_id:
@@ -929,6 +1056,7 @@ class DeleteActorView(generics.DestroyAPIView):
 
 class AggregateFilmView(generics.CreateAPIView):
     serializer_class: type = FilmSerializer
+    list_fields: tuple[str, ...] = ("cast",)  # Lists in form bodies too
 
     def post(self, request: Request) -> Response:
 
@@ -936,14 +1064,7 @@ class AggregateFilmView(generics.CreateAPIView):
 
             try:
                 # parse request data
-                film_data: dict = {
-                    k: (
-                        v[0]
-                        if type(v) is list and len(v) == 1 and not k == "cast"
-                        else v
-                    )
-                    for k, v in dict(request.data).items()
-                }
+                film_data: dict = request.data
 
                 # Handle Director
                 if "director" not in film_data.keys():
@@ -965,7 +1086,6 @@ class AggregateFilmView(generics.CreateAPIView):
                 cast_names: list[str] = film_data.pop("cast", [])
                 if type(cast_names) is not list:
                     raise ValidationError("cast must be a list of names (list[string])")
-                actors: list[Actor] = []  # List to store Actor instances
                 for name in cast_names:
                     if not type(name) is str:
                         raise ValidationError(
@@ -974,11 +1094,9 @@ class AggregateFilmView(generics.CreateAPIView):
                     actor_data: dict[str, str] = {"name": name}
                     actor_serializer = ActorSerializer(data=actor_data)
                     actor_serializer.validate_fields(data=actor_data)
-                    actor: Actor
-                    created: bool
-                    actor, created = Actor.objects.get_or_create(**actor_data)
-                    actor.save()
-                    actors.append(actor)  # Add the Actor instance to the list
+                # Get or create every actor at once
+                actors_by_name: dict[str, Actor] = resolve_or_create(Actor, cast_names)
+                actors: list[Actor] = [actors_by_name[name] for name in cast_names]
 
                 # Handle Film
                 # film_data.pop("image_url")
@@ -1017,6 +1135,52 @@ class AggregateFilmView(generics.CreateAPIView):
             return response
 
 
+class BulkFilmImportView(generics.CreateAPIView):
+
+    def get_serializer_class(self) -> serializers.Serializer:
+        return serializers.Serializer  # Films are validated by the importer
+
+    def post(self, request: Request) -> Response:
+        response: Response
+
+        # Note.
+        # The body is read as a stream (request.data is never accessed), so the
+        # payload is never fully loaded in memory. Content types application/jsonl and
+        # application/x-ndjson are read as JSON Lines, anything else as a JSON array.
+        try:
+            stream = request.stream
+            if stream is None:
+                raise ValidationError("Films must be provided")
+            rows: Iterator[dict]
+            if request.content_type.split(";")[0].strip() in JSON_LINES_TYPES:
+                rows = iter_json_lines(stream)
+            else:
+                rows = iter_json_array(stream)
+
+            report: dict = FilmImporter().import_rows(rows)
+            message: str = (
+                f"{report['created']} films added, {report['updated']} films "
+                f"updated, {len(report['errors'])} films rejected"
+            )
+            response = Response(
+                {"detail": message, **report},
+                status=status.HTTP_201_CREATED,
+            )
+
+        except ValidationError as error:
+            response = Response(
+                {"detail": error.message},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except ValueError:
+            response = Response(
+                {"detail": "Invalid JSON payload"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return response
+
+
 class DeleteFilmView(generics.DestroyAPIView):
 
     def get_serializer_class(self) -> serializers.Serializer:
@@ -1033,10 +1197,7 @@ class DeleteFilmView(generics.DestroyAPIView):
         with transaction.atomic():  # Ensure all or nothing persistence
             try:
                 # parse request data
-                film_data: dict = {
-                    k: v[0] if type(v) is list and len(v) == 1 else v
-                    for k, v in dict(request.data).items()
-                }
+                film_data: dict = request.data
                 # Get the director name from the request data
                 film_name: str = film_data.get("name")
                 if not film_name:
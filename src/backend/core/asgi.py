@@ -11,6 +11,11 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "FPbackend.settings")
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
 application = get_asgi_application()
+
+# Names of the autocomplete index, loaded in the background of every worker
+from apps.users.autocomplete import autocomplete_index  # noqa: E402
+
+autocomplete_index.start()
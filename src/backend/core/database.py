@@ -0,0 +1,85 @@
+import os
+from pathlib import Path
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Note.
+# The database is configured through environment variables:
+# - DATABASE_ENGINE: "sqlite" (default) or "postgresql".
+# - DATABASE_NAME: database name, or file path for SQLite (db.sqlite3 by default).
+# - DATABASE_USER, DATABASE_PASSWORD, DATABASE_HOST, DATABASE_PORT: PostgreSQL server.
+# - DATABASE_CONN_MAX_AGE: seconds a connection is reused between requests (0 closes
+#   it after every request, "none" keeps it open), checked before reuse.
+# - DATABASE_POOL: "pgbouncer" when PostgreSQL is reached through PgBouncer in
+#   transaction pooling mode. Server side cursors (used by QuerySet.iterator) do not
+#   survive between transactions there, so they are disabled.
+# SQLite connections are tuned on creation with SQLITE_PRAGMAS: WAL lets readers run
+# alongside a writer, and writers wait for the lock (busy_timeout) instead of failing.
+
+ENGINES: dict[str, str] = {
+    "sqlite": "django.db.backends.sqlite3",
+    "postgresql": "django.db.backends.postgresql",
+}
+
+POOLS: list[str] = ["", "pgbouncer"]
+
+DEFAULT_CONN_MAX_AGE = 60  # seconds
+
+SQLITE_PRAGMAS: dict[str, str | int] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",  # Safe with WAL, syncs on checkpoints only
+    "busy_timeout": 5000,  # milliseconds
+    "mmap_size": 256 * 1024 * 1024,  # bytes
+}
+
+
+def conn_max_age(value: str | None) -> int | None:
+    if value is None or value == "":
+        return DEFAULT_CONN_MAX_AGE
+    if value.lower() == "none":
+        return None  # Unlimited persistent connections
+    return int(value)
+
+
+def database_from_environment(base_dir: Path, environ: dict = os.environ) -> dict:
+    """The default DATABASES entry for the environment"""
+    engine: str = environ.get("DATABASE_ENGINE", "sqlite")
+    if engine not in ENGINES:
+        raise ValueError(
+            f"DATABASE_ENGINE must be one of: {', '.join(ENGINES)} (got {engine})."
+        )
+
+    database: dict = {
+        "ENGINE": ENGINES[engine],
+        "CONN_MAX_AGE": conn_max_age(environ.get("DATABASE_CONN_MAX_AGE", None)),
+        "CONN_HEALTH_CHECKS": True,
+    }
+    if engine == "sqlite":
+        database["NAME"] = environ.get("DATABASE_NAME", base_dir / "db.sqlite3")
+        return database
+
+    database.update(
+        {
+            "NAME": environ.get("DATABASE_NAME", "flicks_and_picks"),
+            "USER": environ.get("DATABASE_USER", ""),
+            "PASSWORD": environ.get("DATABASE_PASSWORD", ""),
+            "HOST": environ.get("DATABASE_HOST", ""),
+            "PORT": environ.get("DATABASE_PORT", ""),
+        }
+    )
+    pool: str = environ.get("DATABASE_POOL", "")
+    if pool not in POOLS:
+        raise ValueError(f"DATABASE_POOL must be empty or pgbouncer (got {pool}).")
+    if pool == "pgbouncer":
+        database["DISABLE_SERVER_SIDE_CURSORS"] = True
+    return database
+
+
+@receiver(connection_created)
+def configure_sqlite(sender: type, connection: BaseDatabaseWrapper, **kwargs) -> None:
+    if connection.vendor == "sqlite":
+        # On the driver connection: setting up the connection is not one of the
+        # queries of the request that opened it (see QueryMetricsMiddleware)
+        for pragma, value in SQLITE_PRAGMAS.items():
+            connection.connection.execute(f"PRAGMA {pragma} = {value}")
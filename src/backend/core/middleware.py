@@ -0,0 +1,177 @@
+import json
+import logging
+from time import perf_counter
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpRequest, HttpResponse
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+# Note.
+# Django runs the middleware chain natively under ASGI only if every middleware is
+# async capable. A single synchronous one makes it adapt the rest of the chain, and
+# the views behind it, with sync_to_async/async_to_sync, so every request holds a
+# thread (the same one, as adapters are thread sensitive). WhiteNoise only serves
+# files from memory before handing the request over, so it is wrapped here to do the
+# same on either side.
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response, *args, **kwargs) -> None:
+        super().__init__(get_response, *args, **kwargs)
+        self.async_mode: bool = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+# Note.
+# Query metrics of every request, for production: the database connection is wrapped
+# (connection.execute_wrapper) for the duration of the request, counting queries,
+# their time and the repeated ones (same SQL, any parameters: the N+1 pattern of a
+# serializer reading a relation per row). Each response gets a Server-Timing header,
+# and a structured (JSON) line is logged to the "core.queries" logger, keyed by the
+# URL name. Views may have a query budget (QUERY_METRICS["BUDGETS"], by URL name):
+# going over it logs a warning, or raises QueryBudgetExceeded with FAIL_OVER_BUDGET
+# (meant for tests, so regressions fail them).
+# Only the default database is measured, and the queries of a streamed response body
+# are not, as they run after the response leaves the middleware.
+
+query_logger: logging.Logger = logging.getLogger("core.queries")
+
+DEFAULT_QUERY_METRICS_SETTINGS: dict = {
+    "ENABLED": True,
+    "SERVER_TIMING": True,
+    "BUDGETS": {},  # URL name: max queries
+    "DEFAULT_BUDGET": None,  # Views without a budget, None for no budget
+    "FAIL_OVER_BUDGET": False,
+}
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryMetrics:
+    def __init__(self) -> None:
+        self.queries: int = 0
+        self.seconds: float = 0.0
+        self.executions: dict[str, int] = {}
+
+    def __call__(self, execute, sql: str, params, many: bool, context: dict):
+        start: float = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += perf_counter() - start
+            self.queries += 1
+            self.executions[sql] = self.executions.get(sql, 0) + 1
+
+    @property
+    def duplicates(self) -> int:
+        """Executions of a SQL statement already run in the request"""
+        return sum(count - 1 for count in self.executions.values())
+
+
+def add_execute_wrapper(wrapper: QueryMetrics) -> None:
+    connection.execute_wrappers.append(wrapper)
+
+
+def remove_execute_wrapper(wrapper: QueryMetrics) -> None:
+    connection.execute_wrappers.remove(wrapper)
+
+
+class QueryMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        self.async_mode: bool = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.options: dict = {
+            **DEFAULT_QUERY_METRICS_SETTINGS,
+            **getattr(settings, "QUERY_METRICS", {}),
+        }
+        if not self.options["ENABLED"]:
+            raise MiddlewareNotUsed()
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics: QueryMetrics = QueryMetrics()
+        start: float = perf_counter()
+        with connection.execute_wrapper(metrics):
+            response: HttpResponse = self.get_response(request)
+        return self.report(request, response, metrics, perf_counter() - start)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        # Connections are per thread, and the queries of async views run in the
+        # thread of the request's sync_to_async calls, so the wrapper goes there
+        metrics: QueryMetrics = QueryMetrics()
+        start: float = perf_counter()
+        await sync_to_async(add_execute_wrapper)(metrics)
+        try:
+            response: HttpResponse = await self.get_response(request)
+        finally:
+            await sync_to_async(remove_execute_wrapper)(metrics)
+        return self.report(request, response, metrics, perf_counter() - start)
+
+    def budget(self, url_name: str | None) -> int | None:
+        return self.options["BUDGETS"].get(url_name, self.options["DEFAULT_BUDGET"])
+
+    def report(
+        self,
+        request: HttpRequest,
+        response: HttpResponse,
+        metrics: QueryMetrics,
+        seconds: float,
+    ) -> HttpResponse:
+        match = request.resolver_match
+        url_name: str | None = match.view_name if match is not None else None
+        if self.options["SERVER_TIMING"]:
+            response["Server-Timing"] = (
+                f'db;dur={metrics.seconds * 1000:.1f};desc="{metrics.queries} queries", '
+                f"app;dur={seconds * 1000:.1f}"
+            )
+
+        line: dict = {
+            "url_name": url_name,
+            "method": request.method,
+            "status": response.status_code,
+            "queries": metrics.queries,
+            "duplicates": metrics.duplicates,
+            "sql_ms": round(metrics.seconds * 1000, 2),
+            "total_ms": round(seconds * 1000, 2),
+        }
+        budget: int | None = self.budget(url_name)
+        if budget is None or metrics.queries <= budget:
+            query_logger.info(json.dumps(line))
+            return response
+
+        line["budget"] = budget
+        query_logger.warning(json.dumps(line))
+        if self.options["FAIL_OVER_BUDGET"]:
+            raise QueryBudgetExceeded(
+                f"{url_name} ran {metrics.queries} queries, over its budget of "
+                f"{budget} ({metrics.duplicates} repeated)."
+            )
+        return response
@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 import os
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
+
+from core.database import database_from_environment
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -27,8 +30,25 @@ SECRET_KEY: str = os.environ.get(
     default="django-insecure-)_sw1(=+h9(j%h-_ebvbk&%^4ga!uj_qm%3*8ur7$--(($mv7*",
 )
 
+# Settings profile, from the DJANGO_PROFILE environment variable:
+# - dev: debug mode, the debug toolbar and every app.
+# - test: production settings plus the admin site, and query budgets that fail tests.
+# - prod: a lean middleware chain and only the apps the API needs.
+# manage.py defaults to dev (test for the test command), wsgi.py and asgi.py to prod.
+PROFILES: tuple[str, ...] = ("dev", "test", "prod")
+PROFILE: str = os.environ.get("DJANGO_PROFILE", "prod")
+if PROFILE not in PROFILES:
+    raise ImproperlyConfigured(
+        f"DJANGO_PROFILE must be one of {', '.join(PROFILES)}, not {PROFILE!r}."
+    )
+
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = False
+DEBUG: bool = PROFILE == "dev"
+
+# The API authenticates with the token cookie (see apps/users/authentication.py):
+# sessions, messages and CSRF cookies are only used by the admin site, which is
+# opt-in (DJANGO_ADMIN=1) in prod.
+ADMIN_ENABLED: bool = PROFILE != "prod" or os.environ.get("DJANGO_ADMIN", "") == "1"
 
 ALLOWED_HOSTS: list = ["localhost", "127.0.0.1", "onrender.com"]
 CSRF_TRUSTED_ORIGINS: list = ["http://localhost"]
@@ -42,12 +62,15 @@ CORS_ALLOW_ALL_ORIGINS: bool = True
 
 # Application definition
 DEFAULT_APPS: list[str] = [
-    "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
+    "django.contrib.staticfiles",
+]
+
+ADMIN_APPS: list[str] = [
+    "django.contrib.admin",
     "django.contrib.sessions",
     "django.contrib.messages",
-    "django.contrib.staticfiles",
 ]
 
 CUSTOM_APPS: list[str] = [
@@ -57,27 +80,47 @@ CUSTOM_APPS: list[str] = [
 THIRD_PARTY_APPS: list[str] = [
     "rest_framework",
     "rest_framework.authtoken",
-    "drf_spectacular",
+    "corsheaders",
+]
+
+# Development tools: runserver static files, OpenAPI schema, debug toolbar
+DEV_APPS: list[str] = [
     "whitenoise.runserver_nostatic",
+    "drf_spectacular",
     "debug_toolbar",
-    "corsheaders",
 ]
 
 INSTALLED_APPS: list[str] = [*DEFAULT_APPS, *CUSTOM_APPS, *THIRD_PARTY_APPS]
 
+# Every middleware is async capable, so the async views (see
+# apps/users/async_views.py) run on the event loop under ASGI. CORS goes before
+# CommonMiddleware, which may answer a request itself (redirects).
 MIDDLEWARE: list[str] = [
+    "core.middleware.QueryMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "core.middleware.AsyncWhiteNoiseMiddleware",
+    "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
+]
+
+ADMIN_MIDDLEWARE: list[str] = [
+    "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
-    "corsheaders.middleware.CorsMiddleware",
 ]
 
+if ADMIN_ENABLED:
+    INSTALLED_APPS[:0] = ADMIN_APPS
+    MIDDLEWARE.extend(ADMIN_MIDDLEWARE)
+
+# The debug toolbar middleware is synchronous, and only shows in debug mode anyway.
+# whitenoise.runserver_nostatic goes before django.contrib.staticfiles.
+if PROFILE == "dev":
+    INSTALLED_APPS[:0] = DEV_APPS
+    MIDDLEWARE.append("debug_toolbar.middleware.DebugToolbarMiddleware")
+
 ROOT_URLCONF = "core.urls"
 CORS_ORIGIN_ALLOW_ALL = True
 
@@ -103,11 +146,9 @@ WSGI_APPLICATION = "core.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES: dict[str, dict[str, str]] = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+# Set through DATABASE_* environment variables (see core/database.py)
+DATABASES: dict[str, dict] = {
+    "default": database_from_environment(BASE_DIR),
 }
 
 
@@ -132,6 +173,73 @@ AUTH_PASSWORD_VALIDATORS: list[dict[str, str]] = [
 ]
 
 
+AUTHENTICATION_BACKENDS: list[str] = ["apps.users.authentication.LoginBackend"]
+
+# Password hashing (see apps/users/hashers.py): new passwords are hashed with
+# PASSWORD_HASHER, at the cost of PASSWORD_HASHING, and passwords hashed with another
+# hasher or cost are rehashed as their users log in. argon2 needs argon2-cffi.
+HASHERS: dict[str, str] = {
+    "scrypt": "apps.users.hashers.ScryptPasswordHasher",
+    "argon2": "apps.users.hashers.Argon2PasswordHasher",
+    "pbkdf2_sha256": "apps.users.hashers.PBKDF2PasswordHasher",
+}
+PASSWORD_HASHER: str = os.environ.get("PASSWORD_HASHER", "scrypt")
+if PASSWORD_HASHER not in HASHERS:
+    raise ImproperlyConfigured(
+        f"PASSWORD_HASHER must be one of {', '.join(HASHERS)}, not {PASSWORD_HASHER!r}."
+    )
+PASSWORD_HASHERS: list[str] = [
+    HASHERS[PASSWORD_HASHER],
+    *(hasher for name, hasher in HASHERS.items() if name != PASSWORD_HASHER),
+]
+
+PASSWORD_HASHING: dict = {
+    "SCRYPT_WORK_FACTOR": 2**14,
+    "SCRYPT_BLOCK_SIZE": 8,
+    "SCRYPT_PARALLELISM": 1,
+    "ARGON2_TIME_COST": 2,
+    "ARGON2_MEMORY_COST": 102400,  # KiB
+    "ARGON2_PARALLELISM": 8,
+    "PBKDF2_ITERATIONS": 600_000,
+}
+
+# Tests hash passwords with the same code, at a fraction of the cost
+if PROFILE == "test":
+    PASSWORD_HASHING.update(
+        SCRYPT_WORK_FACTOR=2**8,
+        ARGON2_TIME_COST=1,
+        ARGON2_MEMORY_COST=1024,
+        ARGON2_PARALLELISM=1,
+        PBKDF2_ITERATIONS=1000,
+    )
+
+# Scrypt hashes ("scrypt$<salt>$<work factor>$<block size>$<parallelism>$<hash>", with
+# a 22 characters salt and an 88 characters hash) must fit the password column
+SCRYPT_HASH_LENGTH: int = (
+    len("scrypt$$$$$")
+    + 22
+    + 88
+    + sum(
+        len(str(PASSWORD_HASHING[f"SCRYPT_{name}"]))
+        for name in ("WORK_FACTOR", "BLOCK_SIZE", "PARALLELISM")
+    )
+)
+if SCRYPT_HASH_LENGTH > 128:
+    raise ImproperlyConfigured(
+        f"Scrypt hashes of PASSWORD_HASHING would be {SCRYPT_HASH_LENGTH} characters "
+        "long, more than the 128 of the password column."
+    )
+
+# Failed logins allowed per client IP and per username (see
+# apps/users/authentication.py), use a shared cache with many workers
+LOGIN_THROTTLE: dict = {
+    "CACHE_ALIAS": "default",  # None disables it
+    "MAX_FAILURES_PER_IP": 100,
+    "MAX_FAILURES_PER_USERNAME": 10,
+    "WINDOW": 300,  # seconds
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -181,12 +289,99 @@ CORS_ALLOW_HEADERS: list[str] = [
     "x-requested-with",
 ]
 
+CORS_EXPOSE_HEADERS: list[str] = ["x-cache", "server-timing"]
+
 REST_FRAMEWORK: dict[str, str] = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework.authentication.TokenAuthentication",
-        "rest_framework.authentication.SessionAuthentication",
+        "apps.users.authentication.CookieTokenAuthentication",
     ),
-    "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # Proxies in front of the server. The client IP (of the login throttle) is read
+    # from the X-Forwarded-For they append to, which clients can forge without them.
+    "NUM_PROXIES": int(
+        os.environ.get("NUM_PROXIES", "1" if RENDER_EXTERNAL_HOSTNAME else "0")
+    ),
+    # request.data is a plain dict (see apps/users/parsers.py)
+    "DEFAULT_PARSER_CLASSES": (
+        "apps.users.parsers.JSONParser",
+        "apps.users.parsers.FormParser",
+        "apps.users.parsers.MultiPartParser",
+    ),
+}
+
+# The OpenAPI schema comes from drf_spectacular, a development tool (see DEV_APPS)
+if PROFILE == "dev":
+    REST_FRAMEWORK["DEFAULT_SCHEMA_CLASS"] = "drf_spectacular.openapi.AutoSchema"
+
+# The browsable API renders HTML templates, JSON is enough in production
+if PROFILE == "prod":
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = (
+        "rest_framework.renderers.JSONRenderer",
+    )
+
+# Cache of the users authenticated by session cookie (see apps/users/authentication.py).
+# Logouts and account deletions only clear the in-process cache of the worker that
+# serves them: the other workers accept the revoked token for LOCAL_TTL at most.
+AUTH_TOKEN_CACHE: dict = {
+    "MAX_SIZE": 10_000,
+    "TTL": 300,  # seconds, of the shared cache
+    "LOCAL_TTL": 30,  # seconds, of the in-process cache of every worker
+    "CACHE_ALIAS": None,  # set to a CACHES alias to share it between workers
+}
+
+CACHES: dict[str, dict] = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "flics-and-picks",
+    },
+}
+
+# Cache of the film detail and search responses (see apps/users/caching.py)
+FILM_RESPONSE_CACHE: dict = {
+    "CACHE_ALIAS": "default",  # None disables it, use a shared cache with many workers
+    "TTL": 300,  # seconds
+}
+
+# Query count and SQL time of every request (see core/middleware.py). Budgets are the
+# most queries a view may run, cookie authentication included.
+QUERY_METRICS: dict = {
+    "ENABLED": True,
+    "SERVER_TIMING": True,
+    "BUDGETS": {
+        "film_filter": 3,
+        "film_info": 3,
+        "film_reviews": 3,
+        "film_similar": 3,
+        "film_trending": 2,
+        "film_leaderboard": 3,
+        # Lookups read the names loaded in the worker
+        "autocomplete": 0,
+        "async_film_filter": 2,
+        "async_film_info": 2,
+        "async_film_reviews": 2,
+        "user_info": 1,
+        "user_history": 2,
+        "user_recommendations": 3,
+        "user_add_review": 13,
+        "user_del_review": 13,
+    },
+    "DEFAULT_BUDGET": None,
+    "FAIL_OVER_BUDGET": (
+        PROFILE == "test" or os.environ.get("QUERY_BUDGET_STRICT", "") == "1"
+    ),
+}
+
+LOGGING: dict = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        # One JSON line per request at INFO, over budget requests at WARNING
+        "core.queries": {
+            "handlers": ["console"],
+            "level": os.environ.get("QUERY_LOG_LEVEL", "WARNING"),
+            "propagate": False,
+        },
+    },
 }
 
 SPECTACULAR_SETTINGS: dict = {
@@ -197,3 +392,38 @@ SPECTACULAR_SETTINGS: dict = {
 }
 
 INTERNAL_IPS: list[str] = ["127.0.0.1"]
+
+# Film text search backend (see apps/users/search.py). By default, an FTS5 index on
+# SQLite and icontains lookups on other databases.
+# FILM_SEARCH_BACKEND = "apps.users.search.ContainsBackend"
+
+# Similar films, precomputed by the build_similar_films command (see
+# apps/users/similarity.py)
+SIMILAR_FILMS: dict = {
+    "NEIGHBOURS": 20,  # stored per film
+    "MAX_USER_RATINGS": 500,  # most recent ratings of each user compared
+    "BLOCK_SIZE": 2000,  # films compared at once, memory grows with it
+}
+
+# Recommended films, precomputed by the build_recommendations command (see
+# apps/users/recommendations.py)
+RECOMMENDATIONS: dict = {
+    "COUNT": 20,  # films per user
+    "FACTORS": 32,
+    "ITERATIONS": 10,
+    "WORKERS": None,  # processes, every core by default
+}
+
+# Top rated films of every genre, kept up to date as reviews are written (see
+# apps/users/leaderboards.py)
+LEADERBOARDS: dict = {
+    "SIZE": 100,  # films per genre
+}
+
+# Typeahead over film, director and actor names, from an in-memory index in every
+# worker (see apps/users/autocomplete.py)
+AUTOCOMPLETE: dict = {
+    "RESULTS": 10,  # by default
+    "MAX_RESULTS": 20,  # the most a request may ask for
+    "MAX_AGE": 300,  # seconds before loading the names again, None never does
+}
@@ -15,10 +15,10 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+from django.apps import apps
 from django.contrib import admin
 from django.urls import path, include
 
-
 # from rest_framework.routers import DefaultRouter
 from apps.users.views import (
     UserRegisterView,
@@ -29,17 +29,28 @@ from apps.users.views import (
     UserDeleteView,
     PostReviewView,
     RetrieveReviewsView,
+    RecommendationsView,
     DeleteReviewView,
     FilterFilmsView,
     FilmDetailView,
     FilmReviewsView,
+    SimilarFilmsView,
+    TrendingFilmsView,
+    LeaderboardView,
+    AutocompleteView,
     AggregateDirectorView,
     AggregateActorView,
     AggregateFilmView,
+    BulkFilmImportView,
     DeleteDirectorView,
     DeleteActorView,
     DeleteFilmView,
 )
+from apps.users.async_views import (
+    AsyncFilterFilmsView,
+    AsyncFilmDetailView,
+    AsyncFilmReviewsView,
+)
 
 user_urls: list[path] = [
     path("users/register/", UserRegisterView.as_view(), name="user_register"),
@@ -51,19 +62,45 @@ user_urls: list[path] = [
     path("users/add-review/", PostReviewView.as_view(), name="user_add_review"),
     path("users/delete-review/", DeleteReviewView.as_view(), name="user_del_review"),
     path("users/history/", RetrieveReviewsView.as_view(), name="user_history"),
+    path(
+        "users/recommendations/",
+        RecommendationsView.as_view(),
+        name="user_recommendations",
+    ),
 ]
 
 site_urls: list[path] = [
     path("films/", FilterFilmsView.as_view(), name="film_filter"),
+    path("films/trending/", TrendingFilmsView.as_view(), name="film_trending"),
+    path(
+        "films/top-rated/<str:genre>/",
+        LeaderboardView.as_view(),
+        name="film_leaderboard",
+    ),
     path("films/<int:id>/", FilmDetailView.as_view(), name="film_info"),
     path("films/<int:id>/reviews/", FilmReviewsView.as_view(), name="film_reviews"),
+    path("films/<int:id>/similar/", SimilarFilmsView.as_view(), name="film_similar"),
+    path("autocomplete/", AutocompleteView.as_view(), name="autocomplete"),
+]
+
+# Async versions of the film read endpoints, for ASGI servers (see async_views.py)
+async_urls: list[path] = [
+    path("async/films/", AsyncFilterFilmsView.as_view(), name="async_film_filter"),
+    path(
+        "async/films/<int:id>/", AsyncFilmDetailView.as_view(), name="async_film_info"
+    ),
+    path(
+        "async/films/<int:id>/reviews/",
+        AsyncFilmReviewsView.as_view(),
+        name="async_film_reviews",
+    ),
 ]
 
 admin_urls: list[path] = [
-    path("admin/", admin.site.urls),
     path("site-admin/add-director/", AggregateDirectorView.as_view(), name="add_dir"),
     path("site-admin/add-actor/", AggregateActorView.as_view(), name="add_actor"),
     path("site-admin/add-film/", AggregateFilmView.as_view(), name="add_film"),
+    path("site-admin/bulk-films/", BulkFilmImportView.as_view(), name="bulk_films"),
     path("site-admin/delete-director/", DeleteDirectorView.as_view(), name="del_dir"),
     path("site-admin/delete-actor/", DeleteActorView.as_view(), name="del_actor"),
     path("site-admin/delete-film/", DeleteFilmView.as_view(), name="del_film"),
@@ -77,5 +114,12 @@ urlpatterns: list[path] = [
     *user_urls,
     *site_urls,
     *admin_urls,
-    *debug_urls,
+    *async_urls,
 ]
+
+# Not installed in the prod profile (see core/settings.py)
+if apps.is_installed("django.contrib.admin"):
+    urlpatterns.append(path("admin/", admin.site.urls))
+
+if apps.is_installed("debug_toolbar"):
+    urlpatterns.extend(debug_urls)
@@ -11,6 +11,11 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "FPbackend.settings")
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
 application = get_wsgi_application()
+
+# Names of the autocomplete index, loaded in the background of every worker
+from apps.users.autocomplete import autocomplete_index  # noqa: E402
+
+autocomplete_index.start()
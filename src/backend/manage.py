@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 """Django's command-line utility for administrative tasks."""
+
 import os
 import sys
 
@@ -7,6 +8,9 @@ import sys
 def main():
     """Run administrative tasks."""
     os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    os.environ.setdefault(
+        "DJANGO_PROFILE", "test" if sys.argv[1:2] == ["test"] else "dev"
+    )
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc: